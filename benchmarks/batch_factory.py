@@ -0,0 +1,49 @@
+import argparse
+import time
+
+import numpy as np
+
+from kiox.kiox import Kiox
+from kiox.step import ArrayStepBuffer
+from kiox.transition_buffer import FIFOTransitionBuffer
+from kiox.transition_factory import FrameStackTransitionFactory
+
+
+def build_kiox(capacity, vectorized):
+    kiox = Kiox(
+        FIFOTransitionBuffer(capacity, use_table=vectorized),
+        FrameStackTransitionFactory(4),
+        step_buffer=ArrayStepBuffer(capacity + 1000),
+        vectorized=vectorized,
+    )
+    for i in range(capacity):
+        kiox.collect(
+            observation=np.random.randint(
+                256, size=(1, 84, 84), dtype=np.uint8
+            ),
+            action=np.random.randint(4),
+            reward=float(np.random.random()),
+            terminal=float(i % 1000 == 999),
+        )
+    return kiox
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--capacity", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--n-batches", type=int, default=100)
+    args = parser.parse_args()
+
+    for vectorized in [False, True]:
+        kiox = build_kiox(args.capacity, vectorized)
+        start = time.perf_counter()
+        for _ in range(args.n_batches):
+            kiox.sample(args.batch_size)
+        elapsed = (time.perf_counter() - start) / args.n_batches * 1e3
+        mode = "vectorized" if vectorized else "object"
+        print(f"{mode:>10}: {elapsed:.3f} ms/batch")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import time
+from collections import deque
+
+import numpy as np
+
+from kiox.transition import SimpleLazyTransition
+from kiox.transition_buffer import FIFOTransitionBuffer
+
+
+def fill(buffer, capacity):
+    for i in range(capacity):
+        buffer.append(
+            SimpleLazyTransition(
+                curr_idx=i, next_idx=i + 1, multi_step_reward=0.0, duration=1
+            )
+        )
+
+
+def measure(get, size, n_samples):
+    indices = np.random.randint(size, size=n_samples)
+    start = time.perf_counter()
+    for index in indices:
+        get(int(index))
+    return (time.perf_counter() - start) / n_samples * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--capacities",
+        type=int,
+        nargs="+",
+        default=[10000, 100000, 1000000, 10000000],
+    )
+    parser.add_argument("--n-samples", type=int, default=100000)
+    parser.add_argument("--use-table", action="store_true")
+    args = parser.parse_args()
+
+    print(f"{'capacity':>10} {'ring [us]':>10} {'deque [us]':>11}")
+    for capacity in args.capacities:
+        buffer = FIFOTransitionBuffer(capacity, use_table=args.use_table)
+        fill(buffer, capacity)
+        ring_latency = measure(buffer.get_by_index, capacity, args.n_samples)
+        del buffer
+
+        # reference: the previous deque-based implementation
+        reference = deque(range(capacity), maxlen=capacity)
+        deque_latency = measure(reference.__getitem__, capacity, args.n_samples)
+        del reference
+
+        print(f"{capacity:>10} {ring_latency:>10.3f} {deque_latency:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
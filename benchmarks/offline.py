@@ -0,0 +1,62 @@
+import argparse
+import time
+
+import numpy as np
+
+from kiox.kiox import Kiox
+from kiox.offline import build_from_dataset
+from kiox.transition_buffer import UnlimitedTransitionBuffer
+from kiox.transition_factory import SimpleTransitionFactory
+
+
+def create_dataset(size, episode_length):
+    observations = np.random.random((size, 17)).astype(np.float32)
+    actions = np.random.random((size, 6)).astype(np.float32)
+    rewards = np.random.random(size)
+    terminals = np.zeros(size)
+    terminals[episode_length - 1 :: episode_length * 2] = 1.0
+    timeouts = np.zeros(size)
+    timeouts[episode_length * 2 - 1 :: episode_length * 2] = 1.0
+    return observations, actions, rewards, terminals, timeouts
+
+
+def build_with_loop(observations, actions, rewards, terminals, timeouts):
+    kiox = Kiox(UnlimitedTransitionBuffer(), SimpleTransitionFactory())
+    for i in range(observations.shape[0]):
+        kiox.collect(
+            observation=observations[i],
+            action=actions[i],
+            reward=rewards[i],
+            terminal=terminals[i],
+        )
+        if timeouts[i]:
+            kiox.clip_episode()
+    return kiox
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=200000)
+    parser.add_argument("--episode-length", type=int, default=1000)
+    args = parser.parse_args()
+
+    dataset = create_dataset(args.size, args.episode_length)
+
+    start = time.perf_counter()
+    build_with_loop(*dataset)
+    print(f"      loop: {time.perf_counter() - start:.3f} s")
+
+    for vectorized in [False, True]:
+        start = time.perf_counter()
+        build_from_dataset(
+            *dataset[:4],
+            transition_factory=SimpleTransitionFactory(),
+            timeouts=dataset[4],
+            vectorized=vectorized,
+        )
+        mode = "bulk+array" if vectorized else "bulk"
+        print(f"{mode:>10}: {time.perf_counter() - start:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import time
+
+import numpy as np
+
+from kiox.kiox import Kiox
+from kiox.prefetch import BatchPrefetcher
+from kiox.step import ArrayStepBuffer
+from kiox.transition_buffer import FIFOTransitionBuffer
+from kiox.transition_factory import FrameStackTransitionFactory
+
+
+def build_kiox(capacity):
+    kiox = Kiox(
+        FIFOTransitionBuffer(capacity),
+        FrameStackTransitionFactory(4),
+        step_buffer=ArrayStepBuffer(capacity + 1000),
+    )
+    for i in range(capacity):
+        kiox.collect(
+            observation=np.random.randint(
+                256, size=(1, 84, 84), dtype=np.uint8
+            ),
+            action=np.random.randint(4),
+            reward=float(np.random.random()),
+            terminal=float(i % 1000 == 999),
+        )
+    return kiox
+
+
+def train_step(compute_time):
+    # emulate gradient computation which releases GIL
+    time.sleep(compute_time)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--capacity", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--n-batches", type=int, default=100)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--compute-time", type=float, default=0.005)
+    args = parser.parse_args()
+
+    kiox = build_kiox(args.capacity)
+
+    start = time.perf_counter()
+    for _ in range(args.n_batches):
+        kiox.sample(args.batch_size)
+        train_step(args.compute_time)
+    elapsed = (time.perf_counter() - start) / args.n_batches * 1e3
+    print(f"   blocking: {elapsed:.3f} ms/step")
+
+    with BatchPrefetcher(kiox, args.batch_size, args.depth) as prefetcher:
+        start = time.perf_counter()
+        for _ in range(args.n_batches):
+            prefetcher.next_batch()
+            train_step(args.compute_time)
+        elapsed = (time.perf_counter() - start) / args.n_batches * 1e3
+    stats = prefetcher.stats
+    print(
+        f"prefetching: {elapsed:.3f} ms/step "
+        f"(wait ratio {stats.wait_ratio:.2f}, "
+        f"average wait {stats.average_wait_time * 1e3:.3f} ms)"
+    )
+
+
+if __name__ == "__main__":
+    main()
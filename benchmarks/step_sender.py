@@ -0,0 +1,84 @@
+import argparse
+import time
+
+import numpy as np
+
+from kiox.distributed.server import KioxServer
+from kiox.distributed.step_sender import StepSender
+from kiox.transition_buffer import FIFOTransitionBuffer
+from kiox.transition_factory import SimpleTransitionFactory
+
+
+def transition_buffer_builder():
+    return FIFOTransitionBuffer(1000000)
+
+
+def transition_factory_builder():
+    return SimpleTransitionFactory()
+
+
+def send_steps(port, num_steps, num_actors, streaming, batch_size):
+    senders = [
+        StepSender(
+            "localhost", port, i, streaming=streaming, batch_size=batch_size
+        )
+        for i in range(num_actors)
+    ]
+    observation = np.random.random(4).astype(np.float32)
+    action = np.random.random(1).astype(np.float32)
+
+    start = time.perf_counter()
+    for i in range(num_steps):
+        for sender in senders:
+            sender.collect(
+                observation=observation,
+                action=action,
+                reward=1.0,
+                terminal=float(i % 1000 == 999),
+            )
+    # stop returns after all queued steps are received by the server
+    for sender in senders:
+        sender.stop()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=10000)
+    parser.add_argument("--actors", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    modes = {
+        "unary": (False, 1),
+        "streaming": (True, 1),
+        "batch": (False, args.batch_size),
+        "streaming+batch": (True, args.batch_size),
+    }
+    for mode, (streaming, batch_size) in modes.items():
+        server = KioxServer(
+            host="localhost",
+            port=args.port,
+            observation_shape=(4,),
+            action_shape=(1,),
+            reward_shape=(1,),
+            batch_size=32,
+            transition_buffer_builder=transition_buffer_builder,
+            transition_factory_builder=transition_factory_builder,
+        )
+        server.start()
+
+        elapsed = send_steps(
+            args.port, args.steps, args.actors, streaming, batch_size
+        )
+        num_steps = server.get_step_buffer_size()
+        assert num_steps == args.steps * args.actors
+
+        print(f"{mode:>15}: {num_steps / elapsed:10.1f} steps/s")
+
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from kiox.io import StorageProfile
+from kiox.kiox import Kiox
+from kiox.step import ArrayStepBuffer
+from kiox.transition_buffer import UnlimitedTransitionBuffer
+from kiox.transition_factory import FrameStackTransitionFactory
+
+PROFILES = {
+    "contiguous": StorageProfile(),
+    "chunk=1": StorageProfile(chunk_size=1),
+    "lzf,chunk=1": StorageProfile(compression="lzf", chunk_size=1),
+    "gzip,chunk=1": StorageProfile(
+        compression="gzip", chunk_size=1, shuffle=True
+    ),
+    "gzip,chunk=64": StorageProfile(
+        compression="gzip", chunk_size=64, shuffle=True
+    ),
+}
+
+
+def create_kiox(size):
+    return Kiox(
+        UnlimitedTransitionBuffer(use_table=True),
+        FrameStackTransitionFactory(4),
+        step_buffer=ArrayStepBuffer(size),
+        vectorized=True,
+    )
+
+
+def build_kiox(size):
+    kiox = create_kiox(size)
+    # frames with large flat regions like Atari screens
+    background = np.random.randint(4, size=(1, 84, 84), dtype=np.uint8) * 60
+    for i in range(size):
+        observation = background.copy()
+        x, y = np.random.randint(76, size=2)
+        observation[:, y : y + 8, x : x + 8] = 255
+        kiox.collect(
+            observation=observation,
+            action=np.random.randint(4),
+            reward=float(np.random.random()),
+            terminal=float(i % 1000 == 999),
+        )
+    return kiox
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=20000)
+    args = parser.parse_args()
+
+    kiox = build_kiox(args.size)
+
+    with tempfile.TemporaryDirectory() as dirname:
+        for name, profile in PROFILES.items():
+            path = os.path.join(dirname, "data.h5")
+
+            start = time.perf_counter()
+            with open(path, "wb") as f:
+                kiox.save(f, profile)
+            save_time = time.perf_counter() - start
+            file_size = os.path.getsize(path) / 1024**2
+
+            start = time.perf_counter()
+            with open(path, "rb") as f:
+                create_kiox(args.size).load(f)
+            load_time = time.perf_counter() - start
+
+            print(
+                f"{name:>14}: {file_size:8.2f} MB,"
+                f" save {save_time:.3f} s, load {load_time:.3f} s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,18 @@
 import dataclasses
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 
 import numpy as np
 
 from .item import StackedItem, stack_items
-from .step import StepBuffer
-from .transition_buffer import TransitionBuffer
+from .step import StepBuffer, VectorizedStepBuffer
+from .transition import Transition
+from .transition_buffer import (
+    IndexedTransitionBuffer,
+    PrioritizedTransitionBuffer,
+    TransitionBuffer,
+)
+from .transition_table import LazyTransitionBatch
 
 
 @dataclasses.dataclass(frozen=True)
@@ -20,6 +26,9 @@ class Batch:
         next_observations: next observation batch.
         terminals: terminal flag batch.
         durations: step duration batch.
+        indices: sampled transition indices.
+        weights: importance sampling weights. ``None`` unless transitions
+            are sampled from ``PrioritizedTransitionBuffer``.
 
     """
 
@@ -29,6 +38,8 @@ class Batch:
     next_observations: StackedItem
     terminals: np.ndarray
     durations: np.ndarray
+    indices: Optional[np.ndarray] = None
+    weights: Optional[np.ndarray] = None
 
 
 class BatchFactory:
@@ -38,70 +49,340 @@ class BatchFactory:
     objects. The batch creation is multi-threaded so that I/O bounded
     transition evaluation might be faster.
 
+    In vectorized mode, all indices are drawn at once and observations,
+    actions, rewards, terminals and durations are gathered with NumPy fancy
+    indexing without evaluating LazyTransition objects. This mode requires a
+    step buffer implementing ``VectorizedStepBuffer`` such as
+    ``ArrayStepBuffer`` and a transition buffer with ``use_table=True``.
+
+    Otherwise, any ``TransitionBuffer`` can be sampled. ``indices`` of the
+    mini-batch are available only with ``IndexedTransitionBuffer``.
+
+    Mini-batch can be written into preallocated arrays to avoid allocating
+    large arrays at every step. Pass a previously sampled batch as ``out``,
+    or set ``reuse_batch=True`` to let this class keep one internally.
+
+    .. code-block:: python
+
+        batch = batch_factory.sample(32)
+        # the following calls write into the arrays of the first batch
+        batch = batch_factory.sample(32, out=batch)
+
+    ``sample`` can be called from multiple threads at the same time unless
+    the threads share ``out`` or ``reuse_batch=True`` is set.
+
     Args:
         step_buffer: StepBuffer object.
         transition_buffer: TransitionBuffer object.
         max_pararellism: maximum number of threads.
+        vectorized: flag to enable vectorized sampling.
+        reuse_batch: flag to write every mini-batch into the same internal
+            arrays. The returned batch is overwritten by the next ``sample``
+            call.
 
     """
 
     _step_buffer: StepBuffer
     _transition_buffer: TransitionBuffer
     _max_pararellism: Optional[int]
+    _vectorized: bool
+    _reuse_batch: bool
+    _batch: Optional[Batch]
 
     def __init__(
         self,
         step_buffer: StepBuffer,
         transition_buffer: TransitionBuffer,
         max_pararellism: Optional[int] = None,
+        vectorized: bool = False,
+        reuse_batch: bool = False,
     ):
         self._step_buffer = step_buffer
         self._transition_buffer = transition_buffer
         self._max_pararellism = max_pararellism
+        self._vectorized = vectorized
+        self._reuse_batch = reuse_batch
+        self._batch = None
 
-    def sample(self, batch_size: int) -> Batch:
+    def sample(self, batch_size: int, out: Optional[Batch] = None) -> Batch:
         """Samples transitions and returns mini-batch.
 
         Args:
             batch_size: batch size.
+            out: mini-batch to write into. Shapes and dtypes must match the
+                mini-batch returned by a previous ``sample`` call.
 
         Returns:
-            mini-batch.
+            mini-batch. If ``out`` is given, this shares arrays with ``out``.
 
         """
+        if out is None and self._reuse_batch and self._batch is not None:
+            if self._batch.terminals.shape[0] == batch_size:
+                out = self._batch
+
+        if self._vectorized:
+            batch = self._sample_vectorized(batch_size, out)
+        else:
+            batch = self._sample_objects(batch_size, out)
+
+        if self._reuse_batch:
+            self._batch = batch
+        return batch
+
+    def _sample_objects(self, batch_size: int, out: Optional[Batch]) -> Batch:
+        transition_buffer = self._transition_buffer
+        indices: Optional[np.ndarray] = None
+
         # multithreading could speed up I/O bounded codes
         with ThreadPoolExecutor(max_workers=self._max_pararellism) as executor:
-            futures = [
-                executor.submit(
-                    self._transition_buffer.sample, self._step_buffer
-                )
-                for _ in range(batch_size)
+            if isinstance(transition_buffer, IndexedTransitionBuffer):
+                indices = transition_buffer.sample_indices(batch_size)
+                futures = [
+                    executor.submit(
+                        transition_buffer.get_by_index(int(index)).create,
+                        self._step_buffer,
+                    )
+                    for index in indices
+                ]
+            else:
+                futures = [
+                    executor.submit(transition_buffer.sample, self._step_buffer)
+                    for _ in range(batch_size)
+                ]
+            # keep sampled order to align with indices
+            transitions: List[Transition] = [
+                future.result() for future in futures
             ]
-            transitions = [future.result() for future in as_completed(futures)]
 
         # stack sampled data
         observations = stack_items(
-            [transition.observation for transition in transitions]
+            [transition.observation for transition in transitions],
+            out=None if out is None else out.observations,
         )
         next_observations = stack_items(
-            [transition.next_observation for transition in transitions]
+            [transition.next_observation for transition in transitions],
+            out=None if out is None else out.next_observations,
+        )
+        actions = stack_items(
+            [transition.action for transition in transitions],
+            out=None if out is None else out.actions,
+        )
+        rewards = stack_items(
+            [transition.reward for transition in transitions],
+            out=None if out is None else out.rewards,
         )
-        actions = stack_items([transition.action for transition in transitions])
-        rewards = stack_items([transition.reward for transition in transitions])
         terminals = np.array(
             [transition.terminal for transition in transitions],
             dtype=np.float32,
-        )
+        ).reshape([batch_size, 1])
         durations = np.array(
             [transition.duration for transition in transitions],
             dtype=np.float32,
+        ).reshape([batch_size, 1])
+        if out is not None:
+            np.copyto(out.terminals, terminals)
+            np.copyto(out.durations, durations)
+            terminals, durations = out.terminals, out.durations
+
+        return _create_batch(
+            out=out,
+            observations=observations,
+            actions=actions,
+            rewards=rewards,
+            next_observations=next_observations,
+            terminals=terminals,
+            durations=durations,
+            indices=indices,
+            weights=None if indices is None else self._compute_weights(indices),
         )
 
-        return Batch(
+    def _sample_vectorized(
+        self, batch_size: int, out: Optional[Batch]
+    ) -> Batch:
+        step_buffer = self._step_buffer
+        assert isinstance(
+            step_buffer, VectorizedStepBuffer
+        ), "vectorized sampling requires VectorizedStepBuffer"
+        transition_buffer = self._transition_buffer
+        assert isinstance(
+            transition_buffer, IndexedTransitionBuffer
+        ), "vectorized sampling requires IndexedTransitionBuffer"
+
+        indices = transition_buffer.sample_indices(batch_size)
+        lazy_batch = transition_buffer.gather(indices)
+        curr_idx = lazy_batch.curr_idx
+
+        if lazy_batch.prev_frames is None:
+            observations, next_observations = _gather_observations(
+                step_buffer, lazy_batch, out
+            )
+        else:
+            observations, next_observations = self._gather_stacked_observations(
+                step_buffer, lazy_batch, out
+            )
+
+        actions = step_buffer.gather_actions(
+            curr_idx, out=None if out is None else out.actions
+        )
+
+        if out is None:
+            rewards: StackedItem = lazy_batch.multi_step_rewards
+            terminals = step_buffer.gather_terminals(curr_idx).astype(
+                np.float32
+            )
+            durations = np.reshape(lazy_batch.durations, [batch_size, 1])
+            durations = durations.astype(np.float32)
+        else:
+            rewards = out.rewards
+            assert isinstance(rewards, np.ndarray)
+            np.copyto(rewards, lazy_batch.multi_step_rewards)
+            terminals = step_buffer.gather_terminals(curr_idx, out.terminals)
+            durations = out.durations
+            np.copyto(durations[:, 0], lazy_batch.durations)
+
+        return _create_batch(
+            out=out,
             observations=observations,
             actions=actions,
             rewards=rewards,
             next_observations=next_observations,
-            terminals=np.reshape(terminals, [batch_size, -1]),
-            durations=np.reshape(durations, [batch_size, -1]),
+            terminals=terminals,
+            durations=durations,
+            indices=indices,
+            weights=self._compute_weights(indices),
         )
+
+    def _gather_stacked_observations(
+        self,
+        step_buffer: VectorizedStepBuffer,
+        lazy_batch: LazyTransitionBatch,
+        out: Optional[Batch],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        assert lazy_batch.prev_frames is not None
+        curr_idx = lazy_batch.curr_idx
+        batch_size = curr_idx.shape[0]
+        n_frames = lazy_batch.n_frames
+        is_terminal = lazy_batch.next_idx < 0
+
+        # [prev_frames..., curr_idx, next_idx]
+        frame_idx = np.concatenate(
+            [
+                lazy_batch.prev_frames,
+                curr_idx[:, None],
+                lazy_batch.next_idx[:, None],
+            ],
+            axis=1,
+        )
+        is_padding = frame_idx < 0
+        safe_idx = np.where(is_padding, curr_idx[:, None], frame_idx)
+
+        # gather frames one by one through a contiguous buffer allocated per
+        # call so that concurrent calls do not share it
+        frame_buffer = step_buffer.gather_observations(safe_idx[:, 0])
+        assert isinstance(
+            frame_buffer, np.ndarray
+        ), "supports image only observations"
+        channels = frame_buffer.shape[1]
+
+        if out is None:
+            stacked_shape = (
+                batch_size,
+                n_frames * channels,
+                *frame_buffer.shape[2:],
+            )
+            observations = np.empty(stacked_shape, dtype=frame_buffer.dtype)
+            next_observations = np.empty_like(observations)
+        else:
+            assert isinstance(out.observations, np.ndarray)
+            assert isinstance(out.next_observations, np.ndarray)
+            observations = out.observations
+            next_observations = out.next_observations
+
+        for i in range(n_frames + 1):
+            if i > 0:
+                step_buffer.gather_observations(safe_idx[:, i], frame_buffer)
+            frame_buffer[is_padding[:, i]] = 0
+            if i < n_frames:
+                observations[:, i * channels : (i + 1) * channels] = (
+                    frame_buffer
+                )
+            else:
+                next_observations[:, -channels:] = frame_buffer
+
+        # next observations are observations shifted by one frame
+        next_observations[:, :-channels] = observations[:, channels:]
+        next_observations[is_terminal] = 0
+
+        return observations, next_observations
+
+    def _compute_weights(self, indices: np.ndarray) -> Optional[np.ndarray]:
+        if isinstance(self._transition_buffer, PrioritizedTransitionBuffer):
+            return self._transition_buffer.compute_weights(indices)
+        return None
+
+
+def _create_batch(
+    out: Optional[Batch],
+    observations: StackedItem,
+    actions: StackedItem,
+    rewards: StackedItem,
+    next_observations: StackedItem,
+    terminals: np.ndarray,
+    durations: np.ndarray,
+    indices: Optional[np.ndarray],
+    weights: Optional[np.ndarray],
+) -> Batch:
+    if out is not None:
+        # write small arrays as well when out has room for them
+        if (
+            indices is not None
+            and out.indices is not None
+            and out.indices.shape == indices.shape
+        ):
+            np.copyto(out.indices, indices)
+            indices = out.indices
+        if (
+            weights is not None
+            and out.weights is not None
+            and out.weights.shape == weights.shape
+        ):
+            np.copyto(out.weights, weights)
+            weights = out.weights
+        if out.indices is indices and out.weights is weights:
+            return out
+    return Batch(
+        observations=observations,
+        actions=actions,
+        rewards=rewards,
+        next_observations=next_observations,
+        terminals=terminals,
+        durations=durations,
+        indices=indices,
+        weights=weights,
+    )
+
+
+def _gather_observations(
+    step_buffer: VectorizedStepBuffer,
+    lazy_batch: LazyTransitionBatch,
+    out: Optional[Batch],
+) -> Tuple[StackedItem, StackedItem]:
+    curr_idx = lazy_batch.curr_idx
+    is_terminal = lazy_batch.next_idx < 0
+
+    observations = step_buffer.gather_observations(
+        curr_idx, out=None if out is None else out.observations
+    )
+
+    # terminal states refer to the current step and are zero-filled later
+    next_idx = np.where(is_terminal, curr_idx, lazy_batch.next_idx)
+    next_observations = step_buffer.gather_observations(
+        next_idx, out=None if out is None else out.next_observations
+    )
+    if isinstance(next_observations, np.ndarray):
+        next_observations[is_terminal] = 0
+    else:
+        for next_observation in next_observations:
+            next_observation[is_terminal] = 0
+
+    return observations, next_observations
@@ -0,0 +1,106 @@
+import zlib
+
+from typing_extensions import Protocol
+
+try:
+    import lz4.frame
+
+    _HAS_LZ4 = True
+except ImportError:
+    _HAS_LZ4 = False
+
+
+class Codec(Protocol):
+    """Codec class."""
+
+    def compress(self, data: bytes) -> bytes:
+        """Compresses bytes.
+
+        Args:
+            data: raw bytes.
+
+        Returns:
+            compressed bytes.
+
+        """
+        raise NotImplementedError
+
+    def decompress(self, data: bytes) -> bytes:
+        """Decompresses bytes.
+
+        Args:
+            data: compressed bytes.
+
+        Returns:
+            raw bytes.
+
+        """
+        raise NotImplementedError
+
+
+class ZlibCodec(Codec):
+    """ZlibCodec class.
+
+    This codec uses ``zlib`` in the standard library.
+
+    Args:
+        level: compression level from 0 to 9.
+
+    """
+
+    _level: int
+
+    def __init__(self, level: int = 1):
+        self._level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, self._level)
+
+    def decompress(self, data: bytes) -> bytes:
+        try:
+            return zlib.decompress(data)
+        except zlib.error as e:
+            raise ValueError(f"invalid zlib stream: {e}") from e
+
+
+class LZ4Codec(Codec):
+    """LZ4Codec class.
+
+    This codec requires ``lz4`` package.
+
+    Args:
+        level: compression level.
+
+    """
+
+    _level: int
+
+    def __init__(self, level: int = 0):
+        assert _HAS_LZ4, "lz4 package is required: pip install lz4"
+        self._level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(lz4.frame.compress(data, compression_level=self._level))
+
+    def decompress(self, data: bytes) -> bytes:
+        try:
+            return bytes(lz4.frame.decompress(data))
+        except RuntimeError as e:
+            raise ValueError(f"invalid lz4 stream: {e}") from e
+
+
+def create_codec(name: str) -> Codec:
+    """Returns Codec object by name.
+
+    Args:
+        name: codec name. ``zlib`` or ``lz4``.
+
+    Returns:
+        Codec object.
+
+    """
+    if name == "zlib":
+        return ZlibCodec()
+    if name == "lz4":
+        return LZ4Codec()
+    raise ValueError(f"invalid codec: {name}")
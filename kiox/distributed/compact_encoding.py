@@ -0,0 +1,290 @@
+from typing import List, Optional, Sequence, Tuple, cast
+
+import numpy as np
+
+from ..compression import Codec, create_codec
+from ..item import Item
+from .proto.step_pb2 import (
+    CompactStepProto,
+    CompactStreamProto,
+    Compression,
+    ItemSchema,
+    Shape,
+    StreamSchema,
+)
+from .shared_batch_factory import DTypeSpec
+from .utility import (
+    StepData,
+    convert_dtype_to_proto,
+    convert_item_to_arrays,
+    convert_proto_to_dtype,
+    split_dtypes,
+)
+
+_COMPRESSIONS = {
+    None: Compression.NONE,
+    "zlib": Compression.ZLIB,
+    "lz4": Compression.LZ4,
+}
+
+
+def _create_item_schema(arrays: Sequence[np.ndarray]) -> ItemSchema:
+    return ItemSchema(
+        shape=[Shape(dim=array.shape) for array in arrays],
+        dtype=[convert_dtype_to_proto(array.dtype) for array in arrays],
+    )
+
+
+def _create_codec(compression: int) -> Optional[Codec]:
+    if compression == Compression.NONE:
+        return None
+    if compression == Compression.ZLIB:
+        return create_codec("zlib")
+    if compression == Compression.LZ4:
+        return create_codec("lz4")
+    raise ValueError(f"invalid compression: {compression}")
+
+
+def _xor(data: bytes, prev_data: bytes) -> bytes:
+    return cast(
+        bytes,
+        np.bitwise_xor(
+            np.frombuffer(data, dtype=np.uint8),
+            np.frombuffer(prev_data, dtype=np.uint8),
+        ).tobytes(),
+    )
+
+
+class CompactStepEncoder:
+    """CompactStepEncoder class.
+
+    This class encodes steps of a single rollout stream in the schema-once
+    format. Shapes and dtypes are declared by the first message of the
+    stream, and each step carries only raw bytes. Observations can be
+    compressed, and XOR delta against the previous observation makes
+    consecutive image frames highly compressible.
+
+    Shapes and dtypes must not change during the stream.
+
+    Args:
+        rollout_id: rollout worker id.
+        compression: codec name to compress observations. ``zlib`` or
+            ``lz4``. If ``None``, observations are sent as raw bytes.
+        delta: flag to encode observations as XOR delta against the previous
+            observation.
+
+    """
+
+    _rollout_id: int
+    _compression: int
+    _codec: Optional[Codec]
+    _delta: bool
+    _schema: Optional[StreamSchema]
+    _signature: List[List[Tuple[Tuple[int, ...], np.dtype]]]
+    _is_schema_sent: bool
+    _prev_observation: List[bytes]
+
+    def __init__(
+        self,
+        rollout_id: int,
+        compression: Optional[str] = None,
+        delta: bool = False,
+    ):
+        if compression not in _COMPRESSIONS:
+            raise ValueError(f"invalid compression: {compression}")
+        self._rollout_id = rollout_id
+        self._compression = _COMPRESSIONS[compression]
+        self._codec = _create_codec(self._compression)
+        self._delta = delta
+        self._schema = None
+        self._signature = []
+        self._is_schema_sent = False
+        self._prev_observation = []
+
+    def encode(self, step_data: StepData) -> CompactStepProto:
+        """Encodes step into raw bytes.
+
+        Steps must be encoded in the order of the stream.
+
+        Args:
+            step_data: StepData object.
+
+        Returns:
+            protocol buffer compact step.
+
+        """
+        observation = convert_item_to_arrays(step_data.observation)
+        action = convert_item_to_arrays(step_data.action)
+        reward = convert_item_to_arrays(step_data.reward)
+        signature = [
+            [(array.shape, array.dtype) for array in arrays]
+            for arrays in (observation, action, reward)
+        ]
+        if self._schema is None:
+            self._schema = StreamSchema(
+                rollout_id=self._rollout_id,
+                observation=_create_item_schema(observation),
+                action=_create_item_schema(action),
+                reward=_create_item_schema(reward),
+                compression=self._compression,
+                delta=self._delta,
+            )
+            self._signature = signature
+        elif self._signature != signature:
+            raise ValueError("shapes and dtypes must not change in a stream.")
+
+        observation_data = [array.tobytes() for array in observation]
+        if self._delta:
+            raw_data = observation_data
+            if self._prev_observation:
+                observation_data = [
+                    _xor(data, prev_data)
+                    for data, prev_data in zip(
+                        observation_data, self._prev_observation
+                    )
+                ]
+            self._prev_observation = raw_data
+        if self._codec is not None:
+            codec = self._codec
+            observation_data = [codec.compress(d) for d in observation_data]
+
+        return CompactStepProto(
+            observation=observation_data,
+            action=[array.tobytes() for array in action],
+            reward=[array.tobytes() for array in reward],
+            terminal=step_data.terminal,
+            timeout=(
+                bool(step_data.terminal)
+                if step_data.timeout is None
+                else step_data.timeout
+            ),
+        )
+
+    def create_message(
+        self, steps: Sequence[CompactStepProto]
+    ) -> CompactStreamProto:
+        """Packs encoded steps into a stream message.
+
+        The first message of the stream carries the schema.
+
+        Args:
+            steps: encoded steps.
+
+        Returns:
+            protocol buffer stream message.
+
+        """
+        if self._is_schema_sent or self._schema is None:
+            return CompactStreamProto(steps=steps)
+        self._is_schema_sent = True
+        return CompactStreamProto(schema=self._schema, steps=steps)
+
+
+class CompactStepDecoder:
+    """CompactStepDecoder class.
+
+    This class decodes messages of a single rollout stream encoded by
+    ``CompactStepEncoder``. Uncompressed fields are decoded without copying
+    the received bytes unless they are cast to the given dtypes.
+
+    Args:
+        observation_dtype: dtype to cast observation to. If ``None``, the
+            sent dtype is kept.
+        action_dtype: dtype to cast action to.
+        reward_dtype: dtype to cast reward to.
+
+    """
+
+    _observation_dtype: Optional[DTypeSpec]
+    _action_dtype: Optional[DTypeSpec]
+    _reward_dtype: Optional[DTypeSpec]
+    _schema: Optional[StreamSchema]
+    _codec: Optional[Codec]
+    _prev_observation: List[bytes]
+
+    def __init__(
+        self,
+        observation_dtype: Optional[DTypeSpec] = None,
+        action_dtype: Optional[DTypeSpec] = None,
+        reward_dtype: Optional[DTypeSpec] = None,
+    ):
+        self._observation_dtype = observation_dtype
+        self._action_dtype = action_dtype
+        self._reward_dtype = reward_dtype
+        self._schema = None
+        self._codec = None
+        self._prev_observation = []
+
+    def decode(self, message: CompactStreamProto) -> Tuple[int, List[StepData]]:
+        """Decodes stream message.
+
+        Args:
+            message: protocol buffer stream message.
+
+        Returns:
+            tuple of rollout worker id and decoded steps.
+
+        """
+        if message.HasField("schema"):
+            self._schema = message.schema
+            self._codec = _create_codec(message.schema.compression)
+            self._prev_observation = []
+        if self._schema is None:
+            raise ValueError("schema must be sent first.")
+        schema = self._schema
+
+        steps = []
+        for step in message.steps:
+            observation_data = list(step.observation)
+            if self._codec is not None:
+                codec = self._codec
+                observation_data = [
+                    codec.decompress(d) for d in observation_data
+                ]
+            if schema.delta:
+                if self._prev_observation:
+                    observation_data = [
+                        _xor(data, prev_data)
+                        for data, prev_data in zip(
+                            observation_data, self._prev_observation
+                        )
+                    ]
+                self._prev_observation = observation_data
+            steps.append(
+                StepData(
+                    observation=_decode_item(
+                        schema.observation,
+                        observation_data,
+                        self._observation_dtype,
+                    ),
+                    action=_decode_item(
+                        schema.action, step.action, self._action_dtype
+                    ),
+                    reward=_decode_item(
+                        schema.reward, step.reward, self._reward_dtype
+                    ),
+                    terminal=step.terminal,
+                    timeout=step.timeout,
+                )
+            )
+        return schema.rollout_id, steps
+
+
+def _decode_item(
+    schema: ItemSchema, data: Sequence[bytes], dtype: Optional[DTypeSpec]
+) -> Item:
+    if len(data) != len(schema.shape):
+        raise ValueError("item does not match schema.")
+    dtypes = split_dtypes(dtype, len(data))
+    item = []
+    for shape, sent_dtype, el, el_dtype in zip(
+        schema.shape, schema.dtype, data, dtypes
+    ):
+        array = np.frombuffer(el, dtype=convert_proto_to_dtype(sent_dtype))
+        if el_dtype is not None:
+            # no copy if dtype is the same
+            array = array.astype(el_dtype, copy=False)
+        item.append(np.reshape(array, shape.dim))
+    if len(item) == 1:
+        return item[0]
+    return item
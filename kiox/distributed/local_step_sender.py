@@ -0,0 +1,247 @@
+from multiprocessing import Semaphore, synchronize
+from queue import Empty
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from ..item import Item
+from .shared_array import create_shared_array
+from .shared_batch_factory import DTypeSpec, create_shared_batch_array
+from .step_sender import StepSenderProtocol
+from .utility import StepData
+
+_FLAG_STEP = 0
+_FLAG_END = 1
+
+
+def _write_item(
+    array: Union[np.ndarray, Sequence[np.ndarray]], index: int, item: Item
+) -> None:
+    if isinstance(array, np.ndarray):
+        array[index] = np.reshape(item, array.shape[1:])
+    else:
+        assert isinstance(item, (list, tuple))
+        for el_array, el in zip(array, item):
+            el_array[index] = el
+
+
+def _read_item(
+    array: Union[np.ndarray, Sequence[np.ndarray]], index: int
+) -> Item:
+    # copy since the slot is reused by the next step
+    if isinstance(array, np.ndarray):
+        return array[index].copy()
+    return [el_array[index].copy() for el_array in array]
+
+
+class LocalStepChannel:
+    """LocalStepChannel class.
+
+    This class is a single-producer single-consumer ring buffer of steps in
+    shared memory for a rollout worker on the same host as ``KioxServer``.
+    Steps are copied into preallocated slots without serialization. The
+    producer blocks while all ``capacity`` slots are waiting to be drained.
+
+    The channel must be created before the processes are started and passed
+    to them as process arguments.
+
+    Args:
+        observation_shape: shape of observation.
+        action_shape: shape of action.
+        reward_shape: shape of reward.
+        capacity: number of slots.
+        observation_dtype: dtype of observation.
+        action_dtype: dtype of action.
+        reward_dtype: dtype of reward.
+
+    """
+
+    _capacity: int
+    _observations: Union[np.ndarray, Sequence[np.ndarray]]
+    _actions: Union[np.ndarray, Sequence[np.ndarray]]
+    _rewards: Union[np.ndarray, Sequence[np.ndarray]]
+    _terminals: np.ndarray
+    _timeouts: np.ndarray
+    _flags: np.ndarray
+    _counters: np.ndarray
+    _free: synchronize.Semaphore
+    _filled: synchronize.Semaphore
+    _drained: synchronize.Semaphore
+
+    def __init__(
+        self,
+        observation_shape: Union[Sequence[Sequence[int]], Sequence[int]],
+        action_shape: Union[Sequence[Sequence[int]], Sequence[int]],
+        reward_shape: Union[Sequence[Sequence[int]], Sequence[int]],
+        capacity: int = 64,
+        observation_dtype: DTypeSpec = np.float32,
+        action_dtype: DTypeSpec = np.float32,
+        reward_dtype: DTypeSpec = np.float32,
+    ):
+        assert capacity > 0, "capacity must be positive"
+        self._capacity = capacity
+        self._observations = create_shared_batch_array(
+            capacity, observation_shape, observation_dtype
+        )
+        self._actions = create_shared_batch_array(
+            capacity, action_shape, action_dtype
+        )
+        self._rewards = create_shared_batch_array(
+            capacity, reward_shape, reward_dtype
+        )
+        self._terminals = create_shared_array((capacity,), np.float32)
+        self._timeouts = create_shared_array((capacity,), np.uint8)
+        self._flags = create_shared_array((capacity,), np.uint8)
+        self._free = Semaphore(capacity)
+        self._filled = Semaphore(0)
+        self._drained = Semaphore(0)
+        # [head, tail] shared so that a restarted producer resumes the ring.
+        # each counter is only updated by one side.
+        self._counters = create_shared_array((2,), np.int64)
+
+    def put(self, step_data: StepData) -> None:
+        """Writes step into the next slot.
+
+        This method must be called only from the producer process.
+
+        Args:
+            step_data: StepData object.
+
+        """
+        self._free.acquire()
+        index = int(self._counters[0]) % self._capacity
+        _write_item(self._observations, index, step_data.observation)
+        _write_item(self._actions, index, step_data.action)
+        _write_item(self._rewards, index, step_data.reward)
+        self._terminals[index] = step_data.terminal
+        self._timeouts[index] = bool(step_data.timeout)
+        self._flags[index] = _FLAG_STEP
+        self._counters[0] += 1
+        self._filled.release()
+
+    def close(self) -> None:
+        """Waits until the consumer drains all written steps.
+
+        This method must be called only from the producer process. The
+        channel can be written again after this method returns.
+
+        """
+        self._free.acquire()
+        self._flags[int(self._counters[0]) % self._capacity] = _FLAG_END
+        self._counters[0] += 1
+        self._filled.release()
+        self._drained.acquire()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[StepData]:
+        """Reads step from the oldest slot.
+
+        This method must be called only from the consumer process.
+
+        Args:
+            timeout: seconds to wait for a step. If ``None``, this method
+                blocks until a step is written.
+
+        Returns:
+            StepData object. ``None`` if the producer has called ``close``.
+
+        Raises:
+            queue.Empty: if no step is written within ``timeout``.
+
+        """
+        if not self._filled.acquire(timeout=timeout):
+            raise Empty
+        index = int(self._counters[1]) % self._capacity
+        self._counters[1] += 1
+        if self._flags[index] == _FLAG_END:
+            self._free.release()
+            return None
+        step_data = StepData(
+            observation=_read_item(self._observations, index),
+            action=_read_item(self._actions, index),
+            reward=_read_item(self._rewards, index),
+            terminal=float(self._terminals[index]),
+            timeout=bool(self._timeouts[index]),
+        )
+        self._free.release()
+        return step_data
+
+    def notify_drained(self) -> None:
+        """Notifies the producer that steps before ``close`` are stored.
+
+        This method must be called only from the consumer process after
+        ``get`` returns ``None``.
+
+        """
+        self._drained.release()
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+
+class LocalStepSender(StepSenderProtocol):
+    """LocalStepSender class.
+
+    This class sends experience tuples to ``KioxServer`` on the same host
+    through shared memory instead of gRPC. This has the same interface as
+    ``StepSender`` so that rollout code does not depend on the transport.
+
+    .. code-block:: python
+
+        server = KioxServer(..., local_rollout_ids=[0])
+        server.start()
+
+        def rollout(sender):
+            ...
+            sender.collect(obs, action, reward, terminal)
+            ...
+            sender.stop()
+
+        # the sender must be passed as a process argument
+        p = Process(target=rollout, args=(server.get_local_sender(0),))
+        p.start()
+
+    Args:
+        channel: LocalStepChannel object drained by ``KioxServer``.
+
+    """
+
+    _channel: LocalStepChannel
+
+    def __init__(self, channel: LocalStepChannel):
+        self._channel = channel
+
+    def collect(
+        self,
+        observation: Item,
+        action: Item,
+        reward: Item,
+        terminal: Union[float, bool],
+        timeout: Optional[bool] = None,
+    ) -> None:
+        """Writes experience tuple to shared memory.
+
+        This blocks while the server is behind by ``capacity`` tuples.
+
+        Args:
+            observation: observation.
+            action: action.
+            reward: reward.
+            terminal: terminal flag.
+            timeout: timeout flag.
+
+        """
+        if not isinstance(terminal, float):
+            terminal = float(terminal)
+        step_data = StepData(
+            observation=observation,
+            action=action,
+            reward=reward,
+            terminal=terminal,
+            timeout=bool(terminal) if timeout is None else timeout,
+        )
+        self._channel.put(step_data)
+
+    def stop(self) -> None:
+        """Waits until the server stores all tuples."""
+        self._channel.close()
@@ -0,0 +1,75 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class ReadWriteLock:
+    """Reader-writer lock.
+
+    Multiple readers can hold this lock at the same time while a writer holds
+    it exclusively. Waiting writers block new readers so that writers are not
+    starved by continuous readers.
+
+    .. code-block:: python
+
+        lock = ReadWriteLock()
+
+        with lock.read():
+            # shared section
+            ...
+
+        with lock.write():
+            # exclusive section
+            ...
+
+    """
+
+    _condition: threading.Condition
+    _num_readers: int
+    _num_waiting_writers: int
+    _is_writing: bool
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition(threading.Lock())
+        self._num_readers = 0
+        self._num_waiting_writers = 0
+        self._is_writing = False
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """Acquires the lock as a reader."""
+        with self._condition:
+            while self._is_writing or self._num_waiting_writers:
+                self._condition.wait()
+            self._num_readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._num_readers -= 1
+                if self._num_readers == 0:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """Acquires the lock as a writer."""
+        with self._condition:
+            self._num_waiting_writers += 1
+            while self._is_writing or self._num_readers:
+                self._condition.wait()
+            self._num_waiting_writers -= 1
+            self._is_writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._is_writing = False
+                self._condition.notify_all()
+
+    @property
+    def num_readers(self) -> int:
+        return self._num_readers
+
+    @property
+    def is_writing(self) -> bool:
+        return self._is_writing
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# NO CHECKED-IN PROTOBUF GENCODE
+# source: step.proto
+# Protobuf Python Version: 7.35.1
+"""Generated protocol buffer code."""
+
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import runtime_version as _runtime_version
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+
+_runtime_version.ValidateProtobufRuntimeVersion(
+    _runtime_version.Domain.PUBLIC, 7, 35, 1, "", "step.proto"
+)
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(
+    b'\n\nstep.proto"\x14\n\x05Shape\x12\x0b\n\x03\x64im\x18\x01 \x03(\x05"\x8d\x01\n\tItemProto\x12\x0e\n\x06length\x18\x01 \x01(\x05\x12\x15\n\x05shape\x18\x02 \x03(\x0b\x32\x06.Shape\x12\x0c\n\x04\x64\x61ta\x18\x03 \x03(\x0c\x12\x15\n\x05\x64type\x18\x04 \x03(\x0e\x32\x06.DType\x12\x15\n\x0b\x66loat_value\x18\x05 \x01(\x01H\x00\x12\x13\n\tint_value\x18\x06 \x01(\x03H\x00\x42\x08\n\x06scalar"\xa2\x01\n\x0fTransitionProto\x12\x15\n\rcurr_position\x18\x01 \x01(\x05\x12\x15\n\rnext_position\x18\x02 \x01(\x05\x12%\n\x11multi_step_reward\x18\x03 \x01(\x0b\x32\n.ItemProto\x12\x10\n\x08\x64uration\x18\x04 \x01(\x05\x12\x16\n\x0eprev_positions\x18\x05 \x03(\x05\x12\x10\n\x08n_frames\x18\x06 \x01(\x05"\xdb\x01\n\tStepProto\x12\x1f\n\x0bobservation\x18\x01 \x01(\x0b\x32\n.ItemProto\x12\x1a\n\x06\x61\x63tion\x18\x02 \x01(\x0b\x32\n.ItemProto\x12\x1a\n\x06reward\x18\x03 \x01(\x0b\x32\n.ItemProto\x12\x10\n\x08terminal\x18\x04 \x01(\x02\x12\x0f\n\x07timeout\x18\x05 \x01(\x08\x12\x12\n\nrollout_id\x18\x06 \x01(\x05\x12%\n\x0btransitions\x18\x07 \x03(\x0b\x32\x10.TransitionProto\x12\x17\n\x0fhas_transitions\x18\x08 \x01(\x08"?\n\x0eStepBatchProto\x12\x19\n\x05steps\x18\x01 \x03(\x0b\x32\n.StepProto\x12\x12\n\nrollout_id\x18\x02 \x01(\x05".\n\tStepReply\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x11\n\tnum_steps\x18\x02 \x01(\x05"\'\n\x11\x44isconnectRequest\x12\x12\n\nrollout_id\x18\x01 \x01(\x05":\n\nItemSchema\x12\x15\n\x05shape\x18\x01 \x03(\x0b\x32\x06.Shape\x12\x15\n\x05\x64type\x18\x02 \x03(\x0e\x32\x06.DType"\xb0\x01\n\x0cStreamSchema\x12\x12\n\nrollout_id\x18\x01 \x01(\x05\x12 \n\x0bobservation\x18\x02 \x01(\x0b\x32\x0b.ItemSchema\x12\x1b\n\x06\x61\x63tion\x18\x03 \x01(\x0b\x32\x0b.ItemSchema\x12\x1b\n\x06reward\x18\x04 \x01(\x0b\x32\x0b.ItemSchema\x12!\n\x0b\x63ompression\x18\x05 \x01(\x0e\x32\x0c.Compression\x12\r\n\x05\x64\x65lta\x18\x06 \x01(\x08"j\n\x10\x43ompactStepProto\x12\x13\n\x0bobservation\x18\x01 \x03(\x0c\x12\x0e\n\x06\x61\x63tion\x18\x02 \x03(\x0c\x12\x0e\n\x06reward\x18\x03 \x03(\x0c\x12\x10\n\x08terminal\x18\x04 \x01(\x02\x12\x0f\n\x07timeout\x18\x05 \x01(\x08"U\n\x12\x43ompactStreamProto\x12\x1d\n\x06schema\x18\x01 \x01(\x0b\x32\r.StreamSchema\x12 \n\x05steps\x18\x02 \x03(\x0b\x32\x11.CompactStepProto"8\n\rSampleRequest\x12\x12\n\nbatch_size\x18\x01 \x01(\x05\x12\x13\n\x0bnum_batches\x18\x02 \x01(\x05"\xcd\x01\n\nBatchProto\x12 \n\x0cobservations\x18\x01 \x01(\x0b\x32\n.ItemProto\x12\x1b\n\x07\x61\x63tions\x18\x02 \x01(\x0b\x32\n.ItemProto\x12\x1b\n\x07rewards\x18\x03 \x01(\x0b\x32\n.ItemProto\x12%\n\x11next_observations\x18\x04 \x01(\x0b\x32\n.ItemProto\x12\x1d\n\tterminals\x18\x05 \x01(\x0b\x32\n.ItemProto\x12\x1d\n\tdurations\x18\x06 \x01(\x0b\x32\n.ItemProto*n\n\x05\x44Type\x12\t\n\x05UINT8\x10\x00\x12\t\n\x05INT32\x10\x01\x12\x0b\n\x07\x46LOAT32\x10\x02\x12\x0b\n\x07\x46LOAT16\x10\x03\x12\x0b\n\x07\x46LOAT64\x10\x04\x12\x08\n\x04INT8\x10\x05\x12\t\n\x05INT16\x10\x06\x12\t\n\x05INT64\x10\x07\x12\x08\n\x04\x42OOL\x10\x08**\n\x0b\x43ompression\x12\x08\n\x04NONE\x10\x00\x12\x08\n\x04ZLIB\x10\x01\x12\x07\n\x03LZ4\x10\x02\x32\xed\x02\n\x0bStepService\x12\x1e\n\x04Send\x12\n.StepProto\x1a\n.StepReply\x12&\n\nSendStream\x12\n.StepProto\x1a\n.StepReply(\x01\x12(\n\tSendBatch\x12\x0f.StepBatchProto\x1a\n.StepReply\x12\x30\n\x0fSendBatchStream\x12\x0f.StepBatchProto\x1a\n.StepReply(\x01\x12\x36\n\x11SendCompactStream\x12\x13.CompactStreamProto\x1a\n.StepReply(\x01\x12%\n\x06Sample\x12\x0e.SampleRequest\x1a\x0b.BatchProto\x12-\n\x0cSampleStream\x12\x0e.SampleRequest\x1a\x0b.BatchProto0\x01\x12,\n\nDisconnect\x12\x12.DisconnectRequest\x1a\n.StepReplyb\x06proto3'
+)
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, "step_pb2", _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+    DESCRIPTOR._loaded_options = None
+    _globals["_DTYPE"]._serialized_start = 1421
+    _globals["_DTYPE"]._serialized_end = 1531
+    _globals["_COMPRESSION"]._serialized_start = 1533
+    _globals["_COMPRESSION"]._serialized_end = 1575
+    _globals["_SHAPE"]._serialized_start = 14
+    _globals["_SHAPE"]._serialized_end = 34
+    _globals["_ITEMPROTO"]._serialized_start = 37
+    _globals["_ITEMPROTO"]._serialized_end = 178
+    _globals["_TRANSITIONPROTO"]._serialized_start = 181
+    _globals["_TRANSITIONPROTO"]._serialized_end = 343
+    _globals["_STEPPROTO"]._serialized_start = 346
+    _globals["_STEPPROTO"]._serialized_end = 565
+    _globals["_STEPBATCHPROTO"]._serialized_start = 567
+    _globals["_STEPBATCHPROTO"]._serialized_end = 630
+    _globals["_STEPREPLY"]._serialized_start = 632
+    _globals["_STEPREPLY"]._serialized_end = 678
+    _globals["_DISCONNECTREQUEST"]._serialized_start = 680
+    _globals["_DISCONNECTREQUEST"]._serialized_end = 719
+    _globals["_ITEMSCHEMA"]._serialized_start = 721
+    _globals["_ITEMSCHEMA"]._serialized_end = 779
+    _globals["_STREAMSCHEMA"]._serialized_start = 782
+    _globals["_STREAMSCHEMA"]._serialized_end = 958
+    _globals["_COMPACTSTEPPROTO"]._serialized_start = 960
+    _globals["_COMPACTSTEPPROTO"]._serialized_end = 1066
+    _globals["_COMPACTSTREAMPROTO"]._serialized_start = 1068
+    _globals["_COMPACTSTREAMPROTO"]._serialized_end = 1153
+    _globals["_SAMPLEREQUEST"]._serialized_start = 1155
+    _globals["_SAMPLEREQUEST"]._serialized_end = 1211
+    _globals["_BATCHPROTO"]._serialized_start = 1214
+    _globals["_BATCHPROTO"]._serialized_end = 1419
+    _globals["_STEPSERVICE"]._serialized_start = 1578
+    _globals["_STEPSERVICE"]._serialized_end = 1943
+# @@protoc_insertion_point(module_scope)
@@ -0,0 +1,436 @@
+# Generated by the gRPC Python protocol compiler plugin. DO NOT EDIT!
+"""Client and server classes corresponding to protobuf-defined services."""
+
+import warnings
+
+import grpc
+
+from . import step_pb2 as step__pb2
+
+GRPC_GENERATED_VERSION = "1.84.0"
+GRPC_VERSION = grpc.__version__
+_version_not_supported = False
+
+try:
+    from grpc._utilities import first_version_is_lower
+
+    _version_not_supported = first_version_is_lower(
+        GRPC_VERSION, GRPC_GENERATED_VERSION
+    )
+except ImportError:
+    _version_not_supported = True
+
+if _version_not_supported:
+    raise RuntimeError(
+        f"The grpc package installed is at version {GRPC_VERSION},"
+        + " but the generated code in step_pb2_grpc.py depends on"
+        + f" grpcio>={GRPC_GENERATED_VERSION}."
+        + f" Please upgrade your grpc module to grpcio>={GRPC_GENERATED_VERSION}"
+        + f" or downgrade your generated code using grpcio-tools<={GRPC_VERSION}."
+    )
+
+
+class StepServiceStub:
+    """Missing associated documentation comment in .proto file."""
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.Send = channel.unary_unary(
+            "/StepService/Send",
+            request_serializer=step__pb2.StepProto.SerializeToString,
+            response_deserializer=step__pb2.StepReply.FromString,
+            _registered_method=True,
+        )
+        self.SendStream = channel.stream_unary(
+            "/StepService/SendStream",
+            request_serializer=step__pb2.StepProto.SerializeToString,
+            response_deserializer=step__pb2.StepReply.FromString,
+            _registered_method=True,
+        )
+        self.SendBatch = channel.unary_unary(
+            "/StepService/SendBatch",
+            request_serializer=step__pb2.StepBatchProto.SerializeToString,
+            response_deserializer=step__pb2.StepReply.FromString,
+            _registered_method=True,
+        )
+        self.SendBatchStream = channel.stream_unary(
+            "/StepService/SendBatchStream",
+            request_serializer=step__pb2.StepBatchProto.SerializeToString,
+            response_deserializer=step__pb2.StepReply.FromString,
+            _registered_method=True,
+        )
+        self.SendCompactStream = channel.stream_unary(
+            "/StepService/SendCompactStream",
+            request_serializer=step__pb2.CompactStreamProto.SerializeToString,
+            response_deserializer=step__pb2.StepReply.FromString,
+            _registered_method=True,
+        )
+        self.Sample = channel.unary_unary(
+            "/StepService/Sample",
+            request_serializer=step__pb2.SampleRequest.SerializeToString,
+            response_deserializer=step__pb2.BatchProto.FromString,
+            _registered_method=True,
+        )
+        self.SampleStream = channel.unary_stream(
+            "/StepService/SampleStream",
+            request_serializer=step__pb2.SampleRequest.SerializeToString,
+            response_deserializer=step__pb2.BatchProto.FromString,
+            _registered_method=True,
+        )
+        self.Disconnect = channel.unary_unary(
+            "/StepService/Disconnect",
+            request_serializer=step__pb2.DisconnectRequest.SerializeToString,
+            response_deserializer=step__pb2.StepReply.FromString,
+            _registered_method=True,
+        )
+
+
+class StepServiceServicer:
+    """Missing associated documentation comment in .proto file."""
+
+    def Send(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def SendStream(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def SendBatch(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def SendBatchStream(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def SendCompactStream(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def Sample(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def SampleStream(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def Disconnect(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+
+def add_StepServiceServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+        "Send": grpc.unary_unary_rpc_method_handler(
+            servicer.Send,
+            request_deserializer=step__pb2.StepProto.FromString,
+            response_serializer=step__pb2.StepReply.SerializeToString,
+        ),
+        "SendStream": grpc.stream_unary_rpc_method_handler(
+            servicer.SendStream,
+            request_deserializer=step__pb2.StepProto.FromString,
+            response_serializer=step__pb2.StepReply.SerializeToString,
+        ),
+        "SendBatch": grpc.unary_unary_rpc_method_handler(
+            servicer.SendBatch,
+            request_deserializer=step__pb2.StepBatchProto.FromString,
+            response_serializer=step__pb2.StepReply.SerializeToString,
+        ),
+        "SendBatchStream": grpc.stream_unary_rpc_method_handler(
+            servicer.SendBatchStream,
+            request_deserializer=step__pb2.StepBatchProto.FromString,
+            response_serializer=step__pb2.StepReply.SerializeToString,
+        ),
+        "SendCompactStream": grpc.stream_unary_rpc_method_handler(
+            servicer.SendCompactStream,
+            request_deserializer=step__pb2.CompactStreamProto.FromString,
+            response_serializer=step__pb2.StepReply.SerializeToString,
+        ),
+        "Sample": grpc.unary_unary_rpc_method_handler(
+            servicer.Sample,
+            request_deserializer=step__pb2.SampleRequest.FromString,
+            response_serializer=step__pb2.BatchProto.SerializeToString,
+        ),
+        "SampleStream": grpc.unary_stream_rpc_method_handler(
+            servicer.SampleStream,
+            request_deserializer=step__pb2.SampleRequest.FromString,
+            response_serializer=step__pb2.BatchProto.SerializeToString,
+        ),
+        "Disconnect": grpc.unary_unary_rpc_method_handler(
+            servicer.Disconnect,
+            request_deserializer=step__pb2.DisconnectRequest.FromString,
+            response_serializer=step__pb2.StepReply.SerializeToString,
+        ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+        "StepService", rpc_method_handlers
+    )
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers("StepService", rpc_method_handlers)
+
+
+# This class is part of an EXPERIMENTAL API.
+class StepService:
+    """Missing associated documentation comment in .proto file."""
+
+    @staticmethod
+    def Send(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/StepService/Send",
+            step__pb2.StepProto.SerializeToString,
+            step__pb2.StepReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True,
+        )
+
+    @staticmethod
+    def SendStream(
+        request_iterator,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            "/StepService/SendStream",
+            step__pb2.StepProto.SerializeToString,
+            step__pb2.StepReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True,
+        )
+
+    @staticmethod
+    def SendBatch(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/StepService/SendBatch",
+            step__pb2.StepBatchProto.SerializeToString,
+            step__pb2.StepReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True,
+        )
+
+    @staticmethod
+    def SendBatchStream(
+        request_iterator,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            "/StepService/SendBatchStream",
+            step__pb2.StepBatchProto.SerializeToString,
+            step__pb2.StepReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True,
+        )
+
+    @staticmethod
+    def SendCompactStream(
+        request_iterator,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            "/StepService/SendCompactStream",
+            step__pb2.CompactStreamProto.SerializeToString,
+            step__pb2.StepReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True,
+        )
+
+    @staticmethod
+    def Sample(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/StepService/Sample",
+            step__pb2.SampleRequest.SerializeToString,
+            step__pb2.BatchProto.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True,
+        )
+
+    @staticmethod
+    def SampleStream(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            "/StepService/SampleStream",
+            step__pb2.SampleRequest.SerializeToString,
+            step__pb2.BatchProto.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True,
+        )
+
+    @staticmethod
+    def Disconnect(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/StepService/Disconnect",
+            step__pb2.DisconnectRequest.SerializeToString,
+            step__pb2.StepReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True,
+        )
@@ -0,0 +1,110 @@
+from queue import Queue
+from threading import Thread
+from typing import Any, Optional, Union
+
+import grpc
+
+from ..batch_factory import Batch
+from .proto.step_pb2 import SampleRequest
+from .proto.step_pb2_grpc import StepServiceStub
+from .utility import convert_proto_to_batch
+
+
+class RemoteSampler:
+    """RemoteSampler class.
+
+    This class pulls mini-batches from ``KioxServer`` over gRPC so that a
+    learner can run on a different node from the replay server.
+
+    If ``prefetch`` is larger than 0, mini-batches are received over a
+    single server-streaming call in a background thread and up to
+    ``prefetch`` mini-batches are kept ready. The streaming call occupies
+    one server thread until ``stop`` is called. If ``prefetch=0``, a unary
+    call is made per mini-batch.
+
+    .. code-block:: python
+
+        sampler = RemoteSampler("localhost", 8000, batch_size=32)
+
+        for _ in range(1000):
+            batch = sampler.sample()
+            train(batch)
+
+        sampler.stop()
+
+    Args:
+        host: host address.
+        port: port number.
+        batch_size: batch size.
+        prefetch: number of mini-batches to receive ahead of ``sample``.
+
+    """
+
+    _batch_size: int
+    _prefetch: int
+    _channel: grpc.Channel
+    _stub: StepServiceStub
+    _queue: "Queue[Union[Batch, grpc.RpcError]]"
+    _call: Optional[Any]
+    _thread: Optional[Thread]
+
+    def __init__(
+        self, host: str, port: int, batch_size: int, prefetch: int = 2
+    ):
+        assert batch_size > 0, "batch_size must be positive"
+        assert prefetch >= 0, "prefetch must be non-negative"
+        self._batch_size = batch_size
+        self._prefetch = prefetch
+        # mini-batches of images easily exceed the default 4MB limit
+        self._channel = grpc.insecure_channel(
+            f"{host}:{port}",
+            options=[("grpc.max_receive_message_length", -1)],
+        )
+        self._stub = StepServiceStub(self._channel)
+        self._queue = Queue(maxsize=max(prefetch, 1))
+        self._call = None
+        self._thread = None
+        if prefetch > 0:
+            self._call = self._stub.SampleStream(
+                SampleRequest(batch_size=batch_size, num_batches=0)
+            )
+            self._thread = Thread(target=self._loop_thread, daemon=True)
+            self._thread.start()
+
+    def sample(self) -> Batch:
+        """Returns mini-batch sampled by the server.
+
+        Returns:
+            mini-batch.
+
+        """
+        if self._thread is None:
+            request = SampleRequest(batch_size=self._batch_size)
+            return convert_proto_to_batch(self._stub.Sample(request))
+        batch = self._queue.get()
+        if isinstance(batch, grpc.RpcError):
+            # keep raising the same error at the following calls
+            self._queue.put(batch)
+            raise batch
+        return batch
+
+    def _loop_thread(self) -> None:
+        assert self._call is not None
+        try:
+            for proto in self._call:
+                self._queue.put(convert_proto_to_batch(proto))
+        except grpc.RpcError as e:
+            if e.code() != grpc.StatusCode.CANCELLED:
+                self._queue.put(e)
+
+    def stop(self) -> None:
+        """Stops receiving mini-batches and closes the channel."""
+        if self._call is not None:
+            self._call.cancel()
+        if self._thread is not None:
+            # unblock the thread waiting for a free slot
+            while self._thread.is_alive():
+                while not self._queue.empty():
+                    self._queue.get_nowait()
+                self._thread.join(timeout=0.01)
+        self._channel.close()
@@ -1,47 +1,249 @@
+import dataclasses
+import threading
+import time
+from collections import deque
 from concurrent import futures
+from contextlib import ExitStack, contextmanager
 from multiprocessing import Process, Queue
-from typing import Any, Callable, Dict, List, Sequence, Union
+from queue import Empty
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Union,
+)
 
 import grpc
+import numpy as np
 
 from kiox.distributed.proto.step_pb2_grpc import (
     StepServiceServicer,
     add_StepServiceServicer_to_server,
 )
 
-from ..batch_factory import Batch
+from ..batch_factory import Batch, BatchFactory
 from ..episode import Episode, EpisodeManager
-from ..io import dump_memory, load_memory
-from ..step import StepBuffer
+from ..io import StorageProfile, dump_memory, load_memory
+from ..step import PartialStep, StepBuffer, StripedStepBuffer
 from ..step_collector import StepCollector
+from ..transition import LazyTransition, Transition
 from ..transition_buffer import TransitionBuffer
 from ..transition_factory import TransitionFactory
-from .proto.step_pb2 import StepProto, StepReply
-from .shared_batch_factory import SharedBatchFactory
-from .utility import convert_proto_to_item
+from ..transition_table import LazyTransitionBatch
+from .compact_encoding import CompactStepDecoder
+from .local_step_sender import LocalStepChannel, LocalStepSender
+from .lock import ReadWriteLock
+from .proto.step_pb2 import (
+    BatchProto,
+    CompactStreamProto,
+    DisconnectRequest,
+    SampleRequest,
+    StepBatchProto,
+    StepProto,
+    StepReply,
+)
+from .shared_batch_factory import (
+    BatchSlot,
+    DTypeSpec,
+    SharedBatchFactory,
+    SharedBatchRing,
+)
+from .transition_builder import create_lazy_transition, has_valid_positions
+from .utility import (
+    StepData,
+    convert_batch_to_proto,
+    convert_proto_to_item,
+    convert_proto_to_transition,
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class RolloutStats:
+    """RolloutStats data class.
+
+    Args:
+        rollout_id: rollout worker id.
+        num_episodes: number of stored episodes including the active one.
+        num_steps: number of stored steps.
+        idle_time: seconds since the last step was received.
+
+    """
+
+    rollout_id: int
+    num_episodes: int
+    num_steps: int
+    idle_time: float
+
+
+class _Rollout:
+    """StepCollector of a single rollout worker and its lock.
+
+    A retired rollout no longer receives steps. It is kept until all of its
+    transitions are dropped from the shared TransitionBuffer because its
+    episodes are still sampled.
+
+    Args:
+        rollout_id: rollout worker id.
+
+    """
+
+    rollout_id: int
+    lock: threading.Lock
+    step_collector: StepCollector
+    last_seen: float
+    is_retired: bool
+
+    def __init__(self, rollout_id: int) -> None:
+        self.rollout_id = rollout_id
+        self.lock = threading.Lock()
+        self.last_seen = time.monotonic()
+        self.is_retired = False
+
+    @property
+    def episode_manager(self) -> EpisodeManager:
+        return self.step_collector.episode_manager
+
+
+class _WriteLockedTransitionBuffer(TransitionBuffer):
+    """TransitionBuffer wrapper for a single rollout worker.
+
+    Transitions are appended under the write side of the shared lock, and
+    the owner of each appended transition is recorded so that a dropped
+    transition can be routed to its owner without searching all rollout
+    workers.
+
+    Args:
+        transition_buffer: TransitionBuffer object shared by rollout workers.
+        lock: ReadWriteLock object shared with readers.
+        owners: mapping from ``curr_idx`` to the owner shared by rollout
+            workers.
+        owners_lock: lock to guard ``owners``.
+        owner: rollout worker appending transitions.
+
+    """
+
+    _transition_buffer: TransitionBuffer
+    _lock: ReadWriteLock
+    _owners: Dict[int, _Rollout]
+    _owners_lock: threading.Lock
+    _owner: _Rollout
+
+    def __init__(
+        self,
+        transition_buffer: TransitionBuffer,
+        lock: ReadWriteLock,
+        owners: Dict[int, _Rollout],
+        owners_lock: threading.Lock,
+        owner: _Rollout,
+    ) -> None:
+        self._transition_buffer = transition_buffer
+        self._lock = lock
+        self._owners = owners
+        self._owners_lock = owners_lock
+        self._owner = owner
+
+    def append(
+        self, lazy_transition: LazyTransition
+    ) -> Optional[LazyTransition]:
+        with self._lock.write():
+            with self._owners_lock:
+                self._owners[lazy_transition.curr_idx] = self._owner
+            return self._transition_buffer.append(lazy_transition)
+
+    def extend(self, lazy_batch: LazyTransitionBatch) -> np.ndarray:
+        curr_idx = lazy_batch.curr_idx.tolist()
+        with self._lock.write():
+            with self._owners_lock:
+                self._owners.update(dict.fromkeys(curr_idx, self._owner))
+            return self._transition_buffer.extend(lazy_batch)
+
+    def get_by_index(self, index: int) -> LazyTransition:
+        return self._transition_buffer.get_by_index(index)
+
+    def sample(self, step_buffer: StepBuffer) -> Transition:
+        return self._transition_buffer.sample(step_buffer)
+
+    def size(self) -> int:
+        return self._transition_buffer.size()
+
+    @property
+    def transitions(self) -> Sequence[LazyTransition]:
+        return self._transition_buffer.transitions
 
 
 class KioxStepServiceServicer(StepServiceServicer):  # type: ignore
     """KioxStepServiceServicer class.
 
-    This class is a gRPC endpoint to receive remote steps.
+    This class is a gRPC endpoint to receive remote steps and to send
+    mini-batches to remote learners. Concurrent calls are synchronized as
+    follows.
+
+    - Each rollout worker has its own StepCollector guarded by its own lock so
+      that calls from different rollout workers are stored in parallel while
+      steps from one rollout worker are kept in order.
+    - Steps are appended to a lock-striped StepBuffer.
+    - Transitions are appended to the shared TransitionBuffer under the write
+      side of a reader-writer lock. Sampling holds the read side so that it
+      never observes a half-appended transition.
+    - A transition dropped by the shared TransitionBuffer might belong to
+      another rollout worker. The owner of each transition is recorded when
+      it is appended, and dropped transitions are routed to the owner after
+      the caller releases its own lock so that no thread holds two rollout
+      locks at a time.
+    - Transitions built by a rollout worker with ``TransitionBuilder`` are
+      appended as they are, and multi-step returns are not computed again.
+    - A rollout worker idle for a while or disconnected explicitly is
+      retired. Its active episode is clipped and its StepCollector is
+      released once all of its transitions are dropped. Steps received later
+      with the same ``rollout_id`` start a new StepCollector.
+
+    Each streaming call occupies one gRPC worker thread until the client
+    closes it. If ``max_streams`` is given, streaming calls beyond the limit
+    are rejected with ``RESOURCE_EXHAUSTED`` instead of waiting for a free
+    thread forever.
 
     Args:
-        step_buffer: StepBuffer object.
+        step_buffer: StepBuffer object. This must be thread-safe such as
+            ``StripedStepBuffer``.
         transition_buffer: TransitionBuffer object.
         transition_factory: TransitionFactory object.
         n_steps: step size for multi-step learning. This corresponds to TD(N).
         gamma: discounted factor. If ``n_steps=1``, this value does not make
             any difference.
+        max_streams: maximum number of concurrent streaming calls. This
+            should be smaller than the number of gRPC worker threads so that
+            a thread is left to reject excess streams.
+        observation_dtype: dtype to store observation. Received bytes are
+            decoded directly into this dtype. If ``None``, the sent dtype is
+            kept.
+        action_dtype: dtype to store action.
+        reward_dtype: dtype to store reward.
 
     """
 
     _step_buffer: StepBuffer
     _transition_buffer: TransitionBuffer
     _transition_factory: TransitionFactory
-    _step_collectors: Dict[int, StepCollector]
+    _rollouts: Dict[int, _Rollout]
+    _retired_rollouts: Set[_Rollout]
     _n_steps: int
     _gamma: float
+    _rw_lock: ReadWriteLock
+    _collectors_lock: threading.Lock
+    _dropped_idx: Deque[int]
+    _transition_owners: Dict[int, _Rollout]
+    _owners_lock: threading.Lock
+    _stream_semaphore: Optional[threading.BoundedSemaphore]
+    _observation_dtype: Optional[DTypeSpec]
+    _action_dtype: Optional[DTypeSpec]
+    _reward_dtype: Optional[DTypeSpec]
 
     def __init__(
         self,
@@ -50,13 +252,31 @@ class KioxStepServiceServicer(StepServiceServicer):  # type: ignore
         transition_factory: TransitionFactory,
         n_steps: int = 1,
         gamma: float = 0.99,
+        max_streams: Optional[int] = None,
+        observation_dtype: Optional[DTypeSpec] = None,
+        action_dtype: Optional[DTypeSpec] = None,
+        reward_dtype: Optional[DTypeSpec] = None,
     ):
         self._step_buffer = step_buffer
         self._transition_buffer = transition_buffer
         self._transition_factory = transition_factory
-        self._step_collectors = {}
+        self._rollouts = {}
+        self._retired_rollouts = set()
         self._n_steps = n_steps
         self._gamma = gamma
+        self._rw_lock = ReadWriteLock()
+        self._collectors_lock = threading.Lock()
+        self._dropped_idx = deque()
+        self._transition_owners = {}
+        self._owners_lock = threading.Lock()
+        if max_streams is None:
+            self._stream_semaphore = None
+        else:
+            assert max_streams > 0, "max_streams must be positive"
+            self._stream_semaphore = threading.BoundedSemaphore(max_streams)
+        self._observation_dtype = observation_dtype
+        self._action_dtype = action_dtype
+        self._reward_dtype = reward_dtype
 
     def Send(self, request: StepProto, context: Any) -> StepReply:
         """gRPC endpooint for Send.
@@ -73,50 +293,492 @@ class KioxStepServiceServicer(StepServiceServicer):  # type: ignore
             protocol buffer reply.
 
         """
-        observation = convert_proto_to_item(request.observation)
-        action = convert_proto_to_item(request.action)
-        reward = convert_proto_to_item(request.reward)
-        timeout = request.timeout
-        rollout_id = request.rollout_id
+        error = self._collect(request.rollout_id, [request])
+        if error:
+            return StepReply(status=error)
+        return StepReply(status="success", num_steps=1)
 
-        if rollout_id < 0:
-            return StepReply(status="rollout_id must be positive integer.")
+    def SendStream(
+        self, request_iterator: Iterator[StepProto], context: Any
+    ) -> StepReply:
+        """gRPC endpoint for SendStream.
+
+        This endpoint receives a stream of experience tuples over a single
+        long-lived call so that rollout workers do not pay a round trip per
+        step. Each stream occupies one server thread until the client closes
+        it.
+
+        Args:
+            request_iterator: stream of protocol buffer steps.
+            context: context info.
+
+        Returns:
+            protocol buffer reply with the number of received steps.
+
+        """
+        num_steps = 0
+        with self._open_stream(context):
+            for request in request_iterator:
+                error = self._collect(request.rollout_id, [request])
+                if error:
+                    return StepReply(status=error, num_steps=num_steps)
+                num_steps += 1
+        return StepReply(status="success", num_steps=num_steps)
+
+    def SendBatch(self, request: StepBatchProto, context: Any) -> StepReply:
+        """gRPC endpoint for SendBatch.
+
+        This endpoint receives a batch of experience tuples from a single
+        rollout worker. The tuples are stored in order under one acquisition
+        of the rollout lock.
+
+        Args:
+            request: protocol buffer step batch.
+            context: context info.
+
+        Returns:
+            protocol buffer reply with the number of received steps.
+
+        """
+        error = self._collect(request.rollout_id, request.steps)
+        if error:
+            return StepReply(status=error)
+        return StepReply(status="success", num_steps=len(request.steps))
+
+    def SendBatchStream(
+        self, request_iterator: Iterator[StepBatchProto], context: Any
+    ) -> StepReply:
+        """gRPC endpoint for SendBatchStream.
 
-        if rollout_id not in self._step_collectors:
-            self.append_step_collector(rollout_id, self._step_buffer)
+        This endpoint receives a stream of step batches over a single
+        long-lived call.
 
-        self._step_collectors[rollout_id].collect(
-            observation=observation,
-            action=action,
-            reward=reward,
-            terminal=request.terminal,
+        Args:
+            request_iterator: stream of protocol buffer step batches.
+            context: context info.
+
+        Returns:
+            protocol buffer reply with the number of received steps.
+
+        """
+        num_steps = 0
+        with self._open_stream(context):
+            for request in request_iterator:
+                error = self._collect(request.rollout_id, request.steps)
+                if error:
+                    return StepReply(status=error, num_steps=num_steps)
+                num_steps += len(request.steps)
+        return StepReply(status="success", num_steps=num_steps)
+
+    def SendCompactStream(
+        self, request_iterator: Iterator[CompactStreamProto], context: Any
+    ) -> StepReply:
+        """gRPC endpoint for SendCompactStream.
+
+        This endpoint receives a stream of experience tuples in the
+        schema-once format. The first message declares ``rollout_id``,
+        shapes, dtypes and compression, and the following tuples carry only
+        raw bytes.
+
+        Args:
+            request_iterator: stream of protocol buffer compact messages.
+            context: context info.
+
+        Returns:
+            protocol buffer reply with the number of received steps.
+
+        """
+        num_steps = 0
+        decoder = CompactStepDecoder(
+            observation_dtype=self._observation_dtype,
+            action_dtype=self._action_dtype,
+            reward_dtype=self._reward_dtype,
         )
+        with self._open_stream(context):
+            for request in request_iterator:
+                try:
+                    rollout_id, steps = decoder.decode(request)
+                except ValueError as e:
+                    return StepReply(status=str(e), num_steps=num_steps)
+                if rollout_id < 0:
+                    return StepReply(
+                        status="rollout_id must be positive integer.",
+                        num_steps=num_steps,
+                    )
+                self.collect_steps(rollout_id, steps)
+                num_steps += len(steps)
+        return StepReply(status="success", num_steps=num_steps)
+
+    def Sample(self, request: SampleRequest, context: Any) -> BatchProto:
+        """gRPC endpoint for Sample.
+
+        This endpoint samples a mini-batch for a learner on another node.
+
+        Args:
+            request: protocol buffer sample request.
+            context: context info.
+
+        Returns:
+            protocol buffer mini-batch.
+
+        """
+        batch = self._sample_batch(request.batch_size, context)
+        return convert_batch_to_proto(batch)
+
+    def SampleStream(
+        self, request: SampleRequest, context: Any
+    ) -> Iterator[BatchProto]:
+        """gRPC endpoint for SampleStream.
+
+        This endpoint keeps sending mini-batches over a single long-lived
+        call. Flow control of gRPC pauses sampling while the client is not
+        consuming mini-batches.
 
-        if timeout:
-            self._step_collectors[rollout_id].clip_episode()
+        Args:
+            request: protocol buffer sample request. If ``num_batches`` is
+                ``0``, mini-batches are sent until the client cancels the
+                call.
+            context: context info.
+
+        Returns:
+            stream of protocol buffer mini-batches.
+
+        """
+        num_batches = 0
+        with self._open_stream(context):
+            while request.num_batches == 0 or num_batches < request.num_batches:
+                batch = self._sample_batch(request.batch_size, context)
+                yield convert_batch_to_proto(batch)
+                num_batches += 1
 
+    def Disconnect(self, request: DisconnectRequest, context: Any) -> StepReply:
+        """gRPC endpoint for Disconnect.
+
+        This endpoint retires the StepCollector of a rollout worker which
+        will not send steps anymore. The active episode is clipped.
+
+        Args:
+            request: protocol buffer disconnect request.
+            context: context info.
+
+        Returns:
+            protocol buffer reply.
+
+        """
+        with self._collectors_lock:
+            rollout = self._rollouts.get(request.rollout_id)
+            if rollout is None:
+                return StepReply(status="rollout_id is not connected.")
+            self._retire(rollout)
         return StepReply(status="success")
 
-    def append_step_collector(
-        self, rollout_id: int, step_buffer: StepBuffer
-    ) -> None:
-        """Creates StepCollector object for ``rollout_id``.
+    def _sample_batch(self, batch_size: int, context: Any) -> Batch:
+        if batch_size <= 0:
+            context.abort(
+                grpc.StatusCode.INVALID_ARGUMENT,
+                "batch_size must be positive integer.",
+            )
+        with self._rw_lock.read():
+            if self._transition_buffer.size() == 0:
+                context.abort(
+                    grpc.StatusCode.FAILED_PRECONDITION,
+                    "no transitions to sample.",
+                )
+            batch_factory = BatchFactory(
+                self._step_buffer, self._transition_buffer
+            )
+            return batch_factory.sample(batch_size)
+
+    @contextmanager
+    def _open_stream(self, context: Any) -> Iterator[None]:
+        semaphore = self._stream_semaphore
+        if semaphore is None:
+            yield
+            return
+        if not semaphore.acquire(blocking=False):
+            context.abort(
+                grpc.StatusCode.RESOURCE_EXHAUSTED,
+                "too many streaming rollout workers. increase max_workers.",
+            )
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def _collect(
+        self, rollout_id: int, requests: Sequence[StepProto]
+    ) -> Optional[str]:
+        if rollout_id < 0:
+            return "rollout_id must be positive integer."
+
+        # deserialize outside of the lock
+        steps = [
+            StepData(
+                observation=convert_proto_to_item(
+                    request.observation, self._observation_dtype
+                ),
+                action=convert_proto_to_item(
+                    request.action, self._action_dtype
+                ),
+                reward=convert_proto_to_item(
+                    request.reward, self._reward_dtype
+                ),
+                terminal=request.terminal,
+                timeout=request.timeout,
+                transitions=(
+                    [
+                        convert_proto_to_transition(t)
+                        for t in request.transitions
+                    ]
+                    if request.has_transitions
+                    else None
+                ),
+            )
+            for request in requests
+        ]
+        self.collect_steps(rollout_id, steps)
+
+        return None
+
+    def collect_steps(self, rollout_id: int, steps: Sequence[StepData]) -> None:
+        """Stores deserialized experience tuples of a rollout worker.
+
+        This is the common path of the gRPC endpoints and is also used to
+        store steps received through shared memory.
 
         Args:
             rollout_id: rollout worker id.
-            step_buffer: StepBuffer object.
+            steps: experience tuples in order.
 
         """
-        assert rollout_id not in self._step_collectors
+        with self._lock_rollout(rollout_id) as rollout:
+            step_collector = rollout.step_collector
+            for step in steps:
+                if step.transitions is None:
+                    step_collector.collect(
+                        observation=step.observation,
+                        action=step.action,
+                        reward=step.reward,
+                        terminal=step.terminal,
+                    )
+                else:
+                    self._append_built_transitions(step_collector, step)
+                if step.timeout:
+                    step_collector.clip_episode()
+            rollout.last_seen = time.monotonic()
+        self._route_dropped_transitions()
+
+    @staticmethod
+    def _append_built_transitions(
+        step_collector: StepCollector, step: StepData
+    ) -> None:
+        # transitions are built by the rollout worker
+        assert step.transitions is not None
+        episode_manager = step_collector.episode_manager
+        episode_manager.append_step(
+            PartialStep(
+                observation=step.observation,
+                action=step.action,
+                reward=step.reward,
+                terminal=step.terminal,
+            )
+        )
+        episode = episode_manager.active_episode
+        # positions do not match if the episode was clipped by eviction,
+        # Disconnect or restart. transitions are dropped until the rollout
+        # worker starts a new episode.
+        if has_valid_positions(episode, step.transitions):
+            for transition in step.transitions:
+                episode_manager.append_transition(
+                    create_lazy_transition(episode, transition)
+                )
+        if step.terminal:
+            step_collector.clip_episode()
+
+    @contextmanager
+    def _lock_rollout(self, rollout_id: int) -> Iterator[_Rollout]:
+        while True:
+            with self._collectors_lock:
+                rollout = self._rollouts.get(rollout_id)
+                if rollout is None:
+                    rollout = self._create_rollout(
+                        rollout_id, self._step_buffer
+                    )
+            with rollout.lock:
+                # retired while waiting for the lock
+                if rollout.is_retired:
+                    continue
+                yield rollout
+                return
+
+    def _create_rollout(
+        self, rollout_id: int, step_buffer: StepBuffer
+    ) -> _Rollout:
+        rollout = _Rollout(rollout_id)
         episode_manager = EpisodeManager(
-            step_buffer=step_buffer, transition_buffer=self._transition_buffer
+            step_buffer=step_buffer,
+            transition_buffer=_WriteLockedTransitionBuffer(
+                transition_buffer=self._transition_buffer,
+                lock=self._rw_lock,
+                owners=self._transition_owners,
+                owners_lock=self._owners_lock,
+                owner=rollout,
+            ),
+            drop_handler=self._dropped_idx.append,
         )
-        self._step_collectors[rollout_id] = StepCollector(
+        rollout.step_collector = StepCollector(
             episode_manager=episode_manager,
             transition_factory=self._transition_factory,
             n_steps=self._n_steps,
             gamma=self._gamma,
         )
+        self._rollouts[rollout_id] = rollout
+        return rollout
+
+    def _retire(self, rollout: _Rollout) -> None:
+        # this must be called with collectors lock
+        with rollout.lock:
+            rollout.step_collector.clip_episode()
+            rollout.is_retired = True
+            is_empty = rollout.episode_manager.get_total_step_size() == 0
+        del self._rollouts[rollout.rollout_id]
+        if not is_empty:
+            self._retired_rollouts.add(rollout)
+
+    def _route_dropped_transitions(self) -> None:
+        while self._dropped_idx:
+            try:
+                curr_idx = self._dropped_idx.popleft()
+            except IndexError:
+                # drained by another thread
+                break
+            with self._owners_lock:
+                rollout = self._transition_owners.pop(curr_idx)
+            with rollout.lock:
+                rollout.episode_manager.drop_transition(curr_idx)
+                is_empty = rollout.episode_manager.get_total_step_size() == 0
+            if rollout.is_retired and is_empty:
+                with self._collectors_lock:
+                    self._retired_rollouts.discard(rollout)
+
+    def evict_idle_rollouts(self, idle_timeout: float) -> List[int]:
+        """Retires rollout workers which have not sent steps for a while.
+
+        The active episode of each retired rollout worker is clipped. The
+        StepCollector for ``load`` is never retired.
+
+        Args:
+            idle_timeout: seconds without steps to retire a rollout worker.
+
+        Returns:
+            list of retired rollout worker ids.
+
+        """
+        evicted = []
+        with self._collectors_lock:
+            now = time.monotonic()
+            for rollout in list(self._rollouts.values()):
+                if rollout.rollout_id < 0:
+                    continue
+                if now - rollout.last_seen < idle_timeout:
+                    continue
+                self._retire(rollout)
+                evicted.append(rollout.rollout_id)
+        return evicted
+
+    def rollout_stats(self) -> List[RolloutStats]:
+        """Returns statistics of rollout workers which are not retired.
+
+        Returns:
+            list of RolloutStats objects.
+
+        """
+        stats = []
+        with self._collectors_lock:
+            rollouts = list(self._rollouts.values())
+        for rollout in rollouts:
+            with rollout.lock:
+                episode_manager = rollout.episode_manager
+                stats.append(
+                    RolloutStats(
+                        rollout_id=rollout.rollout_id,
+                        num_episodes=len(episode_manager.episodes),
+                        num_steps=episode_manager.get_total_step_size(),
+                        idle_time=time.monotonic() - rollout.last_seen,
+                    )
+                )
+        return stats
+
+    @contextmanager
+    def pause(self) -> Iterator[None]:
+        """Blocks storing steps from all rollout workers.
+
+        Steps, episodes and transitions are not modified in this context.
+
+        """
+        with ExitStack() as stack:
+            stack.enter_context(self._collectors_lock)
+            for rollout in self._all_rollouts():
+                stack.enter_context(rollout.lock)
+            yield
+
+    def _all_rollouts(self) -> List[_Rollout]:
+        # this must be called with collectors lock
+        rollouts = sorted(self._rollouts.values(), key=lambda r: r.rollout_id)
+        return rollouts + list(self._retired_rollouts)
+
+    def sample(self, batch_factory: SharedBatchFactory) -> None:
+        """Samples mini-batch into SharedBatchFactory.
+
+        Transitions can be appended by rollout workers except while sampling.
+
+        Args:
+            batch_factory: SharedBatchFactory object.
+
+        """
+        with self._rw_lock.read():
+            batch_factory.sample(self._step_buffer, self._transition_buffer)
+
+    def save(
+        self, f: BinaryIO, profile: Optional[StorageProfile] = None
+    ) -> None:
+        """Saves episodes of all rollout workers as HDF5.
+
+        Args:
+            f: file object.
+            profile: StorageProfile object.
+
+        """
+        with self.pause():
+            episodes: List[Episode] = []
+            for rollout in self._all_rollouts():
+                episodes.extend(rollout.episode_manager.episodes)
+            dump_memory(f, episodes, profile=profile)
+
+    def load(self, f: BinaryIO) -> None:
+        """Loads HDF5 data into a special StepCollector.
+
+        Args:
+            f: file object.
+
+        """
+        with self._lock_rollout(-1) as rollout:
+            load_memory(f, rollout.step_collector)
+        self._route_dropped_transitions()
+
+    def append_step_collector(
+        self, rollout_id: int, step_buffer: StepBuffer
+    ) -> None:
+        """Creates StepCollector object for ``rollout_id``.
+
+        Args:
+            rollout_id: rollout worker id.
+            step_buffer: StepBuffer object.
+
+        """
+        with self._collectors_lock:
+            assert rollout_id not in self._rollouts
+            self._create_rollout(rollout_id, step_buffer)
 
     def get_step_collector_by_rollout_id(
         self, rollout_id: int
@@ -130,7 +792,7 @@ class KioxStepServiceServicer(StepServiceServicer):  # type: ignore
             StepCollector object.
 
         """
-        return self._step_collectors[rollout_id]
+        return self._rollouts[rollout_id].step_collector
 
     def has_step_collector(self, rollout_id: int) -> bool:
         """Returns if StepCollector object exists for ``rollout_id``.
@@ -142,11 +804,13 @@ class KioxStepServiceServicer(StepServiceServicer):  # type: ignore
             ``True`` if StepCollector exists for ``rollout_id``.
 
         """
-        return rollout_id in self._step_collectors
+        return rollout_id in self._rollouts
 
     @property
     def episode_managers(self) -> Sequence[EpisodeManager]:
-        return [sc.episode_manager for sc in self._step_collectors.values()]
+        with self._collectors_lock:
+            rollouts = self._all_rollouts()
+        return [rollout.episode_manager for rollout in rollouts]
 
 
 ACK_START = "start"
@@ -160,19 +824,76 @@ COMMAND_GET_STEP_LEN = "get_step_len"
 COMMAND_GET_TRANSITION_LEN = "get_transition_len"
 COMMAND_SAVE = "save"
 COMMAND_LOAD = "load"
+COMMAND_GET_ROLLOUT_STATS = "get_rollout_stats"
+
+
+def _fill_batch_ring(
+    servicer: KioxStepServiceServicer,
+    transition_buffer: TransitionBuffer,
+    batch_ring: SharedBatchRing,
+    stop_event: threading.Event,
+) -> None:
+    while not stop_event.is_set():
+        if transition_buffer.size() == 0:
+            stop_event.wait(0.01)
+            continue
+        batch_ring.fill(servicer.sample, timeout=0.1)
+
+
+def _evict_idle_rollouts(
+    servicer: KioxStepServiceServicer,
+    idle_timeout: float,
+    stop_event: threading.Event,
+) -> None:
+    # idle rollout workers are retired within 1.5 * idle_timeout
+    while not stop_event.wait(idle_timeout / 2):
+        servicer.evict_idle_rollouts(idle_timeout)
+
+
+def _drain_local_channel(
+    servicer: KioxStepServiceServicer,
+    rollout_id: int,
+    channel: LocalStepChannel,
+    stop_event: threading.Event,
+) -> None:
+    while not stop_event.is_set():
+        # wait for the first step and take what is already written
+        steps: List[StepData] = []
+        is_closed = False
+        timeout: Optional[float] = 0.1
+        while len(steps) < channel.capacity:
+            try:
+                step = channel.get(timeout=timeout)
+            except Empty:
+                break
+            if step is None:
+                is_closed = True
+                break
+            steps.append(step)
+            timeout = 0.0
+        if steps:
+            servicer.collect_steps(rollout_id, steps)
+        if is_closed:
+            channel.notify_drained()
 
 
 def kiox_server_process(
     host: str,
     port: int,
     batch_factory: SharedBatchFactory,
-    command_queue: "Queue[str]",
-    ack_queue: "Queue[str]",
+    command_queue: "Queue[Any]",
+    ack_queue: "Queue[Any]",
     transition_buffer_builder: Callable[[], TransitionBuffer],
     transition_factory_builder: Callable[[], TransitionFactory],
     max_workers: int = 10,
     n_steps: int = 1,
     gamma: float = 0.99,
+    batch_ring: Optional[SharedBatchRing] = None,
+    local_channels: Optional[Dict[int, LocalStepChannel]] = None,
+    observation_dtype: Optional[DTypeSpec] = None,
+    action_dtype: Optional[DTypeSpec] = None,
+    reward_dtype: Optional[DTypeSpec] = None,
+    idle_timeout: Optional[float] = None,
 ) -> None:
     """Child process for server loop.
 
@@ -184,13 +905,23 @@ def kiox_server_process(
         ack_queue: queue from child process.
         transition_buffer_builder: function to build TransitionBuffer object.
         transition_factory_builder: function to build TransitionFactory object.
-        max_workers: maximum number of threads for gRPC.
+        max_workers: maximum number of threads for gRPC. Each streaming
+            rollout worker occupies one thread and one thread is reserved to
+            reject excess streams.
         n_steps: step size for multi-step learning. This corresponds to TD(N).
         gamma: discounted factor. If ``n_steps=1``, this value does not make
             any difference.
+        batch_ring: SharedBatchRing object to keep filled in background.
+        local_channels: LocalStepChannel objects for rollout workers on the
+            same host.
+        observation_dtype: dtype to store observation.
+        action_dtype: dtype to store action.
+        reward_dtype: dtype to store reward.
+        idle_timeout: seconds without steps to retire a rollout worker. If
+            ``None``, rollout workers are retired only by ``Disconnect``.
 
     """
-    step_buffer = StepBuffer()
+    step_buffer = StripedStepBuffer()
     transition_buffer = transition_buffer_builder()
     transition_factory = transition_factory_builder()
 
@@ -201,11 +932,48 @@ def kiox_server_process(
         transition_factory=transition_factory,
         n_steps=n_steps,
         gamma=gamma,
+        max_streams=max(max_workers - 1, 1),
+        observation_dtype=observation_dtype,
+        action_dtype=action_dtype,
+        reward_dtype=reward_dtype,
     )
     add_StepServiceServicer_to_server(servicer, server)
     server.add_insecure_port(f"{host}:{port}")
     server.start()
 
+    # keep mini-batch slots filled
+    stop_event = threading.Event()
+    filler: Optional[threading.Thread] = None
+    if batch_ring is not None:
+        filler = threading.Thread(
+            target=_fill_batch_ring,
+            args=(servicer, transition_buffer, batch_ring, stop_event),
+            daemon=True,
+        )
+        filler.start()
+
+    # drain steps from rollout workers on the same host
+    drainers = []
+    if local_channels is not None:
+        for rollout_id, channel in local_channels.items():
+            drainer = threading.Thread(
+                target=_drain_local_channel,
+                args=(servicer, rollout_id, channel, stop_event),
+                daemon=True,
+            )
+            drainer.start()
+            drainers.append(drainer)
+
+    # retire idle rollout workers
+    evictor: Optional[threading.Thread] = None
+    if idle_timeout is not None:
+        evictor = threading.Thread(
+            target=_evict_idle_rollouts,
+            args=(servicer, idle_timeout, stop_event),
+            daemon=True,
+        )
+        evictor.start()
+
     # return ack
     ack_queue.put(ACK_START)
 
@@ -219,32 +987,40 @@ def kiox_server_process(
             ack_queue.put(str(transition_buffer.size()))
         elif command == COMMAND_SAVE:
             path = command_queue.get()
-            episodes: List[Episode] = []
-            for episode_manager in servicer.episode_managers:
-                episodes.extend(episode_manager.episodes)
+            profile = command_queue.get()
             with open(path, "wb") as f:
-                dump_memory(f, episodes)
+                servicer.save(f, profile)
             ack_queue.put(ACK_SAVED)
         elif command == COMMAND_LOAD:
             path = command_queue.get()
             with open(path, "rb") as f:
-                # create a special StepCollector
-                if not servicer.has_step_collector(-1):
-                    servicer.append_step_collector(-1, step_buffer)
-                load_memory(f, servicer.get_step_collector_by_rollout_id(-1))
+                servicer.load(f)
             ack_queue.put(ACK_LOADED)
         elif command == COMMAND_SAMPLE:
-            batch_factory.sample(step_buffer, transition_buffer)
+            servicer.sample(batch_factory)
             ack_queue.put(ACK_SAMPLED)
+        elif command == COMMAND_GET_ROLLOUT_STATS:
+            ack_queue.put(servicer.rollout_stats())
         else:
             raise ValueError(f"invalid command: {command}")
 
+    stop_event.set()
+    if filler is not None:
+        filler.join()
+    for drainer in drainers:
+        drainer.join()
+    if evictor is not None:
+        evictor.join()
     server.stop(0)
 
     # return ack
     ack_queue.put(ACK_ENDED)
 
 
+def _or_float32(dtype: Optional[DTypeSpec]) -> DTypeSpec:
+    return np.float32 if dtype is None else dtype
+
+
 class KioxServer:
     """KioxServer class.
 
@@ -293,6 +1069,15 @@ class KioxServer:
         batch = server.sample()
         assert batch.observations.shape == (32, 4)
 
+        # with num_batch_slots > 0, mini-batches are sampled in background
+        slot = server.acquire_batch()
+        train(slot.batch)
+        server.release_batch(slot)
+
+        # rollout workers on the same host can send steps through shared
+        # memory with local_rollout_ids=[...]
+        p = Process(target=rollout, args=(server.get_local_sender(2),))
+
         # save data
         server.save("data.h5")
 
@@ -319,17 +1104,41 @@ class KioxServer:
         batch_size: batch size.
         transition_buffer_builder: function to build TransitionBuffer object.
         transition_factory_builder: function to build TransitionFactory object.
-        max_workers: maximum number of workers for gRPC.
+        max_workers: maximum number of workers for gRPC. Each streaming
+            rollout worker occupies one worker, and up to ``max_workers - 1``
+            streaming rollout workers can be connected at a time.
         n_steps: step size for multi-step learning. This corresponds to TD(N).
         gamma: discounted factor. If ``n_steps=1``, this value does not make
             any difference.
+        num_batch_slots: number of mini-batch slots filled by the server
+            process in background. If ``0``, ``acquire_batch`` is disabled.
+        observation_dtype: dtype of observation. Received observations are
+            stored in this dtype and mini-batches are sampled in this dtype.
+            This should match the dtype sent by rollout workers, e.g.
+            ``np.uint8`` for images, so that observations are not widened.
+            If ``None``, received observations are stored as sent and
+            mini-batches are float32.
+        action_dtype: dtype of action.
+        reward_dtype: dtype of reward.
+        local_rollout_ids: ids of rollout workers on the same host. Each of
+            them sends steps through a shared memory channel without
+            serialization.
+        local_channel_capacity: number of steps buffered in each shared
+            memory channel.
+        idle_timeout: seconds without steps to retire a rollout worker. The
+            active episode of a retired rollout worker is clipped, and its
+            StepCollector is released once its transitions are dropped. If
+            ``None``, rollout workers are retired only when ``StepSender``
+            is stopped with ``disconnect=True``.
 
     """
 
     _batch_factory: SharedBatchFactory
+    _batch_ring: Optional[SharedBatchRing]
+    _local_channels: Dict[int, LocalStepChannel]
     _process: Process
-    _command_queue: "Queue[str]"
-    _ack_queue: "Queue[str]"
+    _command_queue: "Queue[Any]"
+    _ack_queue: "Queue[Any]"
 
     def __init__(
         self,
@@ -344,13 +1153,51 @@ class KioxServer:
         max_workers: int = 10,
         n_steps: int = 1,
         gamma: float = 0.99,
+        num_batch_slots: int = 0,
+        observation_dtype: Optional[DTypeSpec] = None,
+        action_dtype: Optional[DTypeSpec] = None,
+        reward_dtype: Optional[DTypeSpec] = None,
+        local_rollout_ids: Sequence[int] = (),
+        local_channel_capacity: int = 64,
+        idle_timeout: Optional[float] = None,
     ) -> None:
+        # mini-batches are float32 unless dtypes are given
+        batch_dtypes: Dict[str, DTypeSpec] = {
+            "observation_dtype": _or_float32(observation_dtype),
+            "action_dtype": _or_float32(action_dtype),
+            "reward_dtype": _or_float32(reward_dtype),
+        }
         self._batch_factory = SharedBatchFactory(
             observation_shape=observation_shape,
             action_shape=action_shape,
             reward_shape=reward_shape,
             batch_size=batch_size,
+            **batch_dtypes,
         )
+        if num_batch_slots > 0:
+            self._batch_ring = SharedBatchRing(
+                observation_shape=observation_shape,
+                action_shape=action_shape,
+                reward_shape=reward_shape,
+                batch_size=batch_size,
+                num_slots=num_batch_slots,
+                **batch_dtypes,
+            )
+        else:
+            self._batch_ring = None
+        self._local_channels = {
+            rollout_id: LocalStepChannel(
+                observation_shape=observation_shape,
+                action_shape=action_shape,
+                reward_shape=reward_shape,
+                capacity=local_channel_capacity,
+                **batch_dtypes,
+            )
+            for rollout_id in local_rollout_ids
+        }
+        assert (
+            idle_timeout is None or idle_timeout > 0
+        ), "idle_timeout must be positive"
         self._command_queue = Queue()
         self._ack_queue = Queue()
         self._process = Process(
@@ -366,6 +1213,12 @@ class KioxServer:
                 max_workers,
                 n_steps,
                 gamma,
+                self._batch_ring,
+                self._local_channels,
+                observation_dtype,
+                action_dtype,
+                reward_dtype,
+                idle_timeout,
             ),
             daemon=True,
         )
@@ -400,6 +1253,17 @@ class KioxServer:
         self._command_queue.put(COMMAND_GET_TRANSITION_LEN)
         return int(self._ack_queue.get())
 
+    def get_rollout_stats(self) -> List[RolloutStats]:
+        """Returns statistics of connected rollout workers.
+
+        Returns:
+            list of RolloutStats objects.
+
+        """
+        self._command_queue.put(COMMAND_GET_ROLLOUT_STATS)
+        stats: List[RolloutStats] = self._ack_queue.get()
+        return stats
+
     def sample(self) -> Batch:
         """Samples transitions and returns mini-batch.
 
@@ -411,15 +1275,63 @@ class KioxServer:
         self._ack_queue.get()
         return self._batch_factory.batch
 
-    def save(self, path: str) -> None:
+    def acquire_batch(self, timeout: Optional[float] = None) -> BatchSlot:
+        """Returns mini-batch sampled in background.
+
+        The mini-batch is not overwritten until ``release_batch`` is called.
+        This method requires ``num_batch_slots > 0``.
+
+        Args:
+            timeout: seconds to wait for a sampled mini-batch. If ``None``,
+                this method blocks until a mini-batch is sampled.
+
+        Returns:
+            BatchSlot object.
+
+        """
+        assert self._batch_ring is not None, "num_batch_slots must be positive"
+        return self._batch_ring.acquire(timeout)
+
+    def release_batch(self, slot: BatchSlot) -> None:
+        """Releases mini-batch to be sampled again.
+
+        Args:
+            slot: BatchSlot object returned by ``acquire_batch``.
+
+        """
+        assert self._batch_ring is not None, "num_batch_slots must be positive"
+        self._batch_ring.release(slot)
+
+    def get_local_sender(self, rollout_id: int) -> LocalStepSender:
+        """Returns sender for a rollout worker on the same host.
+
+        The returned object has the same interface as ``StepSender`` and
+        must be passed to the rollout process as a process argument.
+
+        Args:
+            rollout_id: rollout worker id given as ``local_rollout_ids``.
+
+        Returns:
+            LocalStepSender object.
+
+        """
+        assert (
+            rollout_id in self._local_channels
+        ), f"rollout_id {rollout_id} is not in local_rollout_ids"
+        return LocalStepSender(self._local_channels[rollout_id])
+
+    def save(self, path: str, profile: Optional[StorageProfile] = None) -> None:
         """Saves data as HDF5 file to disk.
 
         Args:
             path: path to save.
+            profile: StorageProfile object to configure compression and
+                chunk layout.
 
         """
         self._command_queue.put(COMMAND_SAVE)
         self._command_queue.put(path)
+        self._command_queue.put(profile)
         self._ack_queue.get()
 
     def load(self, path: str) -> None:
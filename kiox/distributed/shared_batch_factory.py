@@ -1,5 +1,7 @@
-# pylint: disable=C0200
-from typing import Optional, Sequence, Union
+import dataclasses
+from multiprocessing import Queue
+from queue import Empty
+from typing import Callable, List, Optional, Sequence, Union
 
 import numpy as np
 
@@ -8,37 +10,67 @@ from ..step import StepBuffer
 from ..transition_buffer import TransitionBuffer
 from .shared_array import create_shared_array
 
+DTypeSpec = Union[np.dtype, Sequence[np.dtype]]
 
-def _create_shared_batch_array(
-    batch_size: int, shape: Union[Sequence[Sequence[int]], Sequence[int]]
+
+def create_shared_batch_array(
+    batch_size: int,
+    shape: Union[Sequence[Sequence[int]], Sequence[int]],
+    dtype: DTypeSpec = np.float32,
 ) -> Union[np.ndarray, Sequence[np.ndarray]]:
-    if isinstance(shape[0], int):
-        return create_shared_array((batch_size, *shape), np.float32)
-    else:
-        return [
-            create_shared_array((batch_size, *s), np.float32) for s in shape  # type: ignore
-        ]
+    """Creates batch arrays with shared memory buffers.
 
+    Args:
+        batch_size: batch size.
+        shape: shape of an item. Tuple items take a sequence of shapes.
+        dtype: dtype of an item. Tuple items take either one dtype for all
+            elements or a sequence of dtypes per element.
+
+    Returns:
+        shared ndarray or list of shared ndarrays for tuple items.
 
-def _copy_array(
-    dst: Union[Sequence[np.ndarray], np.ndarray],
-    src: Union[Sequence[np.ndarray], np.ndarray],
-) -> None:
-    if isinstance(dst, (list, tuple)):
-        for i in range(len(dst)):
-            np.copyto(dst[i], src[i])
+    """
+    if isinstance(shape[0], int):
+        assert not isinstance(dtype, (list, tuple)), "dtype must be single"
+        return create_shared_array((batch_size, *shape), dtype)
+    if isinstance(dtype, (list, tuple)):
+        assert len(dtype) == len(shape), "dtype must match tuple length"
+        dtypes = list(dtype)
     else:
-        np.copyto(dst, src)
+        dtypes = [dtype] * len(shape)
+    return [
+        create_shared_array((batch_size, *s), d)  # type: ignore
+        for s, d in zip(shape, dtypes)
+    ]
 
 
 class SharedBatchFactory:
     """SharedBatchFactory class.
 
+    Each field is allocated with its own dtype so that, for example, uint8
+    image observations stay uint8 in shared memory. Tuple items take either
+    one dtype for all elements or a sequence of dtypes per element. The
+    dtypes should match the stored steps to avoid casting on every copy.
+
+    .. code-block:: python
+
+        factory = SharedBatchFactory(
+            observation_shape=((3, 84, 84), (4,)),
+            action_shape=(1,),
+            reward_shape=(1,),
+            batch_size=32,
+            observation_dtype=(np.uint8, np.float32),
+            action_dtype=np.int32,
+        )
+
     Args:
         observation_shape: shape of observation.
         action_shape: shape of action.
         reward_shape: shape of reward.
         batch_size: batch size.
+        observation_dtype: dtype of observation.
+        action_dtype: dtype of action.
+        reward_dtype: dtype of reward.
 
     """
 
@@ -51,18 +83,29 @@ class SharedBatchFactory:
         action_shape: Union[Sequence[Sequence[int]], Sequence[int]],
         reward_shape: Union[Sequence[Sequence[int]], Sequence[int]],
         batch_size: int,
+        observation_dtype: DTypeSpec = np.float32,
+        action_dtype: DTypeSpec = np.float32,
+        reward_dtype: DTypeSpec = np.float32,
     ):
         self._batch_size = batch_size
 
         # allocate shared arrays
-        observations = _create_shared_batch_array(batch_size, observation_shape)
-        actions = _create_shared_batch_array(batch_size, action_shape)
-        rewards = _create_shared_batch_array(batch_size, reward_shape)
+        observations = create_shared_batch_array(
+            batch_size, observation_shape, observation_dtype
+        )
+        actions = create_shared_batch_array(
+            batch_size, action_shape, action_dtype
+        )
+        rewards = create_shared_batch_array(
+            batch_size, reward_shape, reward_dtype
+        )
         terminals = create_shared_array((batch_size, 1), np.float32)
-        next_observations = _create_shared_batch_array(
-            batch_size, observation_shape
+        next_observations = create_shared_batch_array(
+            batch_size, observation_shape, observation_dtype
         )
         durations = create_shared_array((batch_size, 1), np.float32)
+        indices = create_shared_array((batch_size,), np.int64)
+        weights = create_shared_array((batch_size, 1), np.float32)
 
         self._batch = Batch(
             observations=observations,
@@ -71,6 +114,8 @@ class SharedBatchFactory:
             next_observations=next_observations,
             terminals=terminals,
             durations=durations,
+            indices=indices,
+            weights=weights,
         )
 
     def sample(
@@ -81,28 +126,167 @@ class SharedBatchFactory:
     ) -> None:
         """Samples transitions and copies mini-batch to shared memory.
 
+        Sampled indices and importance sampling weights are copied as well.
+        Indices are ``-1`` if ``transition_buffer`` cannot sample indices,
+        and weights are ``1`` unless ``transition_buffer`` is
+        ``PrioritizedTransitionBuffer``.
+
         Args:
             step_buffer: StepBuffer object.
             transition_buffer: TransitionBuffer object.
             max_pararellism: maximum number of threads to sample.
 
         """
-        # sampling
+        # sampling directly into shared memory
         factory = BatchFactory(
             step_buffer=step_buffer,
             transition_buffer=transition_buffer,
             max_pararellism=max_pararellism,
         )
-        batch = factory.sample(self._batch_size)
-
-        # copy arrays
-        _copy_array(self._batch.observations, batch.observations)
-        _copy_array(self._batch.actions, batch.actions)
-        _copy_array(self._batch.rewards, batch.rewards)
-        np.copyto(self._batch.terminals, batch.terminals)
-        _copy_array(self._batch.next_observations, batch.next_observations)
-        np.copyto(self._batch.durations, batch.durations)
+        batch = factory.sample(self._batch_size, out=self._batch)
+        assert self._batch.indices is not None
+        assert self._batch.weights is not None
+        if batch.indices is None:
+            self._batch.indices.fill(-1)
+        if batch.weights is None:
+            self._batch.weights.fill(1.0)
 
     @property
     def batch(self) -> Batch:
         return self._batch
+
+
+@dataclasses.dataclass(frozen=True)
+class BatchSlot:
+    """Mini-batch slot acquired from SharedBatchRing.
+
+    Args:
+        index: slot index.
+        batch: mini-batch in shared memory.
+
+    """
+
+    index: int
+    batch: Batch
+
+
+class SharedBatchRing:
+    """SharedBatchRing class.
+
+    This class holds ``num_slots`` mini-batches in shared memory managed as a
+    producer/consumer ring. The producer samples mini-batches into free slots
+    in the background, and the consumer acquires a filled slot without a
+    round trip to the producer. A slot is not overwritten until the consumer
+    releases it.
+
+    .. code-block:: python
+
+        # producer process
+        ring.fill(lambda factory: factory.sample(step_buffer, buffer))
+
+        # consumer process
+        slot = ring.acquire()
+        train(slot.batch)
+        ring.release(slot)
+
+    Args:
+        observation_shape: shape of observation.
+        action_shape: shape of action.
+        reward_shape: shape of reward.
+        batch_size: batch size.
+        num_slots: number of mini-batch slots.
+        observation_dtype: dtype of observation.
+        action_dtype: dtype of action.
+        reward_dtype: dtype of reward.
+
+    """
+
+    _factories: List[SharedBatchFactory]
+    _free_slots: "Queue[int]"
+    _ready_slots: "Queue[int]"
+
+    def __init__(
+        self,
+        observation_shape: Union[Sequence[Sequence[int]], Sequence[int]],
+        action_shape: Union[Sequence[Sequence[int]], Sequence[int]],
+        reward_shape: Union[Sequence[Sequence[int]], Sequence[int]],
+        batch_size: int,
+        num_slots: int,
+        observation_dtype: DTypeSpec = np.float32,
+        action_dtype: DTypeSpec = np.float32,
+        reward_dtype: DTypeSpec = np.float32,
+    ):
+        assert num_slots > 0, "num_slots must be positive"
+        self._factories = [
+            SharedBatchFactory(
+                observation_shape=observation_shape,
+                action_shape=action_shape,
+                reward_shape=reward_shape,
+                batch_size=batch_size,
+                observation_dtype=observation_dtype,
+                action_dtype=action_dtype,
+                reward_dtype=reward_dtype,
+            )
+            for _ in range(num_slots)
+        ]
+        self._free_slots = Queue()
+        self._ready_slots = Queue()
+        for index in range(num_slots):
+            self._free_slots.put(index)
+
+    def fill(
+        self,
+        sample: Callable[[SharedBatchFactory], None],
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """Samples mini-batch into a free slot and makes it ready.
+
+        Args:
+            sample: function to sample mini-batch into the given
+                SharedBatchFactory object.
+            timeout: seconds to wait for a free slot. If ``None``, this
+                method blocks until a slot is released.
+
+        Returns:
+            ``True`` if a slot is filled.
+
+        """
+        try:
+            index = self._free_slots.get(timeout=timeout)
+        except Empty:
+            return False
+        try:
+            sample(self._factories[index])
+        except BaseException:
+            # give the slot back so that it is not lost
+            self._free_slots.put(index)
+            raise
+        self._ready_slots.put(index)
+        return True
+
+    def acquire(self, timeout: Optional[float] = None) -> BatchSlot:
+        """Returns a filled slot.
+
+        Args:
+            timeout: seconds to wait for a filled slot. If ``None``, this
+                method blocks until a slot is filled.
+
+        Returns:
+            BatchSlot object. The batch is valid until ``release`` is called.
+
+        """
+        index = self._ready_slots.get(timeout=timeout)
+        return BatchSlot(index=index, batch=self._factories[index].batch)
+
+    def release(self, slot: BatchSlot) -> None:
+        """Releases slot to be filled again.
+
+        Args:
+            slot: BatchSlot object returned by ``acquire``.
+
+        """
+        self._free_slots.put(slot.index)
+
+    @property
+    def num_slots(self) -> int:
+        return len(self._factories)
@@ -1,40 +1,302 @@
 import dataclasses
-from queue import Queue
+import pickle
+import tempfile
+import threading
+import time
+from collections import deque
+from queue import Empty
 from threading import Thread
-from typing import Optional, Union
+from typing import (
+    IO,
+    Callable,
+    Deque,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
 
 import grpc
+from typing_extensions import Protocol
 
 from ..item import Item
-from .proto.step_pb2 import StepProto
+from .compact_encoding import CompactStepEncoder
+from .proto.step_pb2 import (
+    CompactStepProto,
+    CompactStreamProto,
+    DisconnectRequest,
+    StepBatchProto,
+    StepProto,
+)
 from .proto.step_pb2_grpc import StepServiceStub
-from .utility import convert_item_to_proto
+from .transition_builder import TransitionBuilder
+from .utility import (
+    StepData,
+    convert_item_to_proto,
+    convert_transition_to_proto,
+)
+
+_TMessage = TypeVar("_TMessage", StepProto, CompactStepProto)
+
+# step and the time when it is collected
+_QueuedStep = Tuple[StepData, float]
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_DROP_NEWEST = "drop_newest"
+OVERFLOW_SPILL = "spill"
+OVERFLOW_POLICIES = [
+    OVERFLOW_BLOCK,
+    OVERFLOW_DROP_OLDEST,
+    OVERFLOW_DROP_NEWEST,
+    OVERFLOW_SPILL,
+]
 
 
 @dataclasses.dataclass(frozen=True)
-class StepData:
-    """StepData data class.
+class StepSenderStats:
+    """StepSenderStats data class.
+
+    Args:
+        queue_size: number of tuples waiting to be sent including spilled
+            tuples.
+        num_sent: number of sent tuples.
+        num_dropped: number of tuples dropped by the overflow policy.
+        num_spilled: number of tuples spilled to disk.
+        mean_latency: mean seconds from ``collect`` to send.
+        max_latency: maximum seconds from ``collect`` to send.
+
+    """
+
+    queue_size: int
+    num_sent: int
+    num_dropped: int
+    num_spilled: int
+    mean_latency: float
+    max_latency: float
+
+
+def _is_episode_end(item: Optional[_QueuedStep]) -> bool:
+    if item is None:
+        return False
+    step_data = item[0]
+    return bool(step_data.terminal) or bool(step_data.timeout)
+
+
+class _StepQueue:
+    """FIFO queue of steps with a capacity and an overflow policy.
+
+    With ``spill`` policy, steps beyond the capacity are appended to a
+    temporary file and moved back to memory as the queue is drained so that
+    the order is preserved.
 
     Args:
-        observation: observation.
-        action: action.
-        reward: reward.
-        terminal: terminal flag.
-        timeout: timeout flag.
+        maxsize: maximum number of steps in memory. If ``0``, the queue is
+            unbounded.
+        overflow: overflow policy.
+        spill_dir: directory to create the spill file in.
 
     """
 
-    observation: Item
-    action: Item
-    reward: Item
-    terminal: float
-    timeout: Optional[bool]
+    _maxsize: int
+    _overflow: str
+    _spill_dir: Optional[str]
+    _items: Deque[Optional[_QueuedStep]]
+    _condition: threading.Condition
+    _spill_file: Optional[IO[bytes]]
+    _spill_read_pos: int
+    _spill_write_pos: int
+    _spill_size: int
+    _num_dropped: int
+    _num_spilled: int
+    _is_closed: bool
+
+    def __init__(self, maxsize: int, overflow: str, spill_dir: Optional[str]):
+        assert maxsize >= 0, "maxsize must be non-negative"
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"invalid overflow policy: {overflow}")
+        self._maxsize = maxsize
+        self._overflow = overflow
+        self._spill_dir = spill_dir
+        self._items = deque()
+        self._condition = threading.Condition()
+        self._spill_file = None
+        self._spill_read_pos = 0
+        self._spill_write_pos = 0
+        self._spill_size = 0
+        self._num_dropped = 0
+        self._num_spilled = 0
+        self._is_closed = False
+
+    def put(self, item: _QueuedStep) -> None:
+        with self._condition:
+            if self._spill_size > 0:
+                # keep order behind spilled steps
+                self._spill(item)
+            elif self._maxsize == 0 or len(self._items) < self._maxsize:
+                self._items.append(item)
+            elif self._overflow == OVERFLOW_BLOCK:
+                while len(self._items) >= self._maxsize:
+                    if self._is_closed:
+                        return
+                    self._condition.wait()
+                self._items.append(item)
+            elif self._overflow == OVERFLOW_DROP_OLDEST:
+                if _is_episode_end(self._items[0]):
+                    # keep the episode end and drop the first step of the
+                    # next episode so that episodes are not merged
+                    if len(self._items) > 1:
+                        del self._items[1]
+                        self._items.append(item)
+                else:
+                    self._items.popleft()
+                    self._items.append(item)
+                self._num_dropped += 1
+            elif self._overflow == OVERFLOW_DROP_NEWEST:
+                # clip episode before the gap
+                last_item = self._items[-1]
+                if last_item is not None:
+                    step_data, collected_at = last_item
+                    step_data = dataclasses.replace(step_data, timeout=True)
+                    self._items[-1] = (step_data, collected_at)
+                self._num_dropped += 1
+            else:
+                self._spill(item)
+            self._condition.notify_all()
+
+    def put_end(self) -> None:
+        with self._condition:
+            if self._spill_size > 0:
+                self._spill(None)
+            else:
+                self._items.append(None)
+            self._condition.notify_all()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[_QueuedStep]:
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._items, timeout):
+                raise Empty
+            item = self._items.popleft()
+            if self._spill_size > 0:
+                self._items.append(self._unspill())
+            self._condition.notify_all()
+            return item
+
+    def close(self) -> None:
+        with self._condition:
+            self._is_closed = True
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+            self._condition.notify_all()
+
+    def _spill(self, item: Optional[_QueuedStep]) -> None:
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(dir=self._spill_dir)
+        self._spill_file.seek(self._spill_write_pos)
+        pickle.dump(item, self._spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._spill_write_pos = self._spill_file.tell()
+        self._spill_size += 1
+        if item is not None:
+            self._num_spilled += 1
+
+    def _unspill(self) -> Optional[_QueuedStep]:
+        assert self._spill_file is not None
+        self._spill_file.seek(self._spill_read_pos)
+        item = cast(Optional[_QueuedStep], pickle.load(self._spill_file))
+        self._spill_read_pos = self._spill_file.tell()
+        self._spill_size -= 1
+        if self._spill_size == 0:
+            # reuse the file from the beginning
+            self._spill_file.seek(0)
+            self._spill_file.truncate()
+            self._spill_read_pos = 0
+            self._spill_write_pos = 0
+        return item
 
+    def qsize(self) -> int:
+        with self._condition:
+            return len(self._items) + self._spill_size
+
+    @property
+    def num_dropped(self) -> int:
+        return self._num_dropped
+
+    @property
+    def num_spilled(self) -> int:
+        return self._num_spilled
+
+
+class StepSenderProtocol(Protocol):
+    def collect(
+        self,
+        observation: Item,
+        action: Item,
+        reward: Item,
+        terminal: Union[float, bool],
+        timeout: Optional[bool] = None,
+    ) -> None:
+        """Sends experience tuple to KioxServer.
+
+        Args:
+            observation: observation.
+            action: action.
+            reward: reward.
+            terminal: terminal flag.
+            timeout: timeout flag.
 
-class StepSender:
+        """
+
+    def stop(self) -> None:
+        """Sends remaining tuples and stops sending."""
+
+
+class StepSender(StepSenderProtocol):
     """StepSender class.
 
-    This class sends experience tuples via gRPC.
+    This class sends experience tuples via gRPC. By default, a unary call is
+    made per tuple. If ``streaming=True``, tuples are sent over a single
+    client-streaming call kept open until ``stop`` is called. A stream
+    occupies one server thread for its lifetime, so the server must have
+    more workers than streaming rollout workers. If the server rejects the
+    stream, the error is raised by ``collect`` and ``stop``.
+
+    If ``batch_size`` is larger than 1, tuples are packed into batch
+    messages to amortize per-message overhead for small observations. A
+    batch is flushed when it has ``batch_size`` tuples, when its size
+    reaches ``max_batch_bytes`` or when its oldest tuple has waited for
+    ``max_latency`` seconds. ``stop`` flushes the remaining tuples.
+
+    If ``compact=True``, tuples are sent over a client-streaming call in the
+    schema-once format. Shapes and dtypes are declared by the first message
+    and each tuple carries only raw bytes. Observations can be compressed
+    with ``compression`` and ``delta``, which cuts network bytes for image
+    observations.
+
+    Tuples wait in a queue until they are sent. If ``max_queue_size`` is
+    given, the queue is bounded so that the memory usage of the rollout
+    worker is bounded while the server is slow. ``overflow`` decides what
+    happens to a tuple collected while the queue is full.
+
+    - ``block``: ``collect`` blocks until a tuple is sent.
+    - ``drop_oldest``: the oldest waiting tuple is dropped. The transition
+      over the dropped tuple links non-consecutive steps. A tuple ending an
+      episode is kept and the tuple following it is dropped instead.
+    - ``drop_newest``: the collected tuple is dropped and the episode is
+      clipped at the last waiting tuple.
+    - ``spill``: tuples are written to a temporary file and sent in order.
+
+    ``stats`` reports the queue size, the number of dropped and spilled
+    tuples and the latency from ``collect`` to send.
+
+    If ``transition_builder`` is given, multi-step returns and frame-stack
+    indices are computed on this rollout worker and sent along with tuples,
+    and the server only appends them. This offloads the server when many
+    rollout workers are connected. Transitions are built in the sending
+    thread so that tuples dropped by ``overflow`` are never referred to.
 
     .. code-block:: python
 
@@ -55,17 +317,91 @@ class StepSender:
         host: host address.
         port: port number.
         rollout_id: unique rollout worker id.
+        streaming: flag to send tuples over a client-streaming call. If
+            ``False``, a unary call is made per tuple or per batch.
+        batch_size: maximum number of tuples in a batch message. If ``1``,
+            tuples are sent one by one.
+        max_batch_bytes: serialized size in bytes to flush a batch before it
+            reaches ``batch_size``.
+        max_latency: maximum seconds to hold a tuple in a partial batch.
+        compact: flag to send tuples in the schema-once format. This implies
+            ``streaming=True``.
+        compression: codec name to compress observations in the schema-once
+            format. ``zlib`` or ``lz4``.
+        delta: flag to send observations as XOR delta against the previous
+            observation in the schema-once format.
+        max_queue_size: maximum number of tuples waiting in memory. If ``0``,
+            the queue is unbounded.
+        overflow: policy for a tuple collected while the queue is full.
+            ``block``, ``drop_oldest``, ``drop_newest`` or ``spill``.
+        spill_dir: directory to create the spill file in. If ``None``, the
+            default temporary directory is used.
+        transition_builder: TransitionBuilder object to build transitions
+            on this rollout worker. This is not supported with
+            ``compact=True``.
 
     """
 
-    _queue: "Queue[Optional[StepData]]"
+    _rollout_id: int
+    _streaming: bool
+    _encoder: Optional[CompactStepEncoder]
+    _transition_builder: Optional[TransitionBuilder]
+    _batch_size: int
+    _max_batch_bytes: Optional[int]
+    _max_latency: float
+    _queue: _StepQueue
     _thread: Thread
+    _error: Optional[grpc.RpcError]
+    _disconnect: bool
+    _stats_lock: threading.Lock
+    _num_sent: int
+    _total_latency: float
+    _max_latency_seen: float
 
-    def __init__(self, host: str, port: int, rollout_id: int):
-        self._queue = Queue()
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        rollout_id: int,
+        streaming: bool = False,
+        batch_size: int = 1,
+        max_batch_bytes: Optional[int] = None,
+        max_latency: float = 0.01,
+        compact: bool = False,
+        compression: Optional[str] = None,
+        delta: bool = False,
+        max_queue_size: int = 0,
+        overflow: str = OVERFLOW_BLOCK,
+        spill_dir: Optional[str] = None,
+        transition_builder: Optional[TransitionBuilder] = None,
+    ):
+        assert batch_size > 0, "batch_size must be positive"
+        assert compact or (
+            compression is None and not delta
+        ), "compression and delta require compact=True"
+        assert not (
+            compact and transition_builder
+        ), "transition_builder is not supported with compact=True"
+        self._rollout_id = rollout_id
+        self._streaming = streaming or compact
+        if compact:
+            self._encoder = CompactStepEncoder(rollout_id, compression, delta)
+        else:
+            self._encoder = None
+        self._transition_builder = transition_builder
+        self._batch_size = batch_size
+        self._max_batch_bytes = max_batch_bytes
+        self._max_latency = max_latency
+        self._queue = _StepQueue(max_queue_size, overflow, spill_dir)
+        self._error = None
+        self._disconnect = False
+        self._stats_lock = threading.Lock()
+        self._num_sent = 0
+        self._total_latency = 0.0
+        self._max_latency_seen = 0.0
         self._thread = Thread(
             target=self._loop_thread,
-            args=(host, port, rollout_id),
+            args=(host, port),
             daemon=True,
         )
         self._thread.start()
@@ -80,6 +416,9 @@ class StepSender:
     ) -> None:
         """Sends experience tuple via gRPC.
 
+        Depending on ``overflow``, this method blocks while the queue is
+        full.
+
         Args:
             observation: observation.
             action: action.
@@ -88,6 +427,8 @@ class StepSender:
             timeout: timeout flag.
 
         """
+        if self._error is not None:
+            raise self._error
         if not isinstance(terminal, float):
             terminal = float(terminal)
         step_data = StepData(
@@ -97,36 +438,168 @@ class StepSender:
             terminal=terminal,
             timeout=timeout,
         )
-        self._queue.put(step_data)
+        self._queue.put((step_data, time.monotonic()))
+        if self._error is not None:
+            raise self._error
 
-    def _loop_thread(self, host: str, port: int, rollout_id: int) -> None:
+    def _loop_thread(self, host: str, port: int) -> None:
         channel = grpc.insecure_channel(f"{host}:{port}")
         stub = StepServiceStub(channel)
+        try:
+            if self._encoder is not None:
+                stub.SendCompactStream(self._iterate_compact_messages())
+            elif self._batch_size > 1:
+                if self._streaming:
+                    stub.SendBatchStream(self._iterate_batches())
+                else:
+                    for batch in self._iterate_batches():
+                        stub.SendBatch(batch)
+            elif self._streaming:
+                stub.SendStream(self._iterate_steps())
+            else:
+                for step in self._iterate_steps():
+                    stub.Send(step)
+            if self._disconnect:
+                request = DisconnectRequest(rollout_id=self._rollout_id)
+                stub.Disconnect(request)
+        except grpc.RpcError as e:
+            self._error = e
+        finally:
+            # wake up collect blocked by the full queue
+            self._queue.close()
+            channel.close()
+
+    def _iterate_steps(self) -> Iterator[StepProto]:
+        while True:
+            item = self._queue.get()
+
+            if item is None:
+                break
+
+            step_data, collected_at = item
+            yield self._convert_step(step_data, self._rollout_id)
+            # resumed after the step is handed to gRPC
+            self._record_sent([collected_at])
+
+    def _iterate_batches(self) -> Iterator[StepBatchProto]:
+        # rollout_id is shared by the batch
+        for steps in self._iterate_groups(
+            lambda step_data: self._convert_step(step_data, 0)
+        ):
+            yield StepBatchProto(steps=steps, rollout_id=self._rollout_id)
+
+    def _iterate_compact_messages(self) -> Iterator[CompactStreamProto]:
+        encoder = self._encoder
+        assert encoder is not None
+        for steps in self._iterate_groups(encoder.encode):
+            yield encoder.create_message(steps)
+
+    def _iterate_groups(
+        self, convert: Callable[[StepData], _TMessage]
+    ) -> Iterator[List[_TMessage]]:
+        steps: List[_TMessage] = []
+        collected_times: List[float] = []
+        nbytes = 0
+        deadline = 0.0
         while True:
-            step_data = self._queue.get()
+            if steps:
+                timeout: Optional[float] = max(deadline - time.monotonic(), 0)
+            else:
+                timeout = None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except Empty:
+                # the oldest tuple has waited for max_latency
+                yield steps
+                self._record_sent(collected_times)
+                steps, collected_times, nbytes = [], [], 0
+                continue
 
-            if step_data is None:
+            if item is None:
                 break
 
-            observation = convert_item_to_proto(step_data.observation)
-            action = convert_item_to_proto(step_data.action)
-            reward = convert_item_to_proto(step_data.reward)
-            timeout = (
-                step_data.terminal
-                if step_data.timeout is None
-                else step_data.timeout
+            step_data, collected_at = item
+            step = convert(step_data)
+            if not steps:
+                deadline = time.monotonic() + self._max_latency
+            steps.append(step)
+            collected_times.append(collected_at)
+            nbytes += step.ByteSize()
+
+            is_full = len(steps) >= self._batch_size
+            if self._max_batch_bytes is not None:
+                is_full = is_full or nbytes >= self._max_batch_bytes
+            if is_full:
+                yield steps
+                self._record_sent(collected_times)
+                steps, collected_times, nbytes = [], [], 0
+
+        if steps:
+            yield steps
+            self._record_sent(collected_times)
+
+    def _record_sent(self, collected_times: List[float]) -> None:
+        now = time.monotonic()
+        latencies = [now - collected_at for collected_at in collected_times]
+        with self._stats_lock:
+            self._num_sent += len(latencies)
+            self._total_latency += sum(latencies)
+            self._max_latency_seen = max([self._max_latency_seen, *latencies])
+
+    def _convert_step(self, step_data: StepData, rollout_id: int) -> StepProto:
+        observation = convert_item_to_proto(step_data.observation)
+        action = convert_item_to_proto(step_data.action)
+        reward = convert_item_to_proto(step_data.reward)
+        timeout = (
+            bool(step_data.terminal)
+            if step_data.timeout is None
+            else step_data.timeout
+        )
+        step = StepProto(
+            observation=observation,
+            action=action,
+            reward=reward,
+            terminal=step_data.terminal,
+            timeout=timeout,
+            rollout_id=rollout_id,
+        )
+        if self._transition_builder is not None:
+            transitions = self._transition_builder.append(
+                step_data.reward, step_data.terminal, timeout
             )
-            step = StepProto(
-                observation=observation,
-                action=action,
-                reward=reward,
-                terminal=step_data.terminal,
-                timeout=timeout,
-                rollout_id=rollout_id,
+            step.transitions.extend(
+                [convert_transition_to_proto(t) for t in transitions]
             )
-            stub.Send(step)
+            step.has_transitions = True
+        return step
 
-    def stop(self) -> None:
-        """Stops gRPC thread."""
-        self._queue.put(None)
+    def stop(self, disconnect: bool = False) -> None:
+        """Stops gRPC thread and raises an error if sending has failed.
+
+        Args:
+            disconnect: flag to tell the server that this rollout worker
+                will not send steps anymore after all steps are sent. The
+                server clips the active episode and releases the
+                StepCollector for ``rollout_id``.
+
+        """
+        self._disconnect = disconnect
+        self._queue.put_end()
         self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    @property
+    def stats(self) -> StepSenderStats:
+        with self._stats_lock:
+            num_sent = self._num_sent
+            total_latency = self._total_latency
+            max_latency = self._max_latency_seen
+        return StepSenderStats(
+            queue_size=self._queue.qsize(),
+            num_sent=num_sent,
+            num_dropped=self._queue.num_dropped,
+            num_spilled=self._queue.num_spilled,
+            mean_latency=total_latency / num_sent if num_sent else 0.0,
+            max_latency=max_latency,
+        )
@@ -0,0 +1,184 @@
+from collections import deque
+from typing import Deque, List, Optional, Sequence, Union
+
+import numpy as np
+
+from ..episode import Episode
+from ..item import Item
+from ..transition import (
+    FrameStackLazyTransition,
+    LazyTransition,
+    SimpleLazyTransition,
+)
+from .utility import TransitionData, convert_item_to_arrays
+
+
+class TransitionBuilder:
+    """TransitionBuilder class.
+
+    This class builds transitions on a rollout worker so that the server
+    only appends them. Transitions are built in the same way as
+    ``StepCollector`` with ``SimpleTransitionFactory`` or, if ``n_frames``
+    is positive, ``FrameStackTransitionFactory``. Since steps do not have
+    idx on the rollout worker, steps are located by their positions in the
+    active episode.
+
+    Multi-step returns are computed with the sent rewards. ``n_steps``,
+    ``gamma`` and ``n_frames`` should match the server configuration.
+
+    Args:
+        n_steps: step size for multi-step learning. This corresponds to TD(N).
+        gamma: discounted factor. If ``n_steps=1``, this value does not make
+            any difference.
+        n_frames: number of frames to stack. If ``0``, frames are not
+            stacked.
+
+    """
+
+    _n_steps: int
+    _gamma: float
+    _n_frames: int
+    _rewards: Deque[np.ndarray]
+    _size: int
+
+    def __init__(
+        self, n_steps: int = 1, gamma: float = 0.99, n_frames: int = 0
+    ):
+        assert n_steps > 0, "n_steps must be positive"
+        self._n_steps = n_steps
+        self._gamma = gamma
+        self._n_frames = n_frames
+        # rewards of the latest steps to compute returns
+        self._rewards = deque(maxlen=n_steps + 1)
+        self._size = 0
+
+    def append(
+        self, reward: Item, terminal: float, timeout: Optional[bool] = None
+    ) -> List[TransitionData]:
+        """Appends step and returns transitions completed by the step.
+
+        Args:
+            reward: reward.
+            terminal: terminal flag.
+            timeout: timeout flag.
+
+        Returns:
+            list of TransitionData objects.
+
+        """
+        rewards = convert_item_to_arrays(reward)
+        assert len(rewards) == 1, "tuple reward is not supported"
+        self._rewards.append(rewards[0])
+        position = self._size
+        self._size += 1
+
+        transitions = []
+        if self._size > self._n_steps:
+            transitions.append(
+                self._create(position - self._n_steps, position, self._n_steps)
+            )
+
+        if terminal:
+            # consume remaining steps
+            for i in reversed(range(min(self._n_steps, self._size))):
+                transitions.append(self._create(position - i, None, i + 1))
+
+        if terminal or timeout:
+            self._rewards.clear()
+            self._size = 0
+
+        return transitions
+
+    def _create(
+        self, position: int, next_position: Optional[int], duration: int
+    ) -> TransitionData:
+        if self._n_frames > 0:
+            first = max(position - self._n_frames + 1, 0)
+            prev_positions = list(range(first, position))
+        else:
+            prev_positions = []
+        return TransitionData(
+            curr_position=position,
+            next_position=next_position,
+            multi_step_reward=self._compute_return(position, duration),
+            duration=duration,
+            prev_positions=prev_positions,
+            n_frames=self._n_frames,
+        )
+
+    def _compute_return(
+        self, position: int, duration: int
+    ) -> Union[float, np.ndarray]:
+        # summed in the same order as Episode.compute_return
+        offset = self._size - len(self._rewards)
+        ret = 0.0
+        for i in range(duration):
+            ret += (self._gamma**i) * self._rewards[position + i - offset]
+        return ret
+
+
+def has_valid_positions(
+    episode: Episode, transitions: Sequence[TransitionData]
+) -> bool:
+    """Returns flag if transitions match the active episode.
+
+    Transitions built by a step always refer to the step itself, which is
+    the last step of the active episode. Positions do not match if the
+    active episode was clipped on the server while the rollout worker was in
+    the middle of an episode.
+
+    Args:
+        episode: active episode including the step that built the transitions.
+        transitions: TransitionData objects built by the step.
+
+    Returns:
+        ``True`` if all positions are located in the active episode.
+
+    """
+    positions: List[int] = []
+    for transition in transitions:
+        positions.append(transition.curr_position)
+        if transition.next_position is not None:
+            positions.append(transition.next_position)
+        positions.extend(transition.prev_positions)
+    if not positions:
+        return True
+    return min(positions) >= 0 and max(positions) == episode.size() - 1
+
+
+def create_lazy_transition(
+    episode: Episode, transition: TransitionData
+) -> LazyTransition:
+    """Creates LazyTransition from transition built by a rollout worker.
+
+    Args:
+        episode: active episode including the steps.
+        transition: TransitionData object.
+
+    Returns:
+        LazyTransition object.
+
+    """
+    curr_idx = episode.get_idx_by_index(transition.curr_position)
+    if transition.next_position is None:
+        next_idx = None
+    else:
+        next_idx = episode.get_idx_by_index(transition.next_position)
+    if transition.n_frames == 0:
+        return SimpleLazyTransition(
+            curr_idx=curr_idx,
+            next_idx=next_idx,
+            multi_step_reward=transition.multi_step_reward,
+            duration=transition.duration,
+        )
+    return FrameStackLazyTransition(
+        curr_idx=curr_idx,
+        next_idx=next_idx,
+        multi_step_reward=transition.multi_step_reward,
+        duration=transition.duration,
+        prev_frames=[
+            episode.get_idx_by_index(position)
+            for position in transition.prev_positions
+        ],
+        n_frames=transition.n_frames,
+    )
@@ -1,35 +1,129 @@
+import dataclasses
+from typing import Optional, Sequence, Union
+
 import numpy as np
 
-from ..item import Item
-from .proto.step_pb2 import DType, ItemProto, Shape
+from ..batch_factory import Batch
+from ..item import Item, StackedItem
+from .proto.step_pb2 import (
+    BatchProto,
+    DType,
+    ItemProto,
+    Shape,
+    TransitionProto,
+)
+from .shared_batch_factory import DTypeSpec
+
+
+@dataclasses.dataclass(frozen=True)
+class TransitionData:
+    """TransitionData data class.
+
+    Steps are located by their positions in the active episode so that
+    transitions can be built without knowing idx in the server.
+
+    Args:
+        curr_position: position of the current step.
+        next_position: position of the next step. If ``None``, next step is
+            terminal state.
+        multi_step_reward: discounted return during this transition.
+        duration: the number of steps before next step.
+        prev_positions: positions of previous frames to stack.
+        n_frames: number of frames to stack. If ``0``, frames are not
+            stacked.
+
+    """
+
+    curr_position: int
+    next_position: Optional[int]
+    multi_step_reward: Union[float, np.ndarray]
+    duration: int
+    prev_positions: Sequence[int]
+    n_frames: int
+
+
+@dataclasses.dataclass(frozen=True)
+class StepData:
+    """StepData data class.
+
+    Args:
+        observation: observation.
+        action: action.
+        reward: reward.
+        terminal: terminal flag.
+        timeout: timeout flag.
+        transitions: transitions completed by this step. If ``None``,
+            transitions are built by the server.
+
+    """
+
+    observation: Item
+    action: Item
+    reward: Item
+    terminal: float
+    timeout: Optional[bool]
+    transitions: Optional[Sequence[TransitionData]] = None
+
+
+_DTYPES = {
+    DType.UINT8: np.dtype(np.uint8),
+    DType.INT32: np.dtype(np.int32),
+    DType.FLOAT32: np.dtype(np.float32),
+    DType.FLOAT16: np.dtype(np.float16),
+    DType.FLOAT64: np.dtype(np.float64),
+    DType.INT8: np.dtype(np.int8),
+    DType.INT16: np.dtype(np.int16),
+    DType.INT64: np.dtype(np.int64),
+    DType.BOOL: np.dtype(np.bool_),
+}
+_PROTO_DTYPES = {dtype: proto for proto, dtype in _DTYPES.items()}
 
 
 def convert_dtype_to_proto(dtype: np.dtype) -> DType:
-    if dtype == np.uint8:
-        return DType.UINT8
-    if dtype == np.int32:
-        return DType.INT32
-    if dtype == np.float32:
-        return DType.FLOAT32
-    raise ValueError(f"invalid dtype: {dtype}")
+    proto = _PROTO_DTYPES.get(np.dtype(dtype))
+    if proto is None:
+        raise ValueError(f"invalid dtype: {dtype}")
+    return proto
 
 
 def convert_proto_to_dtype(dtype: DType) -> np.dtype:
-    if dtype == DType.UINT8:
-        return np.uint8
-    if dtype == DType.INT32:
-        return np.int32
-    if dtype == DType.FLOAT32:
-        return np.float32
-    raise ValueError(f"invalid dtype: {dtype}")
+    if dtype not in _DTYPES:
+        raise ValueError(f"invalid dtype: {dtype}")
+    return _DTYPES[dtype]
 
 
-def convert_item_to_proto(item: Item) -> ItemProto:
+def _get_scalar_dtype(value: Union[int, float, np.generic]) -> np.dtype:
+    if isinstance(value, np.generic):
+        return value.dtype
+    if isinstance(value, bool):
+        return np.dtype(np.bool_)
+    if isinstance(value, int):
+        return np.dtype(np.int64)
+    # float is stored as float32 in step buffers
+    return np.dtype(np.float32)
+
+
+def convert_item_to_arrays(item: Item) -> Sequence[np.ndarray]:
     if isinstance(item, (np.ndarray)):
-        item = [item]
-    elif isinstance(item, (int, float)):
-        item = [np.array([item], dtype=np.float32)]
+        return [item]
+    elif isinstance(item, (int, float, np.generic)):
+        return [np.array([item], dtype=_get_scalar_dtype(item))]
     assert isinstance(item, (list, tuple))
+    return item
+
+
+def convert_item_to_proto(item: Item) -> ItemProto:
+    if isinstance(item, (int, float, np.generic)):
+        # scalar is sent without array wrapper
+        dtype = _get_scalar_dtype(item)
+        proto = ItemProto(length=1, dtype=[convert_dtype_to_proto(dtype)])
+        if dtype.kind == "f":
+            proto.float_value = float(item)
+        else:
+            proto.int_value = int(item)
+        return proto
+
+    item = convert_item_to_arrays(item)
 
     shapes = [Shape(dim=el.shape) for el in item]
     data = [el.tobytes() for el in item]
@@ -38,12 +132,135 @@ def convert_item_to_proto(item: Item) -> ItemProto:
     return ItemProto(length=len(item), shape=shapes, data=data, dtype=dtypes)
 
 
-def convert_proto_to_item(proto: ItemProto) -> Item:
+def split_dtypes(
+    dtype: Optional[DTypeSpec], length: int
+) -> Sequence[Optional[np.dtype]]:
+    """Returns dtypes per element of tuple item.
+
+    Args:
+        dtype: one dtype for all elements or a sequence of dtypes per
+            element.
+        length: number of elements of the item.
+
+    Returns:
+        list of dtypes.
+
+    """
+    if isinstance(dtype, (list, tuple)):
+        assert len(dtype) == length, "dtype must match tuple length"
+        return dtype
+    return [dtype] * length
+
+
+def convert_proto_to_item(
+    proto: ItemProto, dtype: Optional[DTypeSpec] = None
+) -> Item:
+    """Converts protocol buffer item into item.
+
+    Arrays are read directly from the received bytes without copying unless
+    ``dtype`` is different from the sent dtype. A scalar item is decoded as
+    an array of shape ``(1,)``.
+
+    Args:
+        proto: protocol buffer item.
+        dtype: dtype to cast the item to, such as the dtype of the storage.
+            Tuple items take either one dtype for all elements or a sequence
+            of dtypes per element. If ``None``, the sent dtype is kept.
+
+    Returns:
+        item.
+
+    """
+    dtypes = split_dtypes(dtype, proto.length)
+
+    scalar = proto.WhichOneof("scalar")
+    if scalar is not None:
+        value = getattr(proto, scalar)
+        if dtypes[0] is None:
+            return np.array(
+                [value], dtype=convert_proto_to_dtype(proto.dtype[0])
+            )
+        return np.array([value], dtype=dtypes[0])
+
     item = []
     for i in range(proto.length):
-        dtype = convert_proto_to_dtype(proto.dtype[i])
-        array = np.frombuffer(proto.data[i], dtype=dtype)
+        sent_dtype = convert_proto_to_dtype(proto.dtype[i])
+        array = np.frombuffer(proto.data[i], dtype=sent_dtype)
+        if dtypes[i] is not None:
+            # no copy if dtype is the same
+            array = array.astype(dtypes[i], copy=False)
         item.append(np.reshape(array, proto.shape[i].dim))
     if len(item) == 1:
         return item[0]
     return item
+
+
+def convert_transition_to_proto(transition: TransitionData) -> TransitionProto:
+    next_position = transition.next_position
+    return TransitionProto(
+        curr_position=transition.curr_position,
+        next_position=-1 if next_position is None else next_position,
+        multi_step_reward=convert_item_to_proto(transition.multi_step_reward),
+        duration=transition.duration,
+        prev_positions=transition.prev_positions,
+        n_frames=transition.n_frames,
+    )
+
+
+def convert_proto_to_transition(proto: TransitionProto) -> TransitionData:
+    multi_step_reward = convert_proto_to_item(proto.multi_step_reward)
+    assert isinstance(multi_step_reward, np.ndarray)
+    return TransitionData(
+        curr_position=proto.curr_position,
+        next_position=None if proto.next_position < 0 else proto.next_position,
+        multi_step_reward=multi_step_reward,
+        duration=proto.duration,
+        prev_positions=list(proto.prev_positions),
+        n_frames=proto.n_frames,
+    )
+
+
+def _convert_stacked_item_to_proto(item: StackedItem) -> ItemProto:
+    # sampled rewards can be float64 when they are computed in Python
+    if isinstance(item, np.ndarray):
+        item = [item]
+    item = [
+        el.astype(np.float32) if el.dtype == np.float64 else el for el in item
+    ]
+    return convert_item_to_proto(item)
+
+
+def convert_batch_to_proto(batch: Batch) -> BatchProto:
+    return BatchProto(
+        observations=_convert_stacked_item_to_proto(batch.observations),
+        actions=_convert_stacked_item_to_proto(batch.actions),
+        rewards=_convert_stacked_item_to_proto(batch.rewards),
+        next_observations=_convert_stacked_item_to_proto(
+            batch.next_observations
+        ),
+        terminals=_convert_stacked_item_to_proto(batch.terminals),
+        durations=_convert_stacked_item_to_proto(batch.durations),
+    )
+
+
+def _convert_proto_to_stacked_item(proto: ItemProto) -> StackedItem:
+    item = convert_proto_to_item(proto)
+    assert isinstance(item, (np.ndarray, list))
+    return item
+
+
+def convert_proto_to_batch(proto: BatchProto) -> Batch:
+    terminals = _convert_proto_to_stacked_item(proto.terminals)
+    durations = _convert_proto_to_stacked_item(proto.durations)
+    assert isinstance(terminals, np.ndarray)
+    assert isinstance(durations, np.ndarray)
+    return Batch(
+        observations=_convert_proto_to_stacked_item(proto.observations),
+        actions=_convert_proto_to_stacked_item(proto.actions),
+        rewards=_convert_proto_to_stacked_item(proto.rewards),
+        next_observations=_convert_proto_to_stacked_item(
+            proto.next_observations
+        ),
+        terminals=terminals,
+        durations=durations,
+    )
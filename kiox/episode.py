@@ -1,10 +1,12 @@
-from typing import Dict, List, Optional, Sequence
+import warnings
+from typing import Callable, Dict, List, Optional, Sequence
 
 import numpy as np
 
 from .step import PartialStep, Step, StepBuffer
 from .transition import LazyTransition
 from .transition_buffer import TransitionBuffer
+from .transition_table import LazyTransitionBatch
 
 
 class Episode:
@@ -20,7 +22,7 @@ class Episode:
 
     _step_buffer: StepBuffer
     _transition_buffer: TransitionBuffer
-    _transitions: List[LazyTransition]
+    _num_transitions: int
     _idx_list: List[int]
     _prev_idx: Dict[int, int]
     _next_idx: Dict[int, int]
@@ -31,7 +33,7 @@ class Episode:
     ) -> None:
         self._step_buffer = step_buffer
         self._transition_buffer = transition_buffer
-        self._transitions = []
+        self._num_transitions = 0
         self._idx_list = []
         self._prev_idx = {}
         self._next_idx = {}
@@ -48,12 +50,39 @@ class Episode:
 
         """
         step = self._step_buffer.append(partial_step)
+        self.attach_step(step)
+        return step
+
+    def attach_step(self, step: Step) -> None:
+        """Appends Step object already stored in StepBuffer.
+
+        Args:
+            step: Step object.
+
+        """
         self._idx_list.append(step.idx)
         if self._prev_step:
             self._prev_idx[step.idx] = self._prev_step.idx
             self._next_idx[self._prev_step.idx] = step.idx
         self._prev_step = step
-        return step
+
+    def attach_steps(self, indices: Sequence[int]) -> None:
+        """Appends steps already stored in StepBuffer in bulk.
+
+        Args:
+            indices: a sequence of step idx.
+
+        """
+        indices = [int(idx) for idx in indices]
+        if not indices:
+            return
+        if self._prev_step:
+            self._prev_idx[indices[0]] = self._prev_step.idx
+            self._next_idx[self._prev_step.idx] = indices[0]
+        self._idx_list.extend(indices)
+        self._prev_idx.update(zip(indices[1:], indices[:-1]))
+        self._next_idx.update(zip(indices[:-1], indices[1:]))
+        self._prev_step = self._step_buffer.get(indices[-1])
 
     def append_transition(
         self, transition: LazyTransition
@@ -67,9 +96,18 @@ class Episode:
             LazyTransition object dropped by TransitionBuffer.
 
         """
-        self._transitions.append(transition)
+        self._num_transitions += 1
         return self._transition_buffer.append(transition)
 
+    def add_transition_count(self, count: int) -> None:
+        """Counts transitions appended to TransitionBuffer in bulk.
+
+        Args:
+            count: number of transitions.
+
+        """
+        self._num_transitions += count
+
     def get(self, idx: int) -> Step:
         """Returns step by specified idx.
 
@@ -94,6 +132,18 @@ class Episode:
         """
         return self._step_buffer.get(self._idx_list[index])
 
+    def get_idx_by_index(self, index: int) -> int:
+        """Returns step idx by specified index.
+
+        Args:
+            index: step index.
+
+        Returns:
+            step idx.
+
+        """
+        return self._idx_list[index]
+
     def get_next(self, idx: int, duration: int = 1) -> Optional[Step]:
         """Returns step ``duration`` steps ahead from ``idx``.
 
@@ -167,6 +217,15 @@ class Episode:
         """
         return len(self._idx_list)
 
+    def transition_size(self) -> int:
+        """Returns number of transitions created from this episode.
+
+        Returns:
+            number of transitions.
+
+        """
+        return self._num_transitions
+
     def includes(self, idx: int) -> bool:
         """Returns if ``idx`` exists in episode.
 
@@ -174,7 +233,10 @@ class Episode:
             ``True`` if ``idx`` exists.
 
         """
-        return idx in self._idx_list
+        # every step except the first one has a previous step
+        if idx in self._prev_idx:
+            return True
+        return bool(self._idx_list) and self._idx_list[0] == idx
 
     @property
     def steps(self) -> Sequence[Step]:
@@ -182,7 +244,29 @@ class Episode:
 
     @property
     def transitions(self) -> Sequence[LazyTransition]:
-        return self._transitions
+        """Returns transitions of this episode left in TransitionBuffer.
+
+        .. deprecated::
+            Episodes do not hold transitions anymore. Use
+            ``transition_size`` to count transitions created from this
+            episode.
+
+        """
+        warnings.warn(
+            "Episode.transitions is deprecated. Use transition_size instead.",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return [
+            transition
+            for transition in self._transition_buffer.transitions
+            if self.includes(transition.curr_idx)
+        ]
+
+    @property
+    def first_idx(self) -> int:
+        assert self._idx_list, "episode is empty"
+        return self._idx_list[0]
 
 
 class EpisodeManager:
@@ -193,23 +277,34 @@ class EpisodeManager:
     Args:
         step_buffer: StepBuffer object.
         transition_buffer: TransitionBuffer object.
+        drop_handler: function called with ``curr_idx`` of each transition
+            dropped by TransitionBuffer. If ``None``, the transition is
+            dropped from this manager. A custom handler is required when
+            TransitionBuffer is shared by multiple managers since a dropped
+            transition might belong to another manager.
 
     """
 
     _step_buffer: StepBuffer
     _transition_buffer: TransitionBuffer
     _episodes: List[Episode]
-    _transition_to_episode: Dict[int, Episode]
-    _dropped_transitions: Dict[Episode, List[LazyTransition]]
+    _dropped_transitions: Dict[Episode, int]
+    _drop_handler: Callable[[int], None]
 
     def __init__(
-        self, step_buffer: StepBuffer, transition_buffer: TransitionBuffer
+        self,
+        step_buffer: StepBuffer,
+        transition_buffer: TransitionBuffer,
+        drop_handler: Optional[Callable[[int], None]] = None,
     ) -> None:
         self._step_buffer = step_buffer
         self._transition_buffer = transition_buffer
         self._episodes = [Episode(step_buffer, transition_buffer)]
-        self._transition_to_episode = {}
         self._dropped_transitions = {}
+        if drop_handler is None:
+            self._drop_handler = self.drop_transition
+        else:
+            self._drop_handler = drop_handler
 
     def append_step(self, partial_step: PartialStep) -> Step:
         """Appends step to active episode.
@@ -223,36 +318,113 @@ class EpisodeManager:
         """
         return self.active_episode.append_step(partial_step)
 
+    def attach_step(self, step: Step) -> None:
+        """Appends Step object already stored in StepBuffer to active episode.
+
+        Args:
+            step: Step object.
+
+        """
+        self.active_episode.attach_step(step)
+
+    def attach_steps(self, indices: Sequence[int]) -> None:
+        """Appends steps already stored in StepBuffer to active episode.
+
+        Args:
+            indices: a sequence of step idx.
+
+        """
+        self.active_episode.attach_steps(indices)
+
     def append_transition(self, transition: LazyTransition) -> None:
         """Appends LazyTransition object.
 
         If all transitions are dropped from an episode, the episode and
-        included steps will be removed.
+        included steps will be removed. The episode of a dropped transition
+        is located by its ``curr_idx``.
 
         Args:
             transition: LazyTransition object.
 
         """
-        self._transition_to_episode[id(transition)] = self.active_episode
         dropped_transition = self.active_episode.append_transition(transition)
         if dropped_transition:
-            episode = self._transition_to_episode[id(dropped_transition)]
+            self._drop_handler(dropped_transition.curr_idx)
+
+    def extend_transitions(
+        self,
+        lazy_batch: LazyTransitionBatch,
+        episodes: Sequence[Episode],
+        counts: Sequence[int],
+    ) -> None:
+        """Appends transitions in bulk.
+
+        Args:
+            lazy_batch: LazyTransitionBatch object.
+            episodes: episodes including the transitions.
+            counts: number of transitions of each episode.
+
+        """
+        for episode, count in zip(episodes, counts):
+            episode.add_transition_count(int(count))
+        dropped_idx = self._transition_buffer.extend(lazy_batch)
+        for curr_idx in dropped_idx:
+            self._drop_handler(int(curr_idx))
 
-            if episode not in self._dropped_transitions:
-                self._dropped_transitions[episode] = []
+    def drop_transition(self, curr_idx: int) -> None:
+        """Records a transition dropped from TransitionBuffer.
 
-            # record what transition has been removed
-            self._dropped_transitions[episode].append(dropped_transition)
-            del self._transition_to_episode[id(dropped_transition)]
+        If all transitions are dropped from an episode, the episode and
+        included steps will be removed. The active episode is removed when
+        it is clipped since new transitions can still refer to its steps.
+
+        Args:
+            curr_idx: ``curr_idx`` of the dropped transition.
+
+        """
+        episode = self.find_episode(curr_idx)
+        assert episode, f"Step(idx={curr_idx}) does not belong to any episode"
+
+        # record how many transitions have been removed
+        num_dropped = self._dropped_transitions.get(episode, 0) + 1
+        self._dropped_transitions[episode] = num_dropped
+
+        if episode is not self.active_episode:
+            self._remove_episode_if_dropped(episode)
+
+    def _remove_episode_if_dropped(self, episode: Episode) -> None:
+        num_dropped = self._dropped_transitions.get(episode, 0)
+        if num_dropped == episode.transition_size():
+            self._dropped_transitions.pop(episode, None)
+            self._episodes.pop(self._episodes.index(episode))
+            for step in episode.steps:
+                self._step_buffer.drop(step.idx)
+
+    def find_episode(self, idx: int) -> Optional[Episode]:
+        """Returns episode including the step.
 
-            # remove steps and episode
-            if len(self._dropped_transitions[episode]) == len(
-                episode.transitions
-            ):
-                del self._dropped_transitions[episode]
-                self._episodes.pop(self._episodes.index(episode))
-                for step in episode.steps:
-                    self._step_buffer.drop(step.idx)
+        Args:
+            idx: step idx.
+
+        Returns:
+            Episode object. ``None`` if the step does not belong to this
+            manager.
+
+        """
+        # episodes are sorted by idx and only the active one can be empty
+        low = 0
+        high = len(self._episodes)
+        if self.active_episode.size() == 0:
+            high -= 1
+        while low < high:
+            mid = (low + high) // 2
+            if self._episodes[mid].first_idx <= idx:
+                low = mid + 1
+            else:
+                high = mid
+        if low == 0 or not self._episodes[low - 1].includes(idx):
+            return None
+        return self._episodes[low - 1]
 
     def get_step_by_idx(self, idx: int) -> Step:
         """Returns step by specified ``idx`.
@@ -273,9 +445,17 @@ class EpisodeManager:
         terminated.
 
         """
+        if self.active_episode.size() == 0:
+            return
+        clipped_episode = self.active_episode
+        last_step = clipped_episode.get_by_index(-1)
+        self._step_buffer.mark_episode_end(last_step.idx)
         self._episodes.append(
             Episode(self._step_buffer, self._transition_buffer)
         )
+        # all transitions might have been dropped while it was active
+        if clipped_episode in self._dropped_transitions:
+            self._remove_episode_if_dropped(clipped_episode)
 
     def get_total_step_size(self) -> int:
         """Returns total step size.
@@ -293,3 +473,7 @@ class EpisodeManager:
     @property
     def episodes(self) -> Sequence[Episode]:
         return self._episodes
+
+    @property
+    def step_buffer(self) -> StepBuffer:
+        return self._step_buffer
@@ -1,68 +1,538 @@
-from typing import BinaryIO, Sequence
+import dataclasses
+import threading
+from collections import OrderedDict
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import h5py
+import numpy as np
 
 from .episode import Episode
+from .item import Item, StackedItem
+from .step import PartialStep, Step, StepBuffer
 from .step_collector import StepCollector
 
+DEFAULT_CHUNK_SIZE = 10000
+DEFAULT_CHUNK_CACHE_SIZE = 64 * 1024 * 1024
+DEFAULT_BLOCK_SIZE = 64
 
-def dump_memory(f: BinaryIO, episodes: Sequence[Episode]) -> None:
-    """Dumps data as HDF5.
+
+@dataclasses.dataclass(frozen=True)
+class StorageProfile:
+    """HDF5 storage options for saved buffers.
+
+    The chunk layout and filters are applied to observations. The other
+    datasets share the filters and are chunked by the writer's buffer size.
+
+    .. code-block:: python
+
+        # one compressed frame per chunk for random access
+        profile = StorageProfile(compression="gzip", chunk_size=1, shuffle=True)
+        with open("data.h5", "wb") as f:
+            kiox.save(f, profile)
 
     Args:
-        f: I/O-like object.
-        episodes: list of episodes.
+        compression: compression filter. ``gzip``, ``lzf`` or ``None``.
+        compression_level: compression level for ``gzip`` from 0 to 9.
+        chunk_size: number of steps in each observation chunk. If ``None``,
+            datasets are stored contiguously.
+        shuffle: flag to enable shuffle filter.
+
+    """
+
+    compression: Optional[str] = None
+    compression_level: Optional[int] = None
+    chunk_size: Optional[int] = None
+    shuffle: bool = False
+
+    def __post_init__(self) -> None:
+        if self.compression not in (None, "gzip", "lzf"):
+            raise ValueError(f"invalid compression: {self.compression}")
+        if self.compression_level is not None and self.compression != "gzip":
+            raise ValueError("compression_level is only available for gzip")
+        if self.chunk_size is None and (self.compression or self.shuffle):
+            raise ValueError("filters require chunk_size")
+        if self.chunk_size is not None and self.chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+
+
+class _HDF5StepWriter:
+    """Streaming writer that fills HDF5 datasets chunk by chunk.
+
+    Datasets are preallocated with the total number of steps, and their
+    shapes and dtypes are inferred from the first written steps. Only
+    ``chunk_size`` steps are kept in memory. Preallocation keeps the file
+    writable through write-only file objects, which resizable datasets do
+    not allow.
+
+    With chunked layout, the buffer size is rounded up to a multiple of the
+    observation chunk so that every write covers whole chunks, which lets
+    compressed chunks be written without reading them back.
+
+    Args:
+        h5: HDF5 file object.
+        total_size: total number of steps.
+        chunk_size: number of steps to buffer before writing.
+        profile: StorageProfile object.
 
     """
-    observations = []
-    actions = []
-    rewards = []
-    terminals = []
-    timeouts = []
+
+    _h5: h5py.File
+    _total_size: int
+    _chunk_size: int
+    _profile: StorageProfile
+    _buffers: Dict[str, List[Item]]
+    _size: int
+
+    def __init__(
+        self,
+        h5: h5py.File,
+        total_size: int,
+        chunk_size: int,
+        profile: StorageProfile,
+    ):
+        self._h5 = h5
+        self._total_size = total_size
+        self._profile = profile
+        if profile.chunk_size is None:
+            self._chunk_size = chunk_size
+        else:
+            num_chunks = -(-chunk_size // profile.chunk_size)
+            self._chunk_size = num_chunks * profile.chunk_size
+        self._buffers = {
+            "observations": [],
+            "actions": [],
+            "rewards": [],
+            "terminals": [],
+            "timeouts": [],
+        }
+        self._size = 0
+
+    def append(self, step: Step, timeout: bool) -> None:
+        self._buffers["observations"].append(step.observation)
+        self._buffers["actions"].append(step.action)
+        self._buffers["rewards"].append(step.reward)
+        self._buffers["terminals"].append(float(step.terminal))
+        self._buffers["timeouts"].append(timeout)
+        if len(self._buffers["timeouts"]) >= self._chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        num_steps = len(self._buffers["timeouts"])
+        if num_steps == 0:
+            return
+        for name, items in self._buffers.items():
+            data = np.array(items)
+            if name not in self._h5:
+                self._create_dataset(name, data)
+            self._h5[name][self._size : self._size + num_steps] = data
+            items.clear()
+        self._size += num_steps
+
+    def close(self) -> None:
+        self.flush()
+        # datasets are created on the first write, which never happens
+        # without steps
+        for name in self._buffers:
+            if name not in self._h5:
+                self._h5.create_dataset(name, shape=(0,), dtype=np.float64)
+
+    def _create_dataset(self, name: str, data: np.ndarray) -> None:
+        shape = (self._total_size, *data.shape[1:])
+        options: Dict[str, Any] = {}
+        if self._profile.chunk_size is not None:
+            if name == "observations":
+                chunk_rows = self._profile.chunk_size
+            else:
+                chunk_rows = self._chunk_size
+            options = {
+                "chunks": (min(chunk_rows, shape[0]), *shape[1:]),
+                "compression": self._profile.compression,
+                "compression_opts": self._profile.compression_level,
+                "shuffle": self._profile.shuffle,
+            }
+        self._h5.create_dataset(name, shape=shape, dtype=data.dtype, **options)
+
+
+def _iterate_steps(episodes: Sequence[Episode]) -> Iterator[Tuple[Step, bool]]:
     for episode in episodes:
         for i, step in enumerate(episode.steps):
-            observations.append(step.observation)
-            actions.append(step.action)
-            rewards.append(step.reward)
-            terminals.append(step.terminal)
             if step.terminal:
-                timeouts.append(False)
-            elif i == episode.size() - 1:
-                timeouts.append(True)
+                timeout = False
             else:
-                timeouts.append(False)
+                timeout = i == episode.size() - 1
+            yield step, timeout
+
+
+def dump_memory(
+    f: BinaryIO,
+    episodes: Sequence[Episode],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    profile: Optional[StorageProfile] = None,
+) -> None:
+    """Dumps data as HDF5.
 
+    Steps are streamed episode by episode into preallocated datasets so
+    that at most ``chunk_size`` steps are buffered in memory.
+
+    Args:
+        f: I/O-like object.
+        episodes: list of episodes.
+        chunk_size: number of steps to write at once.
+        profile: StorageProfile object. If ``None``, datasets are stored
+            contiguously without compression.
+
+    """
+    if profile is None:
+        profile = StorageProfile()
     with h5py.File(f, "w") as h5:
-        h5.create_dataset("observations", data=observations)
-        h5.create_dataset("actions", data=actions)
-        h5.create_dataset("rewards", data=rewards)
-        h5.create_dataset("terminals", data=terminals)
-        h5.create_dataset("timeouts", data=timeouts)
+        total_size = sum(episode.size() for episode in episodes)
+        writer = _HDF5StepWriter(h5, total_size, chunk_size, profile)
+        for step, timeout in _iterate_steps(episodes):
+            writer.append(step, timeout)
+        writer.close()
         h5.flush()
 
 
-def load_memory(f: BinaryIO, step_collector: StepCollector) -> None:
+def _split_by_episodes(
+    terminals: np.ndarray, timeouts: np.ndarray, chunk_size: int
+) -> List[Tuple[int, int]]:
+    # chunk boundaries are placed at episode ends as long as possible
+    size = terminals.shape[0]
+    ends = np.flatnonzero((terminals != 0) | (timeouts != 0)) + 1
+    if ends.shape[0] == 0 or ends[-1] != size:
+        ends = np.append(ends, size)
+    ranges = []
+    start = 0
+    while start < size:
+        limit = start + chunk_size
+        candidates = ends[(ends > start) & (ends <= limit)]
+        if candidates.shape[0] > 0:
+            stop = int(candidates[-1])
+        else:
+            # a single episode is longer than chunk_size
+            stop = int(ends[ends > start][0])
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def load_memory(
+    f: BinaryIO,
+    step_collector: StepCollector,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    chunk_cache_size: int = DEFAULT_CHUNK_CACHE_SIZE,
+) -> None:
     """Loads HDF5 data.
 
+    Data is read in chunks of whole episodes and ingested in bulk with
+    ``StepCollector.collect_batch``. HDF5 chunks across two reads are kept
+    in the chunk cache so that they are decompressed only once.
+
     Args:
         f: I/O-like object.
         step_collector: StepCollector object.
+        chunk_size: approximate number of steps to read at once.
+        chunk_cache_size: HDF5 chunk cache size in bytes.
 
     """
-    with h5py.File(f, "r") as h5:
-        observations = h5["observations"][()]
-        actions = h5["actions"][()]
-        rewards = h5["rewards"][()]
+    with h5py.File(f, "r", rdcc_nbytes=chunk_cache_size) as h5:
         terminals = h5["terminals"][()]
         timeouts = h5["timeouts"][()]
+        for start, stop in _split_by_episodes(terminals, timeouts, chunk_size):
+            step_collector.collect_batch(
+                observations=h5["observations"][start:stop],
+                actions=h5["actions"][start:stop],
+                rewards=h5["rewards"][start:stop],
+                terminals=terminals[start:stop],
+                timeouts=timeouts[start:stop],
+            )
+
+
+class _HDF5DatasetReader:
+    """Reader to gather rows of HDF5 dataset.
+
+    Requested rows are sorted and deduplicated, and consecutive rows are
+    read with a single request. If ``cache_size`` is positive, rows are read
+    by blocks, which are HDF5 chunks for chunked datasets, and the last
+    ``cache_size`` blocks are kept in LRU order.
+
+    Args:
+        dataset: HDF5 dataset.
+        cache_size: number of blocks to cache.
+        block_size: number of rows in a block of contiguous datasets.
+
+    """
+
+    _dataset: h5py.Dataset
+    _cache_size: int
+    _block_size: int
+    _cache: "OrderedDict[int, np.ndarray]"
+    _num_reads: int
+    _num_hits: int
+    _lock: threading.Lock
+
+    def __init__(self, dataset: h5py.Dataset, cache_size: int, block_size: int):
+        self._dataset = dataset
+        self._cache_size = cache_size
+        if dataset.chunks is None:
+            self._block_size = block_size
+        else:
+            self._block_size = dataset.chunks[0]
+        self._cache = OrderedDict()
+        self._num_reads = 0
+        self._num_hits = 0
+        self._lock = threading.Lock()
 
-    for observation, action, reward, terminal, timeout in zip(
-        observations, actions, rewards, terminals, timeouts
+    def read(
+        self, rows: np.ndarray, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        unique_rows, inverse = np.unique(rows, return_inverse=True)
+        with self._lock:
+            if self._cache_size > 0:
+                data = self._read_blocks(unique_rows)
+            else:
+                data = self._read_runs(unique_rows)
+        if out is None:
+            return data[inverse]
+        np.copyto(out, np.reshape(data[inverse], out.shape))
+        return out
+
+    def _read_runs(self, unique_rows: np.ndarray) -> np.ndarray:
+        data = np.empty(
+            (unique_rows.shape[0], *self._dataset.shape[1:]),
+            dtype=self._dataset.dtype,
+        )
+        offset = 0
+        for start, stop in _find_runs(unique_rows):
+            size = stop - start
+            self._dataset.read_direct(
+                data,
+                np.s_[start:stop],
+                np.s_[offset : offset + size],
+            )
+            offset += size
+            self._num_reads += 1
+        return data
+
+    def _read_blocks(self, unique_rows: np.ndarray) -> np.ndarray:
+        block_size = self._block_size
+        blocks = np.unique(unique_rows // block_size)
+
+        # read missing consecutive blocks at once
+        missing = np.array(
+            [b for b in blocks if int(b) not in self._cache], dtype=np.int64
+        )
+        for start, stop in _find_runs(missing):
+            data = self._dataset[start * block_size : stop * block_size]
+            self._num_reads += 1
+            for i, block in enumerate(range(start, stop)):
+                chunk = data[i * block_size : (i + 1) * block_size]
+                self._cache[block] = chunk.copy()
+        self._num_hits += blocks.shape[0] - missing.shape[0]
+
+        data = np.empty(
+            (unique_rows.shape[0], *self._dataset.shape[1:]),
+            dtype=self._dataset.dtype,
+        )
+        bounds = np.searchsorted(unique_rows, blocks * block_size)
+        bounds = np.append(bounds, unique_rows.shape[0])
+        for block, start, stop in zip(blocks, bounds[:-1], bounds[1:]):
+            self._cache.move_to_end(int(block))
+            offsets = unique_rows[start:stop] - block * block_size
+            data[start:stop] = self._cache[int(block)][offsets]
+
+        # evict least recently used blocks
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+        return data
+
+    @property
+    def num_reads(self) -> int:
+        return self._num_reads
+
+    @property
+    def num_hits(self) -> int:
+        return self._num_hits
+
+
+def _find_runs(sorted_values: np.ndarray) -> List[Tuple[int, int]]:
+    # [start, stop) ranges of consecutive values
+    if sorted_values.shape[0] == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(sorted_values) != 1) + 1
+    starts = sorted_values[np.concatenate([[0], breaks])]
+    stops = sorted_values[np.append(breaks - 1, -1)] + 1
+    return [(int(start), int(stop)) for start, stop in zip(starts, stops)]
+
+
+class HDF5StepBuffer(StepBuffer):
+    """Read-only StepBuffer backed by HDF5 file saved by ``dump_memory``.
+
+    Rewards, terminal flags and timeout flags are loaded in memory to build
+    episodes and transitions, while observations and actions are read from
+    the file when they are sampled. Step idx corresponds to the row in the
+    file. Passing this buffer to ``Kiox`` builds the transition index
+    without reading observations. Since the file is not modified, dropping
+    steps with a bounded TransitionBuffer such as ``FIFOTransitionBuffer``
+    is a no-op.
+
+    .. code-block:: python
+
+        step_buffer = HDF5StepBuffer("data.h5", cache_size=1024)
+        kiox = Kiox(
+            UnlimitedTransitionBuffer(use_table=True),
+            FrameStackTransitionFactory(4),
+            step_buffer=step_buffer,
+            vectorized=True,
+        )
+        batch = kiox.sample(32)
+
+    Args:
+        f: path or I/O-like object of HDF5 file.
+        cache_size: number of blocks to keep in LRU cache for each dataset.
+            ``0`` disables the cache.
+        block_size: number of rows in a cached block for contiguous
+            datasets. HDF5 chunks are used as blocks for chunked datasets.
+
+    """
+
+    _h5: h5py.File
+    _observations: _HDF5DatasetReader
+    _actions: _HDF5DatasetReader
+    _rewards: np.ndarray
+    _terminals: np.ndarray
+    _timeouts: np.ndarray
+
+    def __init__(
+        self,
+        f: Union[str, BinaryIO],
+        cache_size: int = 0,
+        block_size: int = DEFAULT_BLOCK_SIZE,
     ):
-        step_collector.collect(
-            observation=observation,
-            action=action,
-            reward=reward,
-            terminal=terminal,
-            timeout=timeout,
+        super().__init__()
+        self._h5 = h5py.File(f, "r")
+        self._observations = _HDF5DatasetReader(
+            self._h5["observations"], cache_size, block_size
+        )
+        self._actions = _HDF5DatasetReader(
+            self._h5["actions"], cache_size, block_size
         )
+        self._rewards = self._h5["rewards"][()]
+        self._terminals = self._h5["terminals"][()]
+        self._timeouts = self._h5["timeouts"][()]
+        self._counter = int(self._terminals.shape[0])
+
+    def get(self, idx: int) -> Step:
+        assert 0 <= idx < self._counter, f"Step(idx={idx}) does not exist"
+        rows = np.array([idx])
+        reward = self._rewards[idx]
+        return Step(
+            idx=idx,
+            observation=self._observations.read(rows)[0],
+            action=self._actions.read(rows)[0],
+            reward=reward.item() if reward.ndim == 0 else reward,
+            terminal=float(self._terminals[idx]),
+        )
+
+    def append(self, partial_step: PartialStep) -> Step:
+        raise ValueError("HDF5StepBuffer is read-only")
+
+    def extend(
+        self,
+        observations: StackedItem,
+        actions: StackedItem,
+        rewards: np.ndarray,
+        terminals: np.ndarray,
+    ) -> np.ndarray:
+        raise ValueError("HDF5StepBuffer is read-only")
+
+    def drop(self, idx: int) -> None:
+        # steps stay in the file while their episodes are released
+        pass
+
+    def size(self) -> int:
+        return self._counter
+
+    def gather_observations(
+        self, indices: np.ndarray, out: Optional[StackedItem] = None
+    ) -> StackedItem:
+        assert out is None or isinstance(out, np.ndarray)
+        return self._observations.read(indices, out)
+
+    def gather_actions(
+        self, indices: np.ndarray, out: Optional[StackedItem] = None
+    ) -> StackedItem:
+        assert out is None or isinstance(out, np.ndarray)
+        return self._actions.read(indices, out)
+
+    def gather_rewards(
+        self, indices: np.ndarray, out: Optional[StackedItem] = None
+    ) -> StackedItem:
+        rewards = self._rewards[indices]
+        if rewards.ndim == 1:
+            rewards = np.reshape(rewards, [-1, 1])
+        if out is None:
+            return rewards
+        assert isinstance(out, np.ndarray)
+        np.copyto(out, rewards)
+        return out
+
+    def gather_terminals(
+        self, indices: np.ndarray, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        terminals = np.reshape(self._terminals[indices], [-1, 1])
+        if out is None:
+            return terminals
+        np.copyto(out, terminals)
+        return out
+
+    def close(self) -> None:
+        """Closes HDF5 file."""
+        self._h5.close()
+
+    @property
+    def steps(self) -> Sequence[Step]:
+        return [self.get(idx) for idx in range(self._counter)]
+
+    @property
+    def rewards(self) -> np.ndarray:
+        return self._rewards
+
+    @property
+    def terminals(self) -> np.ndarray:
+        return self._terminals
+
+    @property
+    def timeouts(self) -> np.ndarray:
+        return self._timeouts
+
+    @property
+    def num_reads(self) -> int:
+        """Returns number of read requests to HDF5 datasets.
+
+        Returns:
+            number of read requests.
+
+        """
+        return self._observations.num_reads + self._actions.num_reads
+
+    @property
+    def num_cache_hits(self) -> int:
+        """Returns number of blocks found in LRU cache.
+
+        Returns:
+            number of cache hits.
+
+        """
+        return self._observations.num_hits + self._actions.num_hits
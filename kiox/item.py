@@ -1,4 +1,4 @@
-from typing import Sequence, Union
+from typing import Optional, Sequence, Union
 
 import numpy as np
 
@@ -6,7 +6,9 @@ Item = Union[int, float, np.ndarray, Sequence[np.ndarray]]
 StackedItem = Union[np.ndarray, Sequence[np.ndarray]]
 
 
-def stack_items(items: Sequence[Item]) -> StackedItem:
+def stack_items(
+    items: Sequence[Item], out: Optional[StackedItem] = None
+) -> StackedItem:
     """Stacks a sequence of items.
 
     In case of ``int`` or ``float`` sequence:
@@ -38,14 +40,26 @@ def stack_items(items: Sequence[Item]) -> StackedItem:
         assert stacked_items[0].shape == (3, 2)
         assert stacked_items[1].shape == (3, 4)
 
+    If ``out`` is given, items are written into the preallocated arrays
+    instead of allocating new ones:
+
+    .. code-block:: python
+
+        stacked_item = stack_items(items)
+        stacked_item = stack_items(items, out=stacked_item)
+
     Args:
         items: a list of items.
+        out: preallocated stacked item with the same structure as the result.
 
     Returns:
         stacked items.
 
     """
     item = items[0]
+    if out is not None:
+        _stack_items_into(items, out)
+        return out
     if isinstance(item, (int, float)):
         stacked_items = np.reshape(np.array(items), [-1, 1])
     elif isinstance(item, np.ndarray):
@@ -61,6 +75,22 @@ def stack_items(items: Sequence[Item]) -> StackedItem:
     return stacked_items
 
 
+def _stack_items_into(items: Sequence[Item], out: StackedItem) -> None:
+    item = items[0]
+    if isinstance(item, (int, float)):
+        assert isinstance(out, np.ndarray)
+        out[:, 0] = items
+    elif isinstance(item, np.ndarray):
+        assert isinstance(out, np.ndarray)
+        np.stack(items, axis=0, out=out)
+    elif isinstance(item, (list, tuple)):
+        assert isinstance(out, (list, tuple))
+        for i, array in enumerate(out):
+            np.stack([el[i] for el in items], axis=0, out=array)  # type: ignore
+    else:
+        raise ValueError(f"unrecognized item type: {type(item)}")
+
+
 def zeros_like(item: Item) -> Item:
     """Creates identically shaped item filled with zeros.
 
@@ -119,3 +149,24 @@ def locate_stacked_item(stacked_item: StackedItem, index: int) -> Item:
     else:
         assert isinstance(stacked_item, np.ndarray)
         return stacked_item[index]
+
+
+def slice_stacked_item(
+    stacked_item: StackedItem, start: int, stop: int
+) -> StackedItem:
+    """Returns items from ``start`` to ``stop``.
+
+    Args:
+        stacked_item: stacked items.
+        start: start location.
+        stop: stop location.
+
+    Returns:
+        sliced stacked items.
+
+    """
+    if isinstance(stacked_item, (list, tuple)):
+        return [item[start:stop] for item in stacked_item]
+    else:
+        assert isinstance(stacked_item, np.ndarray)
+        return stacked_item[start:stop]
@@ -1,11 +1,13 @@
+import threading
 from typing import BinaryIO, Optional, Union
 
+import numpy as np
 from typing_extensions import Protocol
 
 from .batch_factory import Batch, BatchFactory
 from .episode import EpisodeManager
-from .io import dump_memory, load_memory
-from .item import Item
+from .io import HDF5StepBuffer, StorageProfile, dump_memory, load_memory
+from .item import Item, StackedItem
 from .step import StepBuffer
 from .step_collector import StepCollector
 from .transition_buffer import TransitionBuffer
@@ -75,11 +77,15 @@ class KioxProtocol(Protocol):
 
         """
 
-    def save(self, f: BinaryIO) -> None:
+    def save(
+        self, f: BinaryIO, profile: Optional[StorageProfile] = None
+    ) -> None:
         """Saves data as HDF5.
 
         Args:
             f: I/O-like object.
+            profile: StorageProfile object to configure compression and
+                chunk layout.
 
         """
 
@@ -130,6 +136,14 @@ class Kiox(KioxProtocol):
         n_steps: step size for multi-step learning. This corresponds to TD(N).
         gamma: discounted factor. If ``n_steps=1``, this value does not make
             any difference.
+        step_buffer: StepBuffer object. If ``None``, ``StepBuffer`` is used.
+            If the given buffer already has steps, episodes and transitions
+            are rebuilt from them.
+        vectorized: flag to sample mini-batch in vectorized mode. See
+            ``BatchFactory`` for details.
+
+    Collection and sampling are serialized with an internal lock so that
+    batches can be sampled in a background thread with ``BatchPrefetcher``.
 
     """
 
@@ -139,6 +153,7 @@ class Kiox(KioxProtocol):
     _transition_factory: TransitionFactory
     _batch_factory: BatchFactory
     _step_collector: StepCollector
+    _lock: threading.Lock
 
     def __init__(
         self,
@@ -146,8 +161,10 @@ class Kiox(KioxProtocol):
         transition_factory: TransitionFactory,
         n_steps: int = 1,
         gamma: float = 0.99,
+        step_buffer: Optional[StepBuffer] = None,
+        vectorized: bool = False,
     ):
-        self._step_buffer = StepBuffer()
+        self._step_buffer = StepBuffer() if step_buffer is None else step_buffer
         self._transition_buffer = transition_buffer
         self._transition_factory = transition_factory
         self._episode_manager = EpisodeManager(
@@ -157,7 +174,9 @@ class Kiox(KioxProtocol):
         self._batch_factory = BatchFactory(
             step_buffer=self._step_buffer,
             transition_buffer=transition_buffer,
+            vectorized=vectorized,
         )
+        self._lock = threading.Lock()
         self._step_collector = StepCollector(
             episode_manager=self._episode_manager,
             transition_factory=transition_factory,
@@ -165,6 +184,21 @@ class Kiox(KioxProtocol):
             gamma=gamma,
         )
 
+        # rebuild episodes and transitions from pre-stored steps
+        if isinstance(self._step_buffer, HDF5StepBuffer):
+            # build index without reading observations
+            self._step_collector.attach_batch(
+                indices=np.arange(self._step_buffer.size()),
+                rewards=self._step_buffer.rewards,
+                terminals=self._step_buffer.terminals,
+                timeouts=self._step_buffer.timeouts,
+            )
+        else:
+            for step in self._step_buffer.steps:
+                self._step_collector.attach(
+                    step, timeout=self._step_buffer.is_episode_end(step.idx)
+                )
+
     def collect(
         self,
         observation: Item,
@@ -174,13 +208,43 @@ class Kiox(KioxProtocol):
         timeout: Optional[bool] = None,
     ) -> None:
         terminal = float(terminal) if isinstance(terminal, bool) else terminal
-        self._step_collector.collect(
-            observation=observation,
-            action=action,
-            reward=reward,
-            terminal=terminal,
-            timeout=timeout,
-        )
+        with self._lock:
+            self._step_collector.collect(
+                observation=observation,
+                action=action,
+                reward=reward,
+                terminal=terminal,
+                timeout=timeout,
+            )
+
+    def collect_batch(
+        self,
+        observations: StackedItem,
+        actions: StackedItem,
+        rewards: np.ndarray,
+        terminals: np.ndarray,
+        timeouts: Optional[np.ndarray] = None,
+    ) -> None:
+        """Stores a sequence of experience tuples in bulk.
+
+        See ``StepCollector.collect_batch`` for details.
+
+        Args:
+            observations: a sequence of observations.
+            actions: a sequence of actions.
+            rewards: a sequence of rewards.
+            terminals: a sequence of terminal flags.
+            timeouts: a sequence of timeout flags.
+
+        """
+        with self._lock:
+            self._step_collector.collect_batch(
+                observations=observations,
+                actions=actions,
+                rewards=rewards,
+                terminals=terminals,
+                timeouts=timeouts,
+            )
 
     def get_step_buffer_size(self) -> int:
         return self._step_buffer.size()
@@ -189,10 +253,12 @@ class Kiox(KioxProtocol):
         return self._transition_buffer.size()
 
     def clip_episode(self) -> None:
-        self._step_collector.clip_episode()
+        with self._lock:
+            self._step_collector.clip_episode()
 
     def sample(self, batch_size: int) -> Batch:
-        return self._batch_factory.sample(batch_size)
+        with self._lock:
+            return self._batch_factory.sample(batch_size)
 
     def copy_from(self, kiox: KioxProtocol) -> None:
         assert isinstance(kiox, Kiox)
@@ -208,11 +274,15 @@ class Kiox(KioxProtocol):
                     timeout=(i + 1) == episode_length,
                 )
 
-    def save(self, f: BinaryIO) -> None:
-        dump_memory(f, self._episode_manager.episodes)
+    def save(
+        self, f: BinaryIO, profile: Optional[StorageProfile] = None
+    ) -> None:
+        with self._lock:
+            dump_memory(f, self._episode_manager.episodes, profile=profile)
 
     def load(self, f: BinaryIO) -> None:
-        load_memory(f, self._step_collector)
+        with self._lock:
+            load_memory(f, self._step_collector)
 
     @property
     def episode_manager(self) -> EpisodeManager:
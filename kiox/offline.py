@@ -1,9 +1,11 @@
-from typing import Optional
+from typing import BinaryIO, Optional, Union
 
 import numpy as np
 
-from .item import StackedItem, locate_stacked_item, sizeof_stacked_item
+from .io import DEFAULT_BLOCK_SIZE, HDF5StepBuffer
+from .item import StackedItem, sizeof_stacked_item
 from .kiox import Kiox
+from .step import ArrayStepBuffer
 from .transition_buffer import UnlimitedTransitionBuffer
 from .transition_factory import (
     FrameStackTransitionFactory,
@@ -21,9 +23,12 @@ def build_from_dataset(
     timeouts: Optional[np.ndarray] = None,
     n_steps: int = 1,
     gamma: float = 0.99,
+    vectorized: bool = False,
 ) -> Kiox:
     """Builds Kiox object from pre-collected data.
 
+    The whole dataset is ingested in bulk with ``Kiox.collect_batch``.
+
     .. code-block:: python
 
         # dataset
@@ -55,27 +60,33 @@ def build_from_dataset(
         n_steps: step size for multi-step learning. This corresponds to TD(N).
         gamma: discounted factor. If ``n_steps=1``, this value does not make
             any difference.
+        vectorized: flag to store steps in ``ArrayStepBuffer`` and
+            transitions in ``TransitionTable`` to sample mini-batch in
+            vectorized mode.
 
     Returns:
         Kiox object.
 
     """
-    transition_buffer = UnlimitedTransitionBuffer()
+    transition_buffer = UnlimitedTransitionBuffer(use_table=vectorized)
+    step_buffer = None
+    if vectorized:
+        step_buffer = ArrayStepBuffer(max(sizeof_stacked_item(observations), 1))
     kiox = Kiox(
         transition_factory=transition_factory,
         transition_buffer=transition_buffer,
         n_steps=n_steps,
         gamma=gamma,
+        step_buffer=step_buffer,
+        vectorized=vectorized,
+    )
+    kiox.collect_batch(
+        observations=observations,
+        actions=actions,
+        rewards=rewards,
+        terminals=terminals,
+        timeouts=timeouts,
     )
-    for i in range(sizeof_stacked_item(observations)):
-        kiox.collect(
-            observation=locate_stacked_item(observations, i),
-            action=locate_stacked_item(actions, i),
-            reward=rewards[i],
-            terminal=terminals[i],
-        )
-        if timeouts is not None and timeouts[i]:
-            kiox.clip_episode()
     return kiox
 
 
@@ -161,3 +172,49 @@ def create_frame_stack_kiox_from_dataset(
         n_steps=n_steps,
         gamma=gamma,
     )
+
+
+def build_from_hdf5(
+    f: Union[str, BinaryIO],
+    transition_factory: TransitionFactory,
+    n_steps: int = 1,
+    gamma: float = 0.99,
+    cache_size: int = 0,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> Kiox:
+    """Builds read-only Kiox object from HDF5 file saved by ``Kiox.save``.
+
+    Only episode boundaries and transitions are built in memory.
+    Observations and actions are read from the file at sample time. See
+    ``HDF5StepBuffer`` for details.
+
+    .. code-block:: python
+
+        kiox = build_from_hdf5(
+            "data.h5", FrameStackTransitionFactory(4), cache_size=1024
+        )
+        batch = kiox.sample(32)
+
+    Args:
+        f: path or I/O-like object of HDF5 file.
+        transition_factory: TransitionFactory object.
+        n_steps: step size for multi-step learning. This corresponds to TD(N).
+        gamma: discounted factor. If ``n_steps=1``, this value does not make
+            any difference.
+        cache_size: number of blocks to keep in LRU cache for each dataset.
+            ``0`` disables the cache.
+        block_size: number of rows in a cached block for contiguous
+            datasets.
+
+    Returns:
+        Kiox object.
+
+    """
+    return Kiox(
+        transition_factory=transition_factory,
+        transition_buffer=UnlimitedTransitionBuffer(use_table=True),
+        n_steps=n_steps,
+        gamma=gamma,
+        step_buffer=HDF5StepBuffer(f, cache_size, block_size),
+        vectorized=True,
+    )
@@ -0,0 +1,159 @@
+import dataclasses
+import threading
+import time
+from queue import Empty, Full, Queue
+from typing import Union
+
+from typing_extensions import Protocol
+
+from .batch_factory import Batch
+
+
+class BatchSampler(Protocol):
+    def sample(self, batch_size: int) -> Batch:
+        """Samples transitions and returns mini-batch.
+
+        Args:
+            batch_size: batch size.
+
+        Returns:
+            mini-batch.
+
+        """
+        raise NotImplementedError
+
+
+@dataclasses.dataclass
+class PrefetchStats:
+    """Statistics of BatchPrefetcher.
+
+    Args:
+        num_batches: number of batches returned by ``next_batch``.
+        num_waits: number of times ``next_batch`` found no prefetched batch.
+        wait_time: total seconds ``next_batch`` spent waiting.
+
+    """
+
+    num_batches: int = 0
+    num_waits: int = 0
+    wait_time: float = 0.0
+
+    @property
+    def wait_ratio(self) -> float:
+        if self.num_batches == 0:
+            return 0.0
+        return self.num_waits / self.num_batches
+
+    @property
+    def average_wait_time(self) -> float:
+        if self.num_batches == 0:
+            return 0.0
+        return self.wait_time / self.num_batches
+
+
+class BatchPrefetcher:
+    """BatchPrefetcher class.
+
+    This class keeps ``depth`` mini-batches assembled ahead of time in a
+    background thread so that sampling latency is hidden behind the
+    consumer's computation.
+
+    .. code-block:: python
+
+        kiox = Kiox(FIFOTransitionBuffer(1000), SimpleTransitionFactory())
+
+        # collect data here
+
+        with BatchPrefetcher(kiox, batch_size=32, depth=2) as prefetcher:
+            for _ in range(1000):
+                batch = prefetcher.next_batch()
+
+    The sampler must be safe to call from another thread. ``Kiox``
+    serializes sampling and collection internally so that ``collect`` can be
+    called while batches are being prefetched.
+
+    Args:
+        sampler: object with ``sample(batch_size)`` method such as ``Kiox``
+            or ``BatchFactory``.
+        batch_size: batch size.
+        depth: number of batches to keep ahead.
+
+    """
+
+    _sampler: BatchSampler
+    _batch_size: int
+    _queue: "Queue[Union[Batch, BaseException]]"
+    _stop_event: threading.Event
+    _thread: threading.Thread
+    _stats: PrefetchStats
+
+    def __init__(self, sampler: BatchSampler, batch_size: int, depth: int = 2):
+        assert depth > 0, "depth must be positive"
+        self._sampler = sampler
+        self._batch_size = batch_size
+        self._queue = Queue(maxsize=depth)
+        self._stop_event = threading.Event()
+        self._stats = PrefetchStats()
+        self._thread = threading.Thread(target=self._loop_thread, daemon=True)
+        self._thread.start()
+
+    def _loop_thread(self) -> None:
+        while not self._stop_event.is_set():
+            item: Union[Batch, BaseException]
+            try:
+                item = self._sampler.sample(self._batch_size)
+            except BaseException as e:  # pylint: disable=broad-except
+                item = e
+            # put with timeout to notice stop requests while the queue is full
+            while not self._stop_event.is_set():
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    break
+                except Full:
+                    continue
+            if isinstance(item, BaseException):
+                break
+
+    def next_batch(self) -> Batch:
+        """Returns prefetched mini-batch.
+
+        This method blocks if no batch is ready. Exceptions raised in the
+        background thread are re-raised here.
+
+        Returns:
+            mini-batch.
+
+        """
+        assert not self._stop_event.is_set(), "prefetcher is stopped"
+        try:
+            item = self._queue.get_nowait()
+        except Empty:
+            start = time.perf_counter()
+            item = self._queue.get()
+            self._stats.num_waits += 1
+            self._stats.wait_time += time.perf_counter() - start
+        if isinstance(item, BaseException):
+            # background thread has exited
+            self._stop_event.set()
+            raise item
+        self._stats.num_batches += 1
+        return item
+
+    def stop(self) -> None:
+        """Stops background thread."""
+        self._stop_event.set()
+        self._thread.join()
+
+    def __enter__(self) -> "BatchPrefetcher":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.stop()
+
+    @property
+    def stats(self) -> PrefetchStats:
+        return self._stats
+
+    @property
+    def depth(self) -> int:
+        return self._queue.maxsize
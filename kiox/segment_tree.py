@@ -0,0 +1,122 @@
+from typing import Callable
+
+import numpy as np
+
+
+class SegmentTree:
+    """SegmentTree class.
+
+    This class is an array-based binary tree whose leaves hold values and
+    whose internal nodes hold reductions of their children. All updates
+    are vectorized over a batch of leaves.
+
+    Args:
+        capacity: number of leaves.
+        operation: binary operation to reduce children.
+        neutral_element: identity element of ``operation``.
+
+    """
+
+    _capacity: int
+    _tree_capacity: int
+    _tree: np.ndarray
+    _operation: Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+    def __init__(
+        self,
+        capacity: int,
+        operation: Callable[[np.ndarray, np.ndarray], np.ndarray],
+        neutral_element: float,
+    ):
+        self._capacity = capacity
+        self._tree_capacity = 1
+        while self._tree_capacity < capacity:
+            self._tree_capacity *= 2
+        self._tree = np.full(
+            2 * self._tree_capacity, neutral_element, dtype=np.float64
+        )
+        self._operation = operation
+
+    def update(self, indices: np.ndarray, values: np.ndarray) -> None:
+        """Sets values of leaves and updates their ancestors.
+
+        Args:
+            indices: array of leaf indices.
+            values: array of values.
+
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        assert np.all(
+            (0 <= indices) & (indices < self._capacity)
+        ), "index out of range"
+        if indices.size == 0:
+            return
+        nodes = indices + self._tree_capacity
+        self._tree[nodes] = values
+        # all nodes share the same depth so checking one of them is enough
+        while nodes[0] > 1:
+            nodes = np.unique(nodes // 2)
+            self._tree[nodes] = self._operation(
+                self._tree[2 * nodes], self._tree[2 * nodes + 1]
+            )
+
+    def __getitem__(self, indices: np.ndarray) -> np.ndarray:
+        return self._tree[np.asarray(indices) + self._tree_capacity]
+
+    def reduce(self) -> float:
+        """Returns reduction over all leaves.
+
+        Returns:
+            reduced value.
+
+        """
+        return float(self._tree[1])
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+
+class SumTree(SegmentTree):
+    """SumTree class.
+
+    Args:
+        capacity: number of leaves.
+
+    """
+
+    def __init__(self, capacity: int):
+        super().__init__(capacity, np.add, 0.0)
+
+    def find_prefixsum_indices(self, prefixsums: np.ndarray) -> np.ndarray:
+        """Returns leaf indices where cumulative sums exceed ``prefixsums``.
+
+        Args:
+            prefixsums: array of values in ``[0, sum)``.
+
+        Returns:
+            array of leaf indices.
+
+        """
+        prefixsums = np.array(prefixsums, dtype=np.float64)
+        nodes = np.ones(prefixsums.shape[0], dtype=np.int64)
+        while nodes[0] < self._tree_capacity:
+            left = 2 * nodes
+            left_values = self._tree[left]
+            go_right = prefixsums >= left_values
+            prefixsums -= np.where(go_right, left_values, 0.0)
+            nodes = np.where(go_right, left + 1, left)
+        indices = nodes - self._tree_capacity
+        return np.minimum(indices, self._capacity - 1)
+
+
+class MinTree(SegmentTree):
+    """MinTree class.
+
+    Args:
+        capacity: number of leaves.
+
+    """
+
+    def __init__(self, capacity: int):
+        super().__init__(capacity, np.minimum, float("inf"))
@@ -1,7 +1,20 @@
 import dataclasses
-from typing import Dict, Sequence
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Union
 
-from .item import Item
+import numpy as np
+from typing_extensions import Protocol, runtime_checkable
+
+from .compression import Codec, create_codec
+from .item import (
+    Item,
+    StackedItem,
+    locate_stacked_item,
+    sizeof_stacked_item,
+)
 
 
 @dataclasses.dataclass(frozen=True)
@@ -54,9 +67,11 @@ class StepBuffer:
     """StepBuffer class."""
 
     _steps: Dict[int, Step]
+    _episode_ends: Set[int]
 
     def __init__(self) -> None:
         self._steps = {}
+        self._episode_ends = set()
         self._counter = 0
 
     def get(self, idx: int) -> Step:
@@ -94,6 +109,36 @@ class StepBuffer:
         self._counter += 1
         return self._steps[idx]
 
+    def extend(
+        self,
+        observations: StackedItem,
+        actions: StackedItem,
+        rewards: np.ndarray,
+        terminals: np.ndarray,
+    ) -> np.ndarray:
+        """Appends steps in bulk.
+
+        Args:
+            observations: a sequence of observations.
+            actions: a sequence of actions.
+            rewards: a sequence of rewards.
+            terminals: a sequence of terminal flags.
+
+        Returns:
+            array of idx of appended steps.
+
+        """
+        indices = []
+        for i in range(sizeof_stacked_item(observations)):
+            partial_step = PartialStep(
+                observation=locate_stacked_item(observations, i),
+                action=locate_stacked_item(actions, i),
+                reward=rewards[i],
+                terminal=terminals[i],
+            )
+            indices.append(self.append(partial_step).idx)
+        return np.array(indices, dtype=np.int64)
+
     def drop(self, idx: int) -> None:
         """Drops step by specified ``idx``.
 
@@ -102,6 +147,30 @@ class StepBuffer:
 
         """
         del self._steps[idx]
+        self._episode_ends.discard(idx)
+
+    def mark_episode_end(self, idx: int) -> None:
+        """Marks step as the last step of an episode.
+
+        This information is used to rebuild episodes from stored steps.
+
+        Args:
+            idx: step idx.
+
+        """
+        self._episode_ends.add(idx)
+
+    def is_episode_end(self, idx: int) -> bool:
+        """Returns if step is the last step of an episode.
+
+        Args:
+            idx: step idx.
+
+        Returns:
+            ``True`` if the step is marked as the last step of an episode.
+
+        """
+        return idx in self._episode_ends
 
     def size(self) -> int:
         """Returns number of stored steps.
@@ -115,3 +184,893 @@ class StepBuffer:
     @property
     def steps(self) -> Sequence[Step]:
         return list(self._steps.values())
+
+
+@runtime_checkable
+class VectorizedStepBuffer(Protocol):
+    """Interface of step buffers supporting vectorized sampling."""
+
+    def gather_observations(
+        self, indices: np.ndarray, out: Optional[StackedItem] = None
+    ) -> StackedItem:
+        """Returns stacked observations of specified ``indices``.
+
+        Args:
+            indices: array of step idx.
+            out: preallocated stacked observations to write into.
+
+        Returns:
+            stacked observations.
+
+        """
+        raise NotImplementedError
+
+    def gather_actions(
+        self, indices: np.ndarray, out: Optional[StackedItem] = None
+    ) -> StackedItem:
+        """Returns stacked actions of specified ``indices``.
+
+        Args:
+            indices: array of step idx.
+            out: preallocated stacked actions to write into.
+
+        Returns:
+            stacked actions.
+
+        """
+        raise NotImplementedError
+
+    def gather_rewards(
+        self, indices: np.ndarray, out: Optional[StackedItem] = None
+    ) -> StackedItem:
+        """Returns stacked rewards of specified ``indices``.
+
+        Args:
+            indices: array of step idx.
+            out: preallocated stacked rewards to write into.
+
+        Returns:
+            stacked rewards.
+
+        """
+        raise NotImplementedError
+
+    def gather_terminals(
+        self, indices: np.ndarray, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Returns terminal flags of specified ``indices``.
+
+        Args:
+            indices: array of step idx.
+            out: preallocated array with shape of ``(N, 1)`` to write into.
+
+        Returns:
+            terminal flags with shape of ``(N, 1)``.
+
+        """
+        raise NotImplementedError
+
+
+@dataclasses.dataclass(frozen=True)
+class _ItemSpec:
+    """Shapes and dtypes of a single item field.
+
+    Args:
+        shapes: shape of each element.
+        dtypes: dtype name of each element.
+        is_scalar: flag to represent scalar items.
+        is_sequence: flag to represent sequences of arrays.
+
+    """
+
+    shapes: Sequence[Sequence[int]]
+    dtypes: Sequence[str]
+    is_scalar: bool
+    is_sequence: bool
+
+    @classmethod
+    def from_item(cls, item: Item) -> "_ItemSpec":
+        if isinstance(item, (list, tuple)):
+            elements = [np.asarray(el) for el in item]
+        else:
+            elements = [np.asarray(item)]
+        return cls(
+            shapes=[list(el.shape) for el in elements],
+            dtypes=[el.dtype.str for el in elements],
+            is_scalar=isinstance(item, (int, float, np.generic)),
+            is_sequence=isinstance(item, (list, tuple)),
+        )
+
+
+def _take(array: np.ndarray, slots: np.ndarray, out: np.ndarray) -> None:
+    if out.dtype == array.dtype and out.flags.c_contiguous:
+        # slots are already validated so that np.take can skip buffering
+        np.take(
+            array,
+            slots,
+            axis=0,
+            out=out.reshape(-1, *array.shape[1:]),
+            mode="clip",
+        )
+    else:
+        np.copyto(out, np.reshape(array[slots], out.shape))
+
+
+class _ItemStorage:
+    """Preallocated storage for a single item field.
+
+    Scalars are stored in 1-D arrays, arrays are stored in ``(maxlen, *shape)``
+    arrays and sequences of arrays are stored in one array per element.
+
+    Args:
+        name: field name used to allocate arrays.
+        spec: shapes and dtypes of the field.
+        maxlen: number of slots.
+        allocator: function to allocate an array with name, shape and dtype.
+
+    """
+
+    _arrays: List[np.ndarray]
+    _is_scalar: bool
+    _is_sequence: bool
+
+    def __init__(
+        self,
+        name: str,
+        spec: _ItemSpec,
+        maxlen: int,
+        allocator: Callable[[str, Sequence[int], np.dtype], np.ndarray],
+    ):
+        self._is_scalar = spec.is_scalar
+        self._is_sequence = spec.is_sequence
+        if self._is_sequence:
+            names = [f"{name}_{i}" for i in range(len(spec.shapes))]
+        else:
+            names = [name]
+        self._arrays = [
+            allocator(array_name, (maxlen, *shape), np.dtype(dtype))
+            for array_name, shape, dtype in zip(names, spec.shapes, spec.dtypes)
+        ]
+
+    def set(self, slot: int, item: Item) -> None:
+        if self._is_sequence:
+            assert isinstance(item, (list, tuple))
+            for array, el in zip(self._arrays, item):
+                array[slot] = el
+        else:
+            self._arrays[0][slot] = item
+
+    def set_many(self, slots: np.ndarray, stacked_item: StackedItem) -> None:
+        if self._is_sequence:
+            assert isinstance(stacked_item, (list, tuple))
+            for array, el in zip(self._arrays, stacked_item):
+                array[slots] = el
+        else:
+            self._arrays[0][slots] = stacked_item
+
+    def get(self, slot: int) -> Item:
+        if self._is_scalar:
+            value = self._arrays[0][slot].item()
+            assert isinstance(value, (int, float))
+            return value
+        if self._is_sequence:
+            return [array[slot] for array in self._arrays]
+        return self._arrays[0][slot]
+
+    def gather(
+        self, slots: np.ndarray, out: Optional[StackedItem] = None
+    ) -> StackedItem:
+        if out is not None:
+            if self._is_sequence:
+                assert isinstance(out, (list, tuple))
+                for array, out_array in zip(self._arrays, out):
+                    _take(array, slots, out_array)
+            else:
+                assert isinstance(out, np.ndarray)
+                _take(self._arrays[0], slots, out)
+            return out
+        if self._is_scalar:
+            return np.reshape(self._arrays[0][slots], [-1, 1])
+        if self._is_sequence:
+            return [array[slots] for array in self._arrays]
+        return self._arrays[0][slots]
+
+    @property
+    def arrays(self) -> Sequence[np.ndarray]:
+        return self._arrays
+
+
+class ArrayStepBuffer(StepBuffer):
+    """ArrayStepBuffer class.
+
+    This class stores steps in preallocated NumPy ring arrays instead of
+    keeping ``Step`` objects. Each field (and each element of tuple
+    observations) has its own array whose shape and dtype are inferred from
+    the first appended step. ``idx`` is mapped to ``idx % maxlen`` slot and
+    ``get`` returns views of the arrays.
+
+    .. code-block:: python
+
+        # episodes are clipped at 1000 steps at most
+        kiox = Kiox(
+            FIFOTransitionBuffer(1000),
+            SimpleTransitionFactory(),
+            step_buffer=ArrayStepBuffer(1000 + 2 * 1000),
+        )
+
+    .. note::
+
+        Steps are released only when all transitions of an episode are
+        dropped, and the active episode is kept until it is clipped. Since
+        ``idx`` is mapped to ``idx % maxlen`` slot, ``maxlen`` must cover the
+        span from the oldest live step to the newest one: the steps of
+        stored transitions, the partially dropped oldest episode and the
+        active episode. With a single stream of episodes up to ``L`` steps,
+        ``maxlen`` of the transition buffer size plus ``2 * L`` is enough.
+        Unterminated episodes must be clipped at timeouts. Appending a step
+        to an occupied slot raises ``ValueError`` instead of silently
+        overwriting it.
+
+    Args:
+        maxlen: maximum number of steps.
+
+    """
+
+    _maxlen: int
+    _size: int
+    _slot_idx: np.ndarray
+    _episode_end_flags: np.ndarray
+    _observations: Optional[_ItemStorage]
+    _actions: Optional[_ItemStorage]
+    _rewards: Optional[_ItemStorage]
+    _terminals: np.ndarray
+
+    def __init__(self, maxlen: int) -> None:
+        super().__init__()
+        self._maxlen = maxlen
+        self._slot_idx = self._allocate(
+            "slot_idx", (maxlen,), np.dtype(np.int64), fill_value=-1
+        )
+        self._terminals = self._allocate(
+            "terminals", (maxlen,), np.dtype(np.float64)
+        )
+        self._episode_end_flags = self._allocate(
+            "episode_ends", (maxlen,), np.dtype(np.bool_)
+        )
+        self._observations = None
+        self._actions = None
+        self._rewards = None
+
+        # count pre-stored steps
+        stored_idx = self._slot_idx[self._slot_idx >= 0]
+        self._size = int(stored_idx.shape[0])
+        self._counter = int(stored_idx.max()) + 1 if self._size else 0
+
+    def _allocate(
+        self,
+        name: str,
+        shape: Sequence[int],
+        dtype: np.dtype,
+        fill_value: Any = 0,
+    ) -> np.ndarray:
+        return np.full(shape, fill_value, dtype=dtype)
+
+    def _initialize_storages(
+        self,
+        observation_spec: _ItemSpec,
+        action_spec: _ItemSpec,
+        reward_spec: _ItemSpec,
+    ) -> None:
+        self._observations = _ItemStorage(
+            "observations", observation_spec, self._maxlen, self._allocate
+        )
+        self._actions = _ItemStorage(
+            "actions", action_spec, self._maxlen, self._allocate
+        )
+        self._rewards = _ItemStorage(
+            "rewards", reward_spec, self._maxlen, self._allocate
+        )
+
+    def _get_slot(self, idx: int) -> int:
+        slot = idx % self._maxlen
+        assert self._slot_idx[slot] == idx, f"Step(idx={idx}) does not exist"
+        return slot
+
+    def get(self, idx: int) -> Step:
+        slot = self._get_slot(idx)
+        assert self._observations and self._actions and self._rewards
+        return Step(
+            idx=idx,
+            observation=self._observations.get(slot),
+            action=self._actions.get(slot),
+            reward=self._rewards.get(slot),
+            terminal=float(self._terminals[slot]),
+        )
+
+    def append(self, partial_step: PartialStep) -> Step:
+        if self._observations is None:
+            self._initialize_storages(
+                _ItemSpec.from_item(partial_step.observation),
+                _ItemSpec.from_item(partial_step.action),
+                _ItemSpec.from_item(partial_step.reward),
+            )
+        assert self._observations and self._actions and self._rewards
+
+        idx = self._counter
+        slot = idx % self._maxlen
+        if self._slot_idx[slot] != -1:
+            raise ValueError(self._full_message(int(self._slot_idx[slot])))
+
+        self._observations.set(slot, partial_step.observation)
+        self._actions.set(slot, partial_step.action)
+        self._rewards.set(slot, partial_step.reward)
+        self._terminals[slot] = partial_step.terminal
+        self._episode_end_flags[slot] = False
+        self._slot_idx[slot] = idx
+        self._counter += 1
+        self._size += 1
+        return self.get(idx)
+
+    def extend(
+        self,
+        observations: StackedItem,
+        actions: StackedItem,
+        rewards: np.ndarray,
+        terminals: np.ndarray,
+    ) -> np.ndarray:
+        size = sizeof_stacked_item(observations)
+        if size == 0:
+            return np.zeros(0, dtype=np.int64)
+        if self._observations is None:
+            self._initialize_storages(
+                _ItemSpec.from_item(locate_stacked_item(observations, 0)),
+                _ItemSpec.from_item(locate_stacked_item(actions, 0)),
+                _ItemSpec.from_item(rewards[0]),
+            )
+        assert self._observations and self._actions and self._rewards
+
+        indices = np.arange(self._counter, self._counter + size)
+        slots = indices % self._maxlen
+        if size > self._maxlen:
+            raise ValueError(
+                f"{size} steps exceed ArrayStepBuffer(maxlen={self._maxlen})"
+            )
+        occupied = self._slot_idx[slots]
+        if np.any(occupied != -1):
+            raise ValueError(self._full_message(int(occupied.max())))
+
+        self._observations.set_many(slots, observations)
+        self._actions.set_many(slots, actions)
+        self._rewards.set_many(slots, rewards)
+        self._terminals[slots] = terminals
+        self._episode_end_flags[slots] = False
+        self._slot_idx[slots] = indices
+        self._counter += size
+        self._size += size
+        return indices
+
+    def _full_message(self, occupied_idx: int) -> str:
+        return (
+            f"ArrayStepBuffer is full: Step(idx={occupied_idx}) still occupies"
+            f" the slot for Step(idx={self._counter}). maxlen={self._maxlen}"
+            " must cover all steps of episodes referenced by stored"
+            " transitions and the active episode."
+        )
+
+    def drop(self, idx: int) -> None:
+        slot = self._get_slot(idx)
+        self._slot_idx[slot] = -1
+        self._size -= 1
+
+    def mark_episode_end(self, idx: int) -> None:
+        self._episode_end_flags[self._get_slot(idx)] = True
+
+    def is_episode_end(self, idx: int) -> bool:
+        return bool(self._episode_end_flags[self._get_slot(idx)])
+
+    def size(self) -> int:
+        return self._size
+
+    def gather_observations(
+        self, indices: np.ndarray, out: Optional[StackedItem] = None
+    ) -> StackedItem:
+        """Returns stacked observations of specified ``indices``.
+
+        Args:
+            indices: array of step idx.
+            out: preallocated stacked observations to write into.
+
+        Returns:
+            stacked observations.
+
+        """
+        assert self._observations
+        return self._observations.gather(self._get_slots(indices), out)
+
+    def gather_actions(
+        self, indices: np.ndarray, out: Optional[StackedItem] = None
+    ) -> StackedItem:
+        """Returns stacked actions of specified ``indices``.
+
+        Args:
+            indices: array of step idx.
+            out: preallocated stacked actions to write into.
+
+        Returns:
+            stacked actions.
+
+        """
+        assert self._actions
+        return self._actions.gather(self._get_slots(indices), out)
+
+    def gather_rewards(
+        self, indices: np.ndarray, out: Optional[StackedItem] = None
+    ) -> StackedItem:
+        """Returns stacked rewards of specified ``indices``.
+
+        Args:
+            indices: array of step idx.
+            out: preallocated stacked rewards to write into.
+
+        Returns:
+            stacked rewards.
+
+        """
+        assert self._rewards
+        return self._rewards.gather(self._get_slots(indices), out)
+
+    def gather_terminals(
+        self, indices: np.ndarray, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Returns terminal flags of specified ``indices``.
+
+        Args:
+            indices: array of step idx.
+            out: preallocated array with shape of ``(N, 1)`` to write into.
+
+        Returns:
+            terminal flags with shape of ``(N, 1)``.
+
+        """
+        slots = self._get_slots(indices)
+        if out is not None:
+            _take(self._terminals, slots, out)
+            return out
+        return np.reshape(self._terminals[slots], [-1, 1])
+
+    def _get_slots(self, indices: np.ndarray) -> np.ndarray:
+        slots = np.asarray(indices, dtype=np.int64) % self._maxlen
+        assert np.all(self._slot_idx[slots] == indices), "invalid step idx"
+        return slots
+
+    @property
+    def steps(self) -> Sequence[Step]:
+        indices = np.sort(self._slot_idx[self._slot_idx >= 0])
+        return [self.get(int(idx)) for idx in indices]
+
+    @property
+    def maxlen(self) -> int:
+        return self._maxlen
+
+
+class MemmapStepBuffer(ArrayStepBuffer):
+    """MemmapStepBuffer class.
+
+    This class stores each field of steps in ``np.memmap`` files under
+    ``directory`` so that replay data larger than host memory can be handled.
+    Which part of data stays resident is left to the OS page cache.
+
+    If ``directory`` already contains a buffer, the files are reopened
+    without loading data. Passing the reopened buffer to ``Kiox`` rebuilds
+    episodes and transitions from the stored steps.
+
+    .. code-block:: python
+
+        step_buffer = MemmapStepBuffer("replay", 1000000)
+        kiox = Kiox(
+            FIFOTransitionBuffer(1000000),
+            SimpleTransitionFactory(),
+            step_buffer=step_buffer,
+        )
+        ...
+        step_buffer.flush()
+
+        # restart from the stored steps
+        kiox = Kiox(
+            FIFOTransitionBuffer(1000000),
+            SimpleTransitionFactory(),
+            step_buffer=MemmapStepBuffer("replay", 1000000),
+        )
+
+    Args:
+        directory: directory to store memory-mapped files.
+        maxlen: maximum number of steps.
+
+    """
+
+    _directory: str
+    _metadata: Dict[str, Any]
+
+    def __init__(self, directory: str, maxlen: int) -> None:
+        self._directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        metadata_path = os.path.join(directory, "metadata.json")
+        if os.path.exists(metadata_path):
+            with open(metadata_path, "r", encoding="utf-8") as f:
+                self._metadata = json.load(f)
+            assert (
+                self._metadata["maxlen"] == maxlen
+            ), f"maxlen must be {self._metadata['maxlen']}"
+        else:
+            self._metadata = {"maxlen": maxlen}
+            self._save_metadata()
+
+        super().__init__(maxlen)
+
+        # reopen stored fields
+        if "observations" in self._metadata:
+            self._initialize_storages(
+                _ItemSpec(**self._metadata["observations"]),
+                _ItemSpec(**self._metadata["actions"]),
+                _ItemSpec(**self._metadata["rewards"]),
+            )
+
+    def _allocate(
+        self,
+        name: str,
+        shape: Sequence[int],
+        dtype: np.dtype,
+        fill_value: Any = 0,
+    ) -> np.ndarray:
+        path = os.path.join(self._directory, f"{name}.npy")
+        if os.path.exists(path):
+            array = np.lib.format.open_memmap(path, mode="r+")
+            assert array.shape == tuple(shape), f"shape mismatch in {path}"
+            assert array.dtype == dtype, f"dtype mismatch in {path}"
+        else:
+            array = np.lib.format.open_memmap(
+                path, mode="w+", dtype=dtype, shape=tuple(shape)
+            )
+            if fill_value != 0:
+                array.fill(fill_value)
+        return array
+
+    def _initialize_storages(
+        self,
+        observation_spec: _ItemSpec,
+        action_spec: _ItemSpec,
+        reward_spec: _ItemSpec,
+    ) -> None:
+        super()._initialize_storages(observation_spec, action_spec, reward_spec)
+        self._metadata["observations"] = dataclasses.asdict(observation_spec)
+        self._metadata["actions"] = dataclasses.asdict(action_spec)
+        self._metadata["rewards"] = dataclasses.asdict(reward_spec)
+        self._save_metadata()
+
+    def _save_metadata(self) -> None:
+        path = os.path.join(self._directory, "metadata.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self._metadata, f)
+
+    def flush(self) -> None:
+        """Writes pending changes to disk."""
+        arrays = [self._slot_idx, self._terminals, self._episode_end_flags]
+        for storage in [self._observations, self._actions, self._rewards]:
+            if storage:
+                arrays.extend(storage.arrays)
+        for array in arrays:
+            array.flush()
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+
+@dataclasses.dataclass(frozen=True)
+class _CompressedItem:
+    """Compressed observation.
+
+    Args:
+        data: compressed bytes of each element.
+        shapes: shape of each element.
+        dtypes: dtype of each element.
+        is_sequence: flag to represent sequences of arrays.
+
+    """
+
+    data: Sequence[bytes]
+    shapes: Sequence[Sequence[int]]
+    dtypes: Sequence[np.dtype]
+    is_sequence: bool
+
+
+@dataclasses.dataclass(frozen=True)
+class _CompressedStep:
+    """Step data class with compressed observation."""
+
+    idx: int
+    observation: _CompressedItem
+    action: Item
+    reward: Item
+    terminal: float
+
+
+class CompressedStepBuffer(StepBuffer):
+    """CompressedStepBuffer class.
+
+    This class compresses each observation frame when the step is appended
+    and decompresses it when the step is read by ``LazyTransition.create``.
+    Since ``BatchFactory`` evaluates transitions in a thread pool,
+    decompression runs in parallel for codecs releasing GIL.
+
+    .. code-block:: python
+
+        step_buffer = CompressedStepBuffer("zlib")
+        kiox = Kiox(
+            FIFOTransitionBuffer(1000000),
+            FrameStackTransitionFactory(4),
+            step_buffer=step_buffer,
+        )
+        ...
+        print(step_buffer.compression_ratio, step_buffer.average_decode_time)
+
+    Args:
+        codec: Codec object or codec name.
+
+    """
+
+    _codec: Codec
+    _compressed_steps: Dict[int, _CompressedStep]
+    _raw_nbytes: int
+    _compressed_nbytes: int
+    _decode_time: float
+    _decode_count: int
+    _lock: threading.Lock
+
+    def __init__(self, codec: Union[str, Codec] = "zlib") -> None:
+        super().__init__()
+        self._codec = create_codec(codec) if isinstance(codec, str) else codec
+        self._compressed_steps = {}
+        self._raw_nbytes = 0
+        self._compressed_nbytes = 0
+        self._decode_time = 0.0
+        self._decode_count = 0
+        self._lock = threading.Lock()
+
+    def _compress(self, observation: Item) -> _CompressedItem:
+        is_sequence = isinstance(observation, (list, tuple))
+        if isinstance(observation, (list, tuple)):
+            elements = list(observation)
+        else:
+            assert isinstance(
+                observation, np.ndarray
+            ), "observation must be ndarray or a sequence of ndarray"
+            elements = [observation]
+        data = [
+            self._codec.compress(np.ascontiguousarray(el).tobytes())
+            for el in elements
+        ]
+        with self._lock:
+            self._raw_nbytes += sum(int(el.nbytes) for el in elements)
+            self._compressed_nbytes += sum(len(d) for d in data)
+        return _CompressedItem(
+            data=data,
+            shapes=[el.shape for el in elements],
+            dtypes=[el.dtype for el in elements],
+            is_sequence=is_sequence,
+        )
+
+    def _decompress(self, compressed_item: _CompressedItem) -> Item:
+        start = time.perf_counter()
+        elements = [
+            np.frombuffer(self._codec.decompress(data), dtype=dtype).reshape(
+                shape
+            )
+            for data, shape, dtype in zip(
+                compressed_item.data,
+                compressed_item.shapes,
+                compressed_item.dtypes,
+            )
+        ]
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._decode_time += elapsed
+            self._decode_count += 1
+        if compressed_item.is_sequence:
+            return elements
+        return elements[0]
+
+    def get(self, idx: int) -> Step:
+        assert idx in self._compressed_steps, f"Step(idx={idx}) does not exist"
+        compressed_step = self._compressed_steps[idx]
+        return Step(
+            idx=idx,
+            observation=self._decompress(compressed_step.observation),
+            action=compressed_step.action,
+            reward=compressed_step.reward,
+            terminal=compressed_step.terminal,
+        )
+
+    def append(self, partial_step: PartialStep) -> Step:
+        idx = self._counter
+        self._compressed_steps[idx] = _CompressedStep(
+            idx=idx,
+            observation=self._compress(partial_step.observation),
+            action=partial_step.action,
+            reward=partial_step.reward,
+            terminal=partial_step.terminal,
+        )
+        self._counter += 1
+        return Step(
+            idx=idx,
+            observation=partial_step.observation,
+            action=partial_step.action,
+            reward=partial_step.reward,
+            terminal=partial_step.terminal,
+        )
+
+    def drop(self, idx: int) -> None:
+        compressed_step = self._compressed_steps.pop(idx)
+        self._episode_ends.discard(idx)
+        observation = compressed_step.observation
+        with self._lock:
+            self._compressed_nbytes -= sum(len(d) for d in observation.data)
+            self._raw_nbytes -= sum(
+                int(np.prod(shape)) * np.dtype(dtype).itemsize
+                for shape, dtype in zip(observation.shapes, observation.dtypes)
+            )
+
+    def size(self) -> int:
+        return len(self._compressed_steps)
+
+    @property
+    def steps(self) -> Sequence[Step]:
+        return [self.get(idx) for idx in self._compressed_steps]
+
+    @property
+    def compression_ratio(self) -> float:
+        """Returns ratio of raw observation bytes to compressed bytes.
+
+        Returns:
+            compression ratio.
+
+        """
+        if self._compressed_nbytes == 0:
+            return 1.0
+        return self._raw_nbytes / self._compressed_nbytes
+
+    @property
+    def compressed_nbytes(self) -> int:
+        return self._compressed_nbytes
+
+    @property
+    def decode_time(self) -> float:
+        """Returns total time spent to decompress observations in seconds.
+
+        Returns:
+            total decode time.
+
+        """
+        return self._decode_time
+
+    @property
+    def average_decode_time(self) -> float:
+        """Returns average time to decompress an observation in seconds.
+
+        Returns:
+            average decode time.
+
+        """
+        if self._decode_count == 0:
+            return 0.0
+        return self._decode_time / self._decode_count
+
+
+class StripedStepBuffer(StepBuffer):
+    """Thread-safe StepBuffer with lock striping.
+
+    Steps are distributed over ``num_stripes`` dictionaries by
+    ``idx % num_stripes`` and each dictionary is guarded by its own lock so
+    that concurrent writers rarely contend. Only idx allocation is
+    serialized.
+
+    Args:
+        num_stripes: number of stripes.
+
+    """
+
+    _stripes: List[Dict[int, Step]]
+    _stripe_episode_ends: List[Set[int]]
+    _stripe_locks: List[threading.Lock]
+    _counter_lock: threading.Lock
+
+    def __init__(self, num_stripes: int = 16) -> None:
+        super().__init__()
+        assert num_stripes > 0, "num_stripes must be positive"
+        self._stripes = [{} for _ in range(num_stripes)]
+        self._stripe_episode_ends = [set() for _ in range(num_stripes)]
+        self._stripe_locks = [threading.Lock() for _ in range(num_stripes)]
+        self._counter_lock = threading.Lock()
+
+    def _allocate_idx(self, size: int) -> int:
+        with self._counter_lock:
+            idx = self._counter
+            self._counter += size
+        return idx
+
+    def _put(self, step: Step) -> None:
+        stripe = step.idx % len(self._stripes)
+        with self._stripe_locks[stripe]:
+            self._stripes[stripe][step.idx] = step
+
+    def get(self, idx: int) -> Step:
+        stripe = idx % len(self._stripes)
+        with self._stripe_locks[stripe]:
+            step = self._stripes[stripe].get(idx)
+        assert step is not None, f"Step(idx={idx}) does not exist"
+        return step
+
+    def append(self, partial_step: PartialStep) -> Step:
+        step = Step(
+            idx=self._allocate_idx(1),
+            observation=partial_step.observation,
+            action=partial_step.action,
+            reward=partial_step.reward,
+            terminal=partial_step.terminal,
+        )
+        self._put(step)
+        return step
+
+    def extend(
+        self,
+        observations: StackedItem,
+        actions: StackedItem,
+        rewards: np.ndarray,
+        terminals: np.ndarray,
+    ) -> np.ndarray:
+        # allocate consecutive idx for the whole batch at once
+        size = sizeof_stacked_item(observations)
+        start = self._allocate_idx(size)
+        for i in range(size):
+            self._put(
+                Step(
+                    idx=start + i,
+                    observation=locate_stacked_item(observations, i),
+                    action=locate_stacked_item(actions, i),
+                    reward=rewards[i],
+                    terminal=terminals[i],
+                )
+            )
+        return np.arange(start, start + size, dtype=np.int64)
+
+    def drop(self, idx: int) -> None:
+        stripe = idx % len(self._stripes)
+        with self._stripe_locks[stripe]:
+            del self._stripes[stripe][idx]
+            self._stripe_episode_ends[stripe].discard(idx)
+
+    def mark_episode_end(self, idx: int) -> None:
+        stripe = idx % len(self._stripes)
+        with self._stripe_locks[stripe]:
+            self._stripe_episode_ends[stripe].add(idx)
+
+    def is_episode_end(self, idx: int) -> bool:
+        stripe = idx % len(self._stripes)
+        with self._stripe_locks[stripe]:
+            return idx in self._stripe_episode_ends[stripe]
+
+    def size(self) -> int:
+        return sum(len(stripe) for stripe in self._stripes)
+
+    @property
+    def steps(self) -> Sequence[Step]:
+        steps: List[Step] = []
+        for stripe, lock in zip(self._stripes, self._stripe_locks):
+            with lock:
+                steps.extend(stripe.values())
+        return sorted(steps, key=lambda step: step.idx)
+
+    @property
+    def num_stripes(self) -> int:
+        return len(self._stripes)
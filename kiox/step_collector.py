@@ -1,9 +1,17 @@
 from typing import Optional
 
+import numpy as np
+
 from .episode import EpisodeManager
-from .item import Item
-from .step import PartialStep
-from .transition_factory import TransitionFactory
+from .item import (
+    Item,
+    StackedItem,
+    locate_stacked_item,
+    sizeof_stacked_item,
+    slice_stacked_item,
+)
+from .step import PartialStep, Step
+from .transition_factory import BatchTransitionFactory, TransitionFactory
 
 
 class StepCollector:
@@ -63,6 +71,182 @@ class StepCollector:
             terminal=terminal,
         )
         step = self._episode_manager.append_step(partial_step)
+        self._create_transitions(step, timeout)
+
+    def collect_batch(
+        self,
+        observations: StackedItem,
+        actions: StackedItem,
+        rewards: np.ndarray,
+        terminals: np.ndarray,
+        timeouts: Optional[np.ndarray] = None,
+    ) -> None:
+        """Stores a sequence of experience tuples in bulk.
+
+        The result is identical to calling ``collect`` for each tuple and
+        ``clip_episode`` at each timeout. Episode boundaries and multi-step
+        returns are computed with NumPy, and steps and transitions are
+        stored in bulk. If the transition factory does not support bulk
+        creation, transitions are created step by step.
+
+        Args:
+            observations: a sequence of observations.
+            actions: a sequence of actions.
+            rewards: a sequence of rewards.
+            terminals: a sequence of terminal flags.
+            timeouts: a sequence of timeout flags.
+
+        """
+        size = sizeof_stacked_item(observations)
+        if timeouts is None:
+            timeouts = np.zeros(size, dtype=np.bool_)
+
+        # finish the active episode step by step
+        start = 0
+        while start < size and self._episode_manager.active_episode.size():
+            self.collect(
+                observation=locate_stacked_item(observations, start),
+                action=locate_stacked_item(actions, start),
+                reward=rewards[start],
+                terminal=terminals[start],
+                timeout=bool(timeouts[start]),
+            )
+            start += 1
+        if start == size:
+            return
+
+        observations = slice_stacked_item(observations, start, size)
+        actions = slice_stacked_item(actions, start, size)
+        rewards = rewards[start:]
+        terminals = terminals[start:]
+        timeouts = timeouts[start:]
+
+        step_buffer = self._episode_manager.step_buffer
+        indices = step_buffer.extend(observations, actions, rewards, terminals)
+        self.attach_batch(indices, rewards, terminals, timeouts)
+
+    def attach_batch(
+        self,
+        indices: np.ndarray,
+        rewards: np.ndarray,
+        terminals: np.ndarray,
+        timeouts: Optional[np.ndarray] = None,
+    ) -> None:
+        """Creates transitions from steps already stored in StepBuffer in bulk.
+
+        This method is used to index pre-stored steps without reading
+        observations. The result is identical to calling ``attach`` for each
+        step.
+
+        Args:
+            indices: a sequence of step idx.
+            rewards: a sequence of rewards of the steps.
+            terminals: a sequence of terminal flags of the steps.
+            timeouts: a sequence of timeout flags.
+
+        """
+        size = indices.shape[0]
+        if timeouts is None:
+            timeouts = np.zeros(size, dtype=np.bool_)
+
+        # finish the active episode step by step
+        step_buffer = self._episode_manager.step_buffer
+        is_batch = isinstance(self._transition_factory, BatchTransitionFactory)
+        start = 0
+        while start < size and (
+            not is_batch or self._episode_manager.active_episode.size()
+        ):
+            step = step_buffer.get(int(indices[start]))
+            self.attach(step, bool(timeouts[start]))
+            start += 1
+        if start == size:
+            return
+
+        assert isinstance(self._transition_factory, BatchTransitionFactory)
+        self._collect_batch(
+            self._transition_factory,
+            indices[start:],
+            rewards[start:],
+            terminals[start:],
+            timeouts[start:],
+        )
+
+    def _collect_batch(
+        self,
+        transition_factory: BatchTransitionFactory,
+        indices: np.ndarray,
+        rewards: np.ndarray,
+        terminals: np.ndarray,
+        timeouts: np.ndarray,
+    ) -> None:
+        size = indices.shape[0]
+        is_terminal = np.asarray(terminals, dtype=np.bool_)
+        is_end = is_terminal | np.asarray(timeouts, dtype=np.bool_)
+
+        # split into episodes
+        starts = np.flatnonzero(np.concatenate([[True], is_end[:-1]]))
+        stops = np.append(starts[1:], size)
+        episode_ids = np.cumsum(np.concatenate([[0], is_end[:-1]]))
+        positions = np.arange(size) - starts[episode_ids]
+        lengths = (stops - starts)[episode_ids]
+        ends_with_terminal = is_terminal[stops - 1][episode_ids]
+
+        # transitions with next steps and transitions to terminal states
+        has_next = positions + self._n_steps < lengths
+        to_terminal = ends_with_terminal & ~has_next
+        rows = np.flatnonzero(has_next | to_terminal)
+
+        durations = np.where(has_next, self._n_steps, lengths - positions)
+        next_rows = np.minimum(np.arange(size) + self._n_steps, size - 1)
+        next_idx = np.where(has_next, indices[next_rows], -1)
+
+        # n-step discounted returns summed in the same order as step-wise
+        if np.issubdtype(rewards.dtype, np.floating) and rewards.ndim > 1:
+            dtype = rewards.dtype
+        else:
+            dtype = np.dtype(np.float64)
+        returns = np.zeros(rewards.shape, dtype=dtype)
+        for k in range(self._n_steps):
+            valid = k < durations[: size - k]
+            valid = np.reshape(valid, [-1] + [1] * (rewards.ndim - 1))
+            returns[: size - k] += np.where(
+                valid, (self._gamma**k) * rewards[k:], 0.0
+            )
+
+        lazy_batch = transition_factory.create_batch(
+            curr_idx=indices[rows],
+            next_idx=next_idx[rows],
+            multi_step_rewards=returns[rows],
+            durations=durations[rows],
+            positions=positions[rows],
+        )
+
+        # register episodes
+        episodes = []
+        for start, stop in zip(starts, stops):
+            episodes.append(self._episode_manager.active_episode)
+            self._episode_manager.attach_steps(indices[start:stop])
+            if is_end[stop - 1]:
+                self.clip_episode()
+        counts = np.bincount(episode_ids[rows], minlength=len(episodes))
+        self._episode_manager.extend_transitions(lazy_batch, episodes, counts)
+
+    def attach(self, step: Step, timeout: Optional[bool] = None) -> None:
+        """Creates Transition from Step object already stored in StepBuffer.
+
+        This method is used to rebuild episodes and transitions from
+        pre-stored steps.
+
+        Args:
+            step: Step object.
+            timeout: timeout flag.
+
+        """
+        self._episode_manager.attach_step(step)
+        self._create_transitions(step, timeout)
+
+    def _create_transitions(self, step: Step, timeout: Optional[bool]) -> None:
+        terminal = step.terminal
 
         if self._episode_manager.active_episode.size() > self._n_steps:
             last_step = self._episode_manager.active_episode.get_prev(
@@ -1,12 +1,13 @@
 # pylint: disable=R1711
-from collections import deque
-from typing import Deque, List, Optional, Sequence
+from typing import List, Optional, Sequence, Union
 
 import numpy as np
-from typing_extensions import Protocol
+from typing_extensions import Protocol, runtime_checkable
 
+from .segment_tree import MinTree, SumTree
 from .step import StepBuffer
 from .transition import LazyTransition, Transition
+from .transition_table import LazyTransitionBatch, TransitionTable
 
 
 class TransitionBuffer(Protocol):
@@ -26,6 +27,19 @@ class TransitionBuffer(Protocol):
         """
         raise NotImplementedError
 
+    def extend(self, lazy_batch: LazyTransitionBatch) -> np.ndarray:
+        """Appends transitions in bulk.
+
+        Args:
+            lazy_batch: LazyTransitionBatch object. 1-D
+                ``multi_step_rewards`` are treated as scalar rewards.
+
+        Returns:
+            array of ``curr_idx`` of dropped transitions in dropped order.
+
+        """
+        raise NotImplementedError
+
     def get_by_index(self, index: int) -> LazyTransition:
         """Returns transition by index.
 
@@ -64,17 +78,58 @@ class TransitionBuffer(Protocol):
         raise NotImplementedError
 
 
-class UnlimitedTransitionBuffer(TransitionBuffer):
+@runtime_checkable
+class IndexedTransitionBuffer(TransitionBuffer, Protocol):
+    """TransitionBuffer object which can sample transitions by index.
+
+    ``BatchFactory`` aligns sampled transitions with their indices only with
+    this buffer. Other buffers are sampled through ``sample``.
+
+    """
+
+    def sample_indices(self, batch_size: int) -> np.ndarray:
+        """Samples indices of transitions.
+
+        Args:
+            batch_size: number of indices.
+
+        Returns:
+            array of transition indices.
+
+        """
+        raise NotImplementedError
+
+    def gather(self, indices: np.ndarray) -> LazyTransitionBatch:
+        """Returns transitions of specified indices in struct-of-arrays form.
+
+        This method is only available for buffers storing transitions in
+        ``TransitionTable``.
+
+        Args:
+            indices: array of transition indices.
+
+        Returns:
+            LazyTransitionBatch object.
+
+        """
+        raise NotImplementedError
+
+
+class UnlimitedTransitionBuffer(IndexedTransitionBuffer):
     """UnlimitedTransitionBuffer class.
 
     This buffer can have unlimited number of transitions.
 
+    Args:
+        use_table: flag to store transitions in ``TransitionTable`` instead of
+            keeping LazyTransition objects.
+
     """
 
-    _buffer: List[LazyTransition]
+    _buffer: Union[List[LazyTransition], TransitionTable]
 
-    def __init__(self) -> None:
-        self._buffer = []
+    def __init__(self, use_table: bool = False) -> None:
+        self._buffer = TransitionTable() if use_table else []
 
     def append(
         self, lazy_transition: LazyTransition
@@ -82,6 +137,13 @@ class UnlimitedTransitionBuffer(TransitionBuffer):
         self._buffer.append(lazy_transition)
         return None
 
+    def extend(self, lazy_batch: LazyTransitionBatch) -> np.ndarray:
+        if isinstance(self._buffer, TransitionTable):
+            self._buffer.extend(lazy_batch)
+        else:
+            self._buffer.extend(lazy_batch.to_lazy_transitions())
+        return np.zeros(0, dtype=np.int64)
+
     def get_by_index(self, index: int) -> LazyTransition:
         return self._buffer[index]
 
@@ -89,52 +151,287 @@ class UnlimitedTransitionBuffer(TransitionBuffer):
         index = int(np.random.randint(len(self._buffer)))
         return self._buffer[index].create(step_buffer)
 
+    def sample_indices(self, batch_size: int) -> np.ndarray:
+        return np.random.randint(len(self._buffer), size=batch_size)
+
+    def gather(self, indices: np.ndarray) -> LazyTransitionBatch:
+        assert isinstance(
+            self._buffer, TransitionTable
+        ), "gather requires use_table=True"
+        return self._buffer.gather(indices)
+
     def size(self) -> int:
         return len(self._buffer)
 
     @property
     def transitions(self) -> Sequence[LazyTransition]:
+        if isinstance(self._buffer, TransitionTable):
+            return [self._buffer[i] for i in range(len(self._buffer))]
         return self._buffer
 
 
-class FIFOTransitionBuffer(TransitionBuffer):
+class FIFOTransitionBuffer(IndexedTransitionBuffer):
     """FIFOTransitionBuffer class.
 
     This class stores and drops transitions in first-in-first-out order.
+    Transitions are stored in a fixed-capacity circular array so that
+    indexed reads take constant time regardless of ``maxlen``.
 
     Args:
         maxlen: maximum number of transitions.
+        use_table: flag to store transitions in ``TransitionTable`` instead of
+            keeping LazyTransition objects.
 
     """
 
     _maxlen: int
-    _buffer: Deque[LazyTransition]
+    _storage: Union[List[Optional[LazyTransition]], TransitionTable]
+    _head: int
+    _size: int
 
-    def __init__(self, maxlen: int) -> None:
+    def __init__(self, maxlen: int, use_table: bool = False) -> None:
         self._maxlen = maxlen
-        self._buffer = deque(maxlen=maxlen)
+        self._storage = (
+            TransitionTable(maxlen) if use_table else [None] * maxlen
+        )
+        self._head = 0
+        self._size = 0
 
     def append(
         self, lazy_transition: LazyTransition
     ) -> Optional[LazyTransition]:
         dropped_transition: Optional[LazyTransition]
-        if self.size() == self._maxlen:
-            dropped_transition = self._buffer[0]
+        if self._size == self._maxlen:
+            # overwrite the oldest transition
+            dropped_transition = self._get_by_row(self._head)
+            self._storage[self._head] = lazy_transition
+            self._head = (self._head + 1) % self._maxlen
         else:
             dropped_transition = None
-        self._buffer.append(lazy_transition)
+            row = (self._head + self._size) % self._maxlen
+            self._storage[row] = lazy_transition
+            self._size += 1
         return dropped_transition
 
+    def extend(self, lazy_batch: LazyTransitionBatch) -> np.ndarray:
+        size = len(lazy_batch)
+        total = self._size + size
+        num_dropped = max(total - self._maxlen, 0)
+
+        # stored transitions are dropped first, then the head of the batch
+        num_old_dropped = min(num_dropped, self._size)
+        old_rows = (self._head + np.arange(num_old_dropped)) % self._maxlen
+        dropped_idx = np.concatenate(
+            [
+                self._get_curr_idx_by_rows(old_rows),
+                lazy_batch.curr_idx[: num_dropped - num_old_dropped],
+            ]
+        ).astype(np.int64)
+
+        # only the last maxlen transitions survive
+        offset = max(size - self._maxlen, 0)
+        rows = (
+            self._head + self._size + np.arange(offset, size)
+        ) % self._maxlen
+        kept_batch = lazy_batch.slice(offset, size)
+        if isinstance(self._storage, TransitionTable):
+            self._storage.set_rows(rows, kept_batch)
+        else:
+            lazy_transitions = kept_batch.to_lazy_transitions()
+            for row, lazy_transition in zip(rows, lazy_transitions):
+                self._storage[int(row)] = lazy_transition
+
+        if total > self._maxlen:
+            self._head = (self._head + total - self._maxlen) % self._maxlen
+            self._size = self._maxlen
+        else:
+            self._size = total
+        return dropped_idx
+
+    def _get_curr_idx_by_rows(self, rows: np.ndarray) -> np.ndarray:
+        if isinstance(self._storage, TransitionTable):
+            if rows.shape[0] == 0:
+                return np.zeros(0, dtype=np.int64)
+            return self._storage.gather(rows).curr_idx
+        return np.array(
+            [self._get_by_row(int(row)).curr_idx for row in rows],
+            dtype=np.int64,
+        )
+
+    def _get_by_row(self, row: int) -> LazyTransition:
+        lazy_transition = self._storage[row]
+        assert lazy_transition is not None
+        return lazy_transition
+
     def get_by_index(self, index: int) -> LazyTransition:
-        return self._buffer[index]
+        if index < 0:
+            index += self._size
+        assert 0 <= index < self._size, f"index={index} is out of range"
+        return self._get_by_row((self._head + index) % self._maxlen)
 
     def sample(self, step_buffer: StepBuffer) -> Transition:
-        index = int(np.random.randint(len(self._buffer)))
-        return self._buffer[index].create(step_buffer)
+        index = int(np.random.randint(self._size))
+        return self.get_by_index(index).create(step_buffer)
+
+    def sample_indices(self, batch_size: int) -> np.ndarray:
+        return np.random.randint(self._size, size=batch_size)
+
+    def gather(self, indices: np.ndarray) -> LazyTransitionBatch:
+        assert isinstance(
+            self._storage, TransitionTable
+        ), "gather requires use_table=True"
+        return self._storage.gather((self._head + indices) % self._maxlen)
 
     def size(self) -> int:
-        return len(self._buffer)
+        return self._size
 
     @property
     def transitions(self) -> Sequence[LazyTransition]:
-        return self._buffer
+        return [self.get_by_index(i) for i in range(self._size)]
+
+
+class PrioritizedTransitionBuffer(FIFOTransitionBuffer):
+    """PrioritizedTransitionBuffer class.
+
+    This class samples transitions proportionally to their priorities with
+    an array-based sum-tree, and drops transitions in first-in-first-out
+    order. Newly appended transitions get the maximum priority seen so far.
+
+    Unlike ``FIFOTransitionBuffer``, indices of this buffer refer to storage
+    slots so that sampled indices stay valid for ``update_priorities`` until
+    the slot is overwritten.
+
+    References:
+        * `Schaul et al., Prioritized Experience Replay.
+          <https://arxiv.org/abs/1511.05952>`_
+
+    Args:
+        maxlen: maximum number of transitions.
+        alpha: prioritization exponent.
+        beta: importance sampling exponent.
+        epsilon: small constant added to priorities.
+        use_table: flag to store transitions in ``TransitionTable`` instead of
+            keeping LazyTransition objects.
+
+    """
+
+    _alpha: float
+    _beta: float
+    _epsilon: float
+    _max_priority: float
+    _sum_tree: SumTree
+    _min_tree: MinTree
+
+    def __init__(
+        self,
+        maxlen: int,
+        alpha: float = 0.6,
+        beta: float = 0.4,
+        epsilon: float = 1e-6,
+        use_table: bool = False,
+    ) -> None:
+        super().__init__(maxlen, use_table)
+        self._alpha = alpha
+        self._beta = beta
+        self._epsilon = epsilon
+        self._max_priority = 1.0
+        self._sum_tree = SumTree(maxlen)
+        self._min_tree = MinTree(maxlen)
+
+    def append(
+        self, lazy_transition: LazyTransition
+    ) -> Optional[LazyTransition]:
+        if self._size == self._maxlen:
+            row = self._head
+        else:
+            row = (self._head + self._size) % self._maxlen
+        dropped_transition = super().append(lazy_transition)
+        self._set_priorities(
+            np.array([row]), np.array([self._max_priority**self._alpha])
+        )
+        return dropped_transition
+
+    def extend(self, lazy_batch: LazyTransitionBatch) -> np.ndarray:
+        size = len(lazy_batch)
+        offset = max(size - self._maxlen, 0)
+        rows = (
+            self._head + self._size + np.arange(offset, size)
+        ) % self._maxlen
+        dropped_idx = super().extend(lazy_batch)
+        priorities = np.full(rows.shape[0], self._max_priority**self._alpha)
+        self._set_priorities(rows, priorities)
+        return dropped_idx
+
+    def _set_priorities(self, rows: np.ndarray, values: np.ndarray) -> None:
+        self._sum_tree.update(rows, values)
+        self._min_tree.update(rows, values)
+
+    def get_by_index(self, index: int) -> LazyTransition:
+        if index < 0:
+            index += self._size
+        assert 0 <= index < self._size, f"index={index} is out of range"
+        return self._get_by_row(index)
+
+    def sample(self, step_buffer: StepBuffer) -> Transition:
+        index = int(self.sample_indices(1)[0])
+        return self.get_by_index(index).create(step_buffer)
+
+    def sample_indices(self, batch_size: int) -> np.ndarray:
+        assert self._size > 0, "buffer is empty"
+        # stratified sampling over equal segments of the total priority
+        segment = self._sum_tree.reduce() / batch_size
+        prefixsums = np.arange(batch_size) + np.random.random(batch_size)
+        indices = self._sum_tree.find_prefixsum_indices(prefixsums * segment)
+        return np.minimum(indices, self._size - 1)
+
+    def gather(self, indices: np.ndarray) -> LazyTransitionBatch:
+        assert isinstance(
+            self._storage, TransitionTable
+        ), "gather requires use_table=True"
+        return self._storage.gather(indices)
+
+    def compute_weights(self, indices: np.ndarray) -> np.ndarray:
+        """Returns importance sampling weights normalized by the maximum.
+
+        Args:
+            indices: array of transition indices.
+
+        Returns:
+            array of weights with shape ``(batch_size, 1)``.
+
+        """
+        total = self._sum_tree.reduce()
+        probs = self._sum_tree[indices] / total
+        min_prob = self._min_tree.reduce() / total
+        weights = (probs / min_prob) ** (-self._beta)
+        return np.reshape(weights, [-1, 1]).astype(np.float32)
+
+    def update_priorities(
+        self, indices: np.ndarray, priorities: np.ndarray
+    ) -> None:
+        """Updates priorities of transitions.
+
+        Args:
+            indices: array of transition indices returned by sampling.
+            priorities: array of new priorities such as absolute TD errors.
+
+        """
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        priorities = np.abs(np.asarray(priorities, dtype=np.float64))
+        priorities = priorities.reshape(-1) + self._epsilon
+        assert indices.shape == priorities.shape
+        assert np.all(indices < self._size), "index is out of range"
+        self._max_priority = max(self._max_priority, float(priorities.max()))
+        self._set_priorities(indices, priorities**self._alpha)
+
+    @property
+    def alpha(self) -> float:
+        return self._alpha
+
+    @property
+    def beta(self) -> float:
+        return self._beta
+
+    @beta.setter
+    def beta(self, beta: float) -> None:
+        self._beta = beta
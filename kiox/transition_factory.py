@@ -1,6 +1,7 @@
 from typing import Optional
 
-from typing_extensions import Protocol
+import numpy as np
+from typing_extensions import Protocol, runtime_checkable
 
 from .episode import Episode
 from .step import Step
@@ -9,6 +10,7 @@ from .transition import (
     LazyTransition,
     SimpleLazyTransition,
 )
+from .transition_table import LazyTransitionBatch
 
 
 class TransitionFactory(Protocol):
@@ -39,7 +41,38 @@ class TransitionFactory(Protocol):
         raise NotImplementedError
 
 
-class SimpleTransitionFactory(TransitionFactory):
+@runtime_checkable
+class BatchTransitionFactory(TransitionFactory, Protocol):
+    """TransitionFactory object which can create transitions in bulk."""
+
+    def create_batch(
+        self,
+        curr_idx: np.ndarray,
+        next_idx: np.ndarray,
+        multi_step_rewards: np.ndarray,
+        durations: np.ndarray,
+        positions: np.ndarray,
+    ) -> LazyTransitionBatch:
+        """Creates LazyTransition objects in struct-of-arrays form.
+
+        Steps of each episode must have consecutive idx.
+
+        Args:
+            curr_idx: idx for the current steps.
+            next_idx: idx for the next steps. ``-1`` represents terminal
+                state.
+            multi_step_rewards: discounted returns.
+            durations: the number of steps before next steps.
+            positions: positions of the current steps in their episodes.
+
+        Returns:
+            LazyTransitionBatch object.
+
+        """
+        raise NotImplementedError
+
+
+class SimpleTransitionFactory(BatchTransitionFactory):
     """SimpleTransitionFactory class.
 
     This class creates SimpleLazyTransition.
@@ -61,8 +94,25 @@ class SimpleTransitionFactory(TransitionFactory):
             duration=duration,
         )
 
+    def create_batch(
+        self,
+        curr_idx: np.ndarray,
+        next_idx: np.ndarray,
+        multi_step_rewards: np.ndarray,
+        durations: np.ndarray,
+        positions: np.ndarray,
+    ) -> LazyTransitionBatch:
+        return LazyTransitionBatch(
+            curr_idx=curr_idx,
+            next_idx=next_idx,
+            multi_step_rewards=multi_step_rewards,
+            durations=durations,
+            prev_frames=None,
+            n_frames=0,
+        )
+
 
-class FrameStackTransitionFactory(TransitionFactory):
+class FrameStackTransitionFactory(BatchTransitionFactory):
     """FrameStackTransitionFactory class.
 
     This class creates FrameStackLazyTransition.
@@ -99,3 +149,24 @@ class FrameStackTransitionFactory(TransitionFactory):
             prev_frames=list(reversed(prev_frames)),
             n_frames=self._n_frames,
         )
+
+    def create_batch(
+        self,
+        curr_idx: np.ndarray,
+        next_idx: np.ndarray,
+        multi_step_rewards: np.ndarray,
+        durations: np.ndarray,
+        positions: np.ndarray,
+    ) -> LazyTransitionBatch:
+        # right-aligned previous frames padded with -1
+        offsets = np.arange(max(self._n_frames - 1, 0), 0, -1)
+        prev_frames = curr_idx[:, None] - offsets[None, :]
+        prev_frames[positions[:, None] < offsets[None, :]] = -1
+        return LazyTransitionBatch(
+            curr_idx=curr_idx,
+            next_idx=next_idx,
+            multi_step_rewards=multi_step_rewards,
+            durations=durations,
+            prev_frames=prev_frames,
+            n_frames=self._n_frames,
+        )
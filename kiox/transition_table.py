@@ -0,0 +1,342 @@
+import dataclasses
+from typing import List, Optional
+
+import numpy as np
+
+from .transition import (
+    FrameStackLazyTransition,
+    LazyTransition,
+    SimpleLazyTransition,
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class LazyTransitionBatch:
+    """Batch of lazy transitions in struct-of-arrays form.
+
+    Args:
+        curr_idx: idx for the current steps.
+        next_idx: idx for the next steps. ``-1`` represents terminal state.
+        multi_step_rewards: discounted returns.
+        durations: the number of steps before next steps.
+        prev_frames: idx of previous frames to stack. ``-1`` represents
+            padding. ``None`` if transitions are not frame-stacked.
+        n_frames: number of frames to stack.
+
+    """
+
+    curr_idx: np.ndarray
+    next_idx: np.ndarray
+    multi_step_rewards: np.ndarray
+    durations: np.ndarray
+    prev_frames: Optional[np.ndarray]
+    n_frames: int
+
+    def __len__(self) -> int:
+        return int(self.curr_idx.shape[0])
+
+    def slice(self, start: int, stop: int) -> "LazyTransitionBatch":
+        """Returns transitions from ``start`` to ``stop``.
+
+        Args:
+            start: start location.
+            stop: stop location.
+
+        Returns:
+            LazyTransitionBatch object.
+
+        """
+        return LazyTransitionBatch(
+            curr_idx=self.curr_idx[start:stop],
+            next_idx=self.next_idx[start:stop],
+            multi_step_rewards=self.multi_step_rewards[start:stop],
+            durations=self.durations[start:stop],
+            prev_frames=(
+                None
+                if self.prev_frames is None
+                else self.prev_frames[start:stop]
+            ),
+            n_frames=self.n_frames,
+        )
+
+    def to_lazy_transitions(self) -> List[LazyTransition]:
+        """Returns LazyTransition objects.
+
+        ``SimpleLazyTransition`` objects are created if ``prev_frames`` is
+        ``None``, otherwise ``FrameStackLazyTransition`` objects are created.
+        1-D ``multi_step_rewards`` are treated as scalar rewards.
+
+        Returns:
+            list of LazyTransition objects.
+
+        """
+        is_scalar = self.multi_step_rewards.ndim == 1
+        return [
+            _create_lazy_transition(
+                curr_idx=int(self.curr_idx[i]),
+                next_idx=int(self.next_idx[i]),
+                reward=self.multi_step_rewards[i],
+                reward_is_scalar=is_scalar,
+                duration=int(self.durations[i]),
+                prev_frames=(
+                    None if self.prev_frames is None else self.prev_frames[i]
+                ),
+                n_frames=self.n_frames,
+            )
+            for i in range(len(self))
+        ]
+
+
+def _create_lazy_transition(
+    curr_idx: int,
+    next_idx: int,
+    reward: np.ndarray,
+    reward_is_scalar: bool,
+    duration: int,
+    prev_frames: Optional[np.ndarray],
+    n_frames: int,
+) -> LazyTransition:
+    multi_step_reward = float(reward) if reward_is_scalar else reward.copy()
+    if prev_frames is not None:
+        return FrameStackLazyTransition(
+            curr_idx=curr_idx,
+            next_idx=None if next_idx < 0 else next_idx,
+            multi_step_reward=multi_step_reward,
+            duration=duration,
+            prev_frames=[int(idx) for idx in prev_frames if idx >= 0],
+            n_frames=n_frames,
+        )
+    return SimpleLazyTransition(
+        curr_idx=curr_idx,
+        next_idx=None if next_idx < 0 else next_idx,
+        multi_step_reward=multi_step_reward,
+        duration=duration,
+    )
+
+
+class TransitionTable:
+    """TransitionTable class.
+
+    This class stores LazyTransition objects as parallel NumPy arrays of
+    ``curr_idx``, ``next_idx``, ``multi_step_reward``, ``duration`` and
+    previous frame idx instead of keeping a Python object per transition.
+    LazyTransition objects are rebuilt on access.
+
+    Supported transitions are ``SimpleLazyTransition`` and
+    ``FrameStackLazyTransition``. The kind of transition is inferred from
+    the first stored one.
+
+    Args:
+        capacity: initial number of rows. The table grows automatically when
+            ``append`` exceeds the capacity.
+
+    """
+
+    _capacity: int
+    _size: int
+    _curr_idx: np.ndarray
+    _next_idx: np.ndarray
+    _durations: np.ndarray
+    _multi_step_rewards: Optional[np.ndarray]
+    _reward_is_scalar: bool
+    _prev_frames: Optional[np.ndarray]
+    _n_frames: int
+
+    def __init__(self, capacity: int = 1024):
+        self._capacity = capacity
+        self._size = 0
+        self._curr_idx = np.full(capacity, -1, dtype=np.int64)
+        self._next_idx = np.full(capacity, -1, dtype=np.int64)
+        self._durations = np.zeros(capacity, dtype=np.int64)
+        self._multi_step_rewards = None
+        self._reward_is_scalar = True
+        self._prev_frames = None
+        self._n_frames = 0
+
+    def _initialize(self, lazy_transition: LazyTransition) -> None:
+        if isinstance(lazy_transition, FrameStackLazyTransition):
+            n_frames: Optional[int] = lazy_transition.n_frames
+        elif isinstance(lazy_transition, SimpleLazyTransition):
+            n_frames = None
+        else:
+            raise ValueError(
+                "TransitionTable supports SimpleLazyTransition and "
+                f"FrameStackLazyTransition: {type(lazy_transition)}"
+            )
+        self._allocate(np.asarray(lazy_transition.multi_step_reward), n_frames)
+
+    def _allocate(self, reward: np.ndarray, n_frames: Optional[int]) -> None:
+        if n_frames is not None:
+            self._n_frames = n_frames
+            self._prev_frames = np.full(
+                (self._capacity, max(self._n_frames - 1, 0)),
+                -1,
+                dtype=np.int64,
+            )
+
+        self._reward_is_scalar = reward.ndim == 0
+        if np.issubdtype(reward.dtype, np.floating):
+            dtype = reward.dtype
+        else:
+            dtype = np.dtype(np.float64)
+        self._multi_step_rewards = np.zeros(
+            (self._capacity, *reward.shape), dtype=dtype
+        )
+
+    def _grow(self) -> None:
+        def _extend(array: np.ndarray, fill_value: int) -> np.ndarray:
+            pad = np.full_like(array, fill_value)
+            return np.concatenate([array, pad], axis=0)
+
+        self._curr_idx = _extend(self._curr_idx, -1)
+        self._next_idx = _extend(self._next_idx, -1)
+        self._durations = _extend(self._durations, 0)
+        if self._multi_step_rewards is not None:
+            self._multi_step_rewards = _extend(self._multi_step_rewards, 0)
+        if self._prev_frames is not None:
+            self._prev_frames = _extend(self._prev_frames, -1)
+        self._capacity *= 2
+
+    def append(self, lazy_transition: LazyTransition) -> int:
+        """Appends LazyTransition object to the next row.
+
+        Args:
+            lazy_transition: LazyTransition object.
+
+        Returns:
+            row of the stored transition.
+
+        """
+        if self._size == self._capacity:
+            self._grow()
+        row = self._size
+        self[row] = lazy_transition
+        return row
+
+    def __setitem__(self, row: int, lazy_transition: LazyTransition) -> None:
+        assert row < self._capacity, f"row={row} exceeds capacity"
+        if self._multi_step_rewards is None:
+            self._initialize(lazy_transition)
+        assert self._multi_step_rewards is not None
+
+        next_idx = lazy_transition.next_idx
+        self._curr_idx[row] = lazy_transition.curr_idx
+        self._next_idx[row] = -1 if next_idx is None else next_idx
+        self._durations[row] = lazy_transition.duration
+        self._multi_step_rewards[row] = lazy_transition.multi_step_reward
+
+        if self._prev_frames is not None:
+            assert isinstance(lazy_transition, FrameStackLazyTransition)
+            prev_frames = lazy_transition.prev_frames
+            self._prev_frames[row] = -1
+            if prev_frames:
+                self._prev_frames[row, -len(prev_frames) :] = prev_frames
+
+        self._size = max(self._size, row + 1)
+
+    def extend(self, lazy_batch: LazyTransitionBatch) -> np.ndarray:
+        """Appends transitions in bulk.
+
+        Args:
+            lazy_batch: LazyTransitionBatch object. 1-D
+                ``multi_step_rewards`` are treated as scalar rewards.
+
+        Returns:
+            array of rows of the stored transitions.
+
+        """
+        while self._size + len(lazy_batch) > self._capacity:
+            self._grow()
+        rows = np.arange(self._size, self._size + len(lazy_batch))
+        self.set_rows(rows, lazy_batch)
+        return rows
+
+    def set_rows(
+        self, rows: np.ndarray, lazy_batch: LazyTransitionBatch
+    ) -> None:
+        """Stores transitions to specified rows in bulk.
+
+        Args:
+            rows: array of rows.
+            lazy_batch: LazyTransitionBatch object. 1-D
+                ``multi_step_rewards`` are treated as scalar rewards.
+
+        """
+        if len(lazy_batch) == 0:
+            return
+        assert np.all(rows < self._capacity), "rows exceed capacity"
+        if self._multi_step_rewards is None:
+            n_frames = (
+                None if lazy_batch.prev_frames is None else lazy_batch.n_frames
+            )
+            reward = lazy_batch.multi_step_rewards[0]
+            self._allocate(np.asarray(reward), n_frames)
+        assert self._multi_step_rewards is not None
+        assert (lazy_batch.prev_frames is None) == (self._prev_frames is None)
+
+        self._curr_idx[rows] = lazy_batch.curr_idx
+        self._next_idx[rows] = lazy_batch.next_idx
+        self._durations[rows] = lazy_batch.durations
+        self._multi_step_rewards[rows] = lazy_batch.multi_step_rewards
+        if self._prev_frames is not None:
+            self._prev_frames[rows] = lazy_batch.prev_frames
+
+        self._size = max(self._size, int(rows.max()) + 1)
+
+    def __getitem__(self, row: int) -> LazyTransition:
+        assert 0 <= row < self._size, f"row={row} does not exist"
+        assert self._multi_step_rewards is not None
+        return _create_lazy_transition(
+            curr_idx=int(self._curr_idx[row]),
+            next_idx=int(self._next_idx[row]),
+            reward=self._multi_step_rewards[row],
+            reward_is_scalar=self._reward_is_scalar,
+            duration=int(self._durations[row]),
+            prev_frames=(
+                None if self._prev_frames is None else self._prev_frames[row]
+            ),
+            n_frames=self._n_frames,
+        )
+
+    def gather(self, rows: np.ndarray) -> LazyTransitionBatch:
+        """Returns transitions of specified rows in struct-of-arrays form.
+
+        Args:
+            rows: array of rows.
+
+        Returns:
+            LazyTransitionBatch object.
+
+        """
+        assert self._multi_step_rewards is not None, "table is empty"
+        rewards = self._multi_step_rewards[rows]
+        if self._reward_is_scalar:
+            rewards = np.reshape(rewards, [-1, 1])
+        return LazyTransitionBatch(
+            curr_idx=self._curr_idx[rows],
+            next_idx=self._next_idx[rows],
+            multi_step_rewards=rewards,
+            durations=self._durations[rows],
+            prev_frames=(
+                None if self._prev_frames is None else self._prev_frames[rows]
+            ),
+            n_frames=self._n_frames,
+        )
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [
+            self._curr_idx,
+            self._next_idx,
+            self._durations,
+            self._multi_step_rewards,
+            self._prev_frames,
+        ]
+        return sum(int(array.nbytes) for array in arrays if array is not None)
@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+
+from kiox.distributed.compact_encoding import (
+    CompactStepDecoder,
+    CompactStepEncoder,
+)
+from kiox.distributed.proto.step_pb2 import CompactStreamProto
+from kiox.distributed.step_sender import StepData
+from kiox.distributed.utility import convert_item_to_proto
+
+
+def _create_steps(observation_shape, num_steps):
+    # slowly changing frames like consecutive video frames
+    if isinstance(observation_shape[0], int):
+        frame = np.random.randint(256, size=observation_shape, dtype=np.uint8)
+    else:
+        frame = [
+            np.random.randint(256, size=shape, dtype=np.uint8)
+            for shape in observation_shape
+        ]
+    steps = []
+    for i in range(num_steps):
+        if isinstance(frame, np.ndarray):
+            frame = frame.copy()
+            frame.reshape(-1)[i] += 1
+        else:
+            frame = [el.copy() for el in frame]
+            frame[0].reshape(-1)[i] += 1
+        steps.append(
+            StepData(
+                observation=frame,
+                action=np.random.random(2).astype(np.float32),
+                reward=float(i),
+                terminal=float(i == num_steps - 1),
+                timeout=None,
+            )
+        )
+    return steps
+
+
+@pytest.mark.parametrize(
+    "observation_shape", [(3, 32, 32), ((3, 32, 32), (4,))]
+)
+@pytest.mark.parametrize("compression", [None, "zlib"])
+@pytest.mark.parametrize("delta", [False, True])
+def test_compact_step_encoder(observation_shape, compression, delta):
+    steps = _create_steps(observation_shape, 10)
+    encoder = CompactStepEncoder(1, compression=compression, delta=delta)
+    decoder = CompactStepDecoder()
+
+    # split into 2 messages
+    messages = [
+        encoder.create_message([encoder.encode(step) for step in steps[:4]]),
+        encoder.create_message([encoder.encode(step) for step in steps[4:]]),
+    ]
+
+    # schema is sent only once
+    assert messages[0].HasField("schema")
+    assert not messages[1].HasField("schema")
+
+    decoded_steps = []
+    for message in messages:
+        rollout_id, decoded = decoder.decode(message)
+        assert rollout_id == 1
+        decoded_steps.extend(decoded)
+
+    assert len(decoded_steps) == 10
+    for step, decoded_step in zip(steps, decoded_steps):
+        if isinstance(step.observation, np.ndarray):
+            assert decoded_step.observation.dtype == np.uint8
+            assert np.all(decoded_step.observation == step.observation)
+        else:
+            for i in range(2):
+                assert np.all(
+                    decoded_step.observation[i] == step.observation[i]
+                )
+        assert np.all(decoded_step.action == step.action)
+        assert decoded_step.reward.shape == (1,)
+        assert decoded_step.reward[0] == step.reward
+        assert decoded_step.terminal == step.terminal
+        assert decoded_step.timeout == bool(step.terminal)
+
+
+def test_compact_step_encoder_size():
+    steps = _create_steps((3, 84, 84), 10)
+
+    def encoded_size(**kwargs):
+        encoder = CompactStepEncoder(1, **kwargs)
+        message = encoder.create_message([encoder.encode(s) for s in steps])
+        return message.ByteSize()
+
+    original_size = sum(
+        convert_item_to_proto(step.observation).ByteSize()
+        + convert_item_to_proto(step.action).ByteSize()
+        + convert_item_to_proto(step.reward).ByteSize()
+        for step in steps
+    )
+    raw_size = encoded_size()
+    compressed_size = encoded_size(compression="zlib", delta=True)
+
+    assert raw_size < original_size
+    # delta of slowly changing frames is highly compressible
+    assert compressed_size * 5 < raw_size
+
+
+def test_compact_step_encoder_with_invalid_inputs():
+    with pytest.raises(ValueError):
+        CompactStepEncoder(1, compression="invalid")
+
+    encoder = CompactStepEncoder(1)
+    encoder.encode(_create_steps((4,), 1)[0])
+    with pytest.raises(ValueError):
+        encoder.encode(_create_steps((5,), 1)[0])
+
+    # schema must be received first
+    encoder = CompactStepEncoder(1)
+    step = encoder.encode(_create_steps((4,), 1)[0])
+    with pytest.raises(ValueError):
+        CompactStepDecoder().decode(CompactStreamProto(steps=[step]))
+
+    # corrupted observation is rejected as invalid input
+    encoder = CompactStepEncoder(1, compression="zlib")
+    message = encoder.create_message(
+        [encoder.encode(_create_steps((4,), 1)[0])]
+    )
+    message.steps[0].observation[0] = b"invalid"
+    with pytest.raises(ValueError):
+        CompactStepDecoder().decode(message)
@@ -0,0 +1,137 @@
+import threading
+from multiprocessing import Process
+from queue import Empty
+
+import numpy as np
+import pytest
+
+from kiox.distributed.local_step_sender import LocalStepChannel, LocalStepSender
+from kiox.distributed.server import KioxServer
+from kiox.distributed.step_sender import StepSender
+from kiox.transition_buffer import FIFOTransitionBuffer
+from kiox.transition_factory import SimpleTransitionFactory
+
+
+@pytest.mark.parametrize("observation_shape", [(3, 8, 8), ((4,), (2,))])
+def test_local_step_channel(observation_shape):
+    channel = LocalStepChannel(observation_shape, (2,), (1,), capacity=4)
+    sender = LocalStepSender(channel)
+
+    with pytest.raises(Empty):
+        channel.get(timeout=0.01)
+
+    if isinstance(observation_shape[0], int):
+        observations = [
+            np.random.random(observation_shape).astype(np.float32)
+            for _ in range(10)
+        ]
+    else:
+        observations = [
+            [
+                np.random.random(shape).astype(np.float32)
+                for shape in observation_shape
+            ]
+            for _ in range(10)
+        ]
+    actions = [np.random.random(2).astype(np.float32) for _ in range(10)]
+
+    # the producer blocks while the ring is full
+    def produce():
+        for i in range(10):
+            sender.collect(
+                observation=observations[i],
+                action=actions[i],
+                reward=float(i),
+                terminal=i == 9,
+            )
+        sender.stop()
+
+    thread = threading.Thread(target=produce)
+    thread.start()
+
+    received = []
+    while True:
+        step = channel.get(timeout=1.0)
+        if step is None:
+            break
+        received.append(step)
+    thread.join(timeout=0.1)
+    # stop waits until the consumer notifies
+    assert thread.is_alive()
+    channel.notify_drained()
+    thread.join()
+
+    assert len(received) == 10
+    for i, step in enumerate(received):
+        if isinstance(observation_shape[0], int):
+            assert np.all(step.observation == observations[i])
+        else:
+            for j in range(2):
+                assert np.all(step.observation[j] == observations[i][j])
+        assert np.all(step.action == actions[i])
+        assert step.reward.shape == (1,)
+        assert step.reward[0] == i
+        assert step.terminal == float(i == 9)
+        assert step.timeout == (i == 9)
+
+
+def _rollout(sender, num_steps):
+    for i in range(num_steps):
+        sender.collect(
+            observation=np.random.random(4).astype(np.float32) + 0.1,
+            action=np.random.random(2).astype(np.float32),
+            reward=1.0,
+            terminal=float(i % 10 == 9),
+        )
+    sender.stop()
+
+
+def _remote_rollout(port, rollout_id, num_steps):
+    _rollout(StepSender("localhost", port, rollout_id), num_steps)
+
+
+def test_kiox_server_with_local_senders():
+    def transition_buffer_builder():
+        return FIFOTransitionBuffer(1000)
+
+    def transition_factory_builder():
+        return SimpleTransitionFactory()
+
+    server = KioxServer(
+        host="localhost",
+        port=8006,
+        observation_shape=(4,),
+        action_shape=(2,),
+        reward_shape=(1,),
+        batch_size=8,
+        transition_buffer_builder=transition_buffer_builder,
+        transition_factory_builder=transition_factory_builder,
+        local_rollout_ids=[0, 1],
+        local_channel_capacity=8,
+    )
+    server.start()
+
+    num_steps = 100
+    processes = [
+        Process(target=_rollout, args=(server.get_local_sender(i), num_steps))
+        for i in range(2)
+    ]
+    # the same rollout code with gRPC transport
+    processes.append(Process(target=_remote_rollout, args=(8006, 2, num_steps)))
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+        assert p.exitcode == 0
+
+    assert server.get_step_buffer_size() == 3 * num_steps
+    assert server.get_transition_buffer_size() == 3 * num_steps
+
+    batch = server.sample()
+    assert np.all(batch.observations != 0.0)
+
+    # a restarted rollout worker reuses the channel
+    _rollout(server.get_local_sender(0), 10)
+    assert server.get_step_buffer_size() == 3 * num_steps + 10
+
+    server.stop()
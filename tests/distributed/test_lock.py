@@ -0,0 +1,81 @@
+import threading
+import time
+
+from kiox.distributed.lock import ReadWriteLock
+
+
+def test_read_write_lock():
+    lock = ReadWriteLock()
+
+    # readers share the lock
+    with lock.read():
+        with lock.read():
+            assert lock.num_readers == 2
+    assert lock.num_readers == 0
+
+    # a writer waits for readers
+    events = []
+
+    def write():
+        with lock.write():
+            events.append("write")
+
+    with lock.read():
+        thread = threading.Thread(target=write)
+        thread.start()
+        time.sleep(0.1)
+        events.append("read")
+    thread.join()
+    assert events == ["read", "write"]
+
+    # readers wait for a writer
+    events = []
+
+    def read():
+        with lock.read():
+            events.append("read")
+
+    with lock.write():
+        assert lock.is_writing
+        thread = threading.Thread(target=read)
+        thread.start()
+        time.sleep(0.1)
+        events.append("write")
+    thread.join()
+    assert events == ["write", "read"]
+    assert not lock.is_writing
+
+
+def test_read_write_lock_exclusive():
+    lock = ReadWriteLock()
+    counter_lock = threading.Lock()
+    state = {"writing": 0, "reading": 0, "violations": 0}
+
+    def update(key, value):
+        with counter_lock:
+            state[key] += value
+            if state["writing"] > 1:
+                state["violations"] += 1
+            if state["writing"] and state["reading"]:
+                state["violations"] += 1
+
+    def write():
+        for _ in range(200):
+            with lock.write():
+                update("writing", 1)
+                update("writing", -1)
+
+    def read():
+        for _ in range(200):
+            with lock.read():
+                update("reading", 1)
+                update("reading", -1)
+
+    threads = [threading.Thread(target=write) for _ in range(4)]
+    threads += [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert state["violations"] == 0
@@ -0,0 +1,68 @@
+import grpc
+import numpy as np
+import pytest
+
+from kiox.distributed.remote_sampler import RemoteSampler
+from kiox.distributed.server import KioxServer
+from kiox.distributed.step_sender import StepSender
+from kiox.transition_buffer import FIFOTransitionBuffer
+from kiox.transition_factory import SimpleTransitionFactory
+
+
+def transition_buffer_builder():
+    return FIFOTransitionBuffer(100)
+
+
+def transition_factory_builder():
+    return SimpleTransitionFactory()
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_remote_sampler(prefetch):
+    server = KioxServer(
+        host="localhost",
+        port=8005,
+        observation_shape=(3, 8, 8),
+        action_shape=(2,),
+        reward_shape=(1,),
+        batch_size=4,
+        transition_buffer_builder=transition_buffer_builder,
+        transition_factory_builder=transition_factory_builder,
+    )
+    server.start()
+
+    # no transitions to sample yet
+    sampler = RemoteSampler("localhost", 8005, batch_size=8, prefetch=prefetch)
+    with pytest.raises(grpc.RpcError) as e:
+        sampler.sample()
+    assert e.value.code() == grpc.StatusCode.FAILED_PRECONDITION
+    sampler.stop()
+
+    sender = StepSender("localhost", 8005, 0)
+    for i in range(20):
+        sender.collect(
+            observation=np.random.randint(
+                1, 256, size=(3, 8, 8), dtype=np.uint8
+            ),
+            action=np.random.random(2).astype(np.float32) + 0.1,
+            reward=1.0,
+            terminal=float(i % 10 == 9),
+        )
+    sender.stop()
+
+    sampler = RemoteSampler("localhost", 8005, batch_size=8, prefetch=prefetch)
+    for _ in range(5):
+        batch = sampler.sample()
+        assert batch.observations.shape == (8, 3, 8, 8)
+        assert batch.observations.dtype == np.uint8
+        assert batch.next_observations.shape == (8, 3, 8, 8)
+        assert batch.actions.shape == (8, 2)
+        assert batch.rewards.shape == (8, 1)
+        assert batch.terminals.shape == (8, 1)
+        assert batch.durations.shape == (8, 1)
+        assert np.all(batch.observations != 0)
+        assert np.all(batch.actions != 0.0)
+        assert np.all(batch.rewards == 1.0)
+    sampler.stop()
+
+    server.stop()
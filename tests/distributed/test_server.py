@@ -1,9 +1,18 @@
 import os
+import threading
 import time
 from multiprocessing import Process, Queue
 
+import grpc
 import numpy as np
+import pytest
 
+from kiox.distributed.compact_encoding import CompactStepEncoder
+from kiox.distributed.proto.step_pb2 import (
+    DisconnectRequest,
+    StepBatchProto,
+    StepProto,
+)
 from kiox.distributed.server import (
     COMMAND_GET_STEP_LEN,
     COMMAND_GET_TRANSITION_LEN,
@@ -12,14 +21,293 @@ from kiox.distributed.server import (
     COMMAND_SAVE,
     COMMAND_STOP,
     KioxServer,
+    KioxStepServiceServicer,
     kiox_server_process,
 )
 from kiox.distributed.shared_batch_factory import SharedBatchFactory
 from kiox.distributed.step_sender import StepSender
+from kiox.distributed.utility import StepData, convert_item_to_proto
+from kiox.step import StepBuffer, StripedStepBuffer
 from kiox.transition_buffer import FIFOTransitionBuffer
 from kiox.transition_factory import SimpleTransitionFactory
 
 
+def test_kiox_step_service_servicer_send_batch():
+    step_buffer = StepBuffer()
+    transition_buffer = FIFOTransitionBuffer(10)
+    servicer = KioxStepServiceServicer(
+        step_buffer=step_buffer,
+        transition_buffer=transition_buffer,
+        transition_factory=SimpleTransitionFactory(),
+    )
+
+    steps = []
+    for i in range(5):
+        steps.append(
+            StepProto(
+                observation=convert_item_to_proto(
+                    np.random.random(4).astype(np.float32)
+                ),
+                action=convert_item_to_proto(
+                    np.random.random(2).astype(np.float32)
+                ),
+                reward=convert_item_to_proto(float(i)),
+                terminal=0.0,
+                timeout=i == 2,
+            )
+        )
+    reply = servicer.SendBatch(StepBatchProto(steps=steps, rollout_id=1), None)
+    assert reply.status == "success"
+    assert reply.num_steps == 5
+
+    # timeout splits steps into episodes of 3 and 2 steps
+    episodes = servicer.episode_managers[0].episodes
+    assert [episode.size() for episode in episodes] == [3, 2]
+    assert [step.reward[0] for step in episodes[0].steps] == [0, 1, 2]
+    assert transition_buffer.size() == 2 + 1
+
+    reply = servicer.SendBatch(StepBatchProto(steps=steps, rollout_id=-1), None)
+    assert reply.status != "success"
+
+
+def test_kiox_step_service_servicer_send_compact_stream():
+    step_buffer = StepBuffer()
+    transition_buffer = FIFOTransitionBuffer(10)
+    servicer = KioxStepServiceServicer(
+        step_buffer=step_buffer,
+        transition_buffer=transition_buffer,
+        transition_factory=SimpleTransitionFactory(),
+    )
+
+    encoder = CompactStepEncoder(1, compression="zlib", delta=True)
+    observations = []
+    messages = []
+    for i in range(5):
+        observation = np.random.randint(256, size=(3, 8, 8), dtype=np.uint8)
+        observations.append(observation)
+        step = encoder.encode(
+            StepData(
+                observation=observation,
+                action=np.random.random(2).astype(np.float32),
+                reward=float(i),
+                terminal=0.0,
+                timeout=i == 2,
+            )
+        )
+        messages.append(encoder.create_message([step]))
+    reply = servicer.SendCompactStream(iter(messages), None)
+    assert reply.status == "success"
+    assert reply.num_steps == 5
+
+    episodes = servicer.episode_managers[0].episodes
+    assert [episode.size() for episode in episodes] == [3, 2]
+    steps = [step for episode in episodes for step in episode.steps]
+    for step, observation in zip(steps, observations):
+        assert np.all(step.observation == observation)
+    assert transition_buffer.size() == 2 + 1
+
+    # schema must be sent first
+    reply = servicer.SendCompactStream(iter(messages[1:]), None)
+    assert reply.status != "success"
+
+
+def _create_step_proto(reward, terminal=0.0, timeout=False):
+    return StepProto(
+        observation=convert_item_to_proto(
+            np.random.random(4).astype(np.float32)
+        ),
+        action=convert_item_to_proto(np.random.random(2).astype(np.float32)),
+        reward=convert_item_to_proto(float(reward)),
+        terminal=terminal,
+        timeout=timeout,
+    )
+
+
+def test_kiox_step_service_servicer_concurrent_send():
+    step_buffer = StripedStepBuffer()
+    transition_buffer = FIFOTransitionBuffer(50)
+    servicer = KioxStepServiceServicer(
+        step_buffer=step_buffer,
+        transition_buffer=transition_buffer,
+        transition_factory=SimpleTransitionFactory(),
+    )
+    batch_factory = SharedBatchFactory((4,), (2,), (1,), 8)
+
+    num_rollouts = 8
+    num_batches = 30
+    batch_size = 5
+    replies = []
+    errors = []
+    done = threading.Event()
+
+    def send(rollout_id):
+        for i in range(num_batches):
+            steps = []
+            for j in range(batch_size):
+                # episodes of 7 steps including terminal steps
+                t = i * batch_size + j
+                steps.append(_create_step_proto(t, float(t % 7 == 6)))
+            if i % 2 == 0:
+                request = StepBatchProto(steps=steps, rollout_id=rollout_id)
+                replies.append(servicer.SendBatch(request, None))
+            else:
+                for step in steps:
+                    step.rollout_id = rollout_id
+                    replies.append(servicer.Send(step, None))
+
+    def sample():
+        num_samples = 0
+        while not done.is_set() or num_samples == 0:
+            if transition_buffer.size() == 0:
+                continue
+            try:
+                servicer.sample(batch_factory)
+            except Exception as e:  # pylint: disable=broad-except
+                errors.append(e)
+                return
+            # sampled steps are always fully written
+            if not np.all(batch_factory.batch.observations != 0.0):
+                errors.append("partially written observations")
+            num_samples += 1
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    senders = [
+        threading.Thread(target=send, args=(i,)) for i in range(num_rollouts)
+    ]
+    for sender in senders:
+        sender.start()
+    for sender in senders:
+        sender.join()
+    done.set()
+    sampler.join()
+
+    assert not errors
+    assert all(reply.status == "success" for reply in replies)
+    assert sum(reply.num_steps for reply in replies) == (
+        num_rollouts * num_batches * batch_size
+    )
+
+    # steps are owned by exactly one episode
+    episode_managers = servicer.episode_managers
+    assert len(episode_managers) == num_rollouts
+    stored_idx = [step.idx for step in step_buffer.steps]
+    episode_idx = []
+    for episode_manager in episode_managers:
+        for episode in episode_manager.episodes:
+            episode_idx.extend(step.idx for step in episode.steps)
+    assert sorted(episode_idx) == stored_idx
+
+    # transitions refer to steps of the same rollout worker
+    assert transition_buffer.size() == 50
+    for transition in transition_buffer.transitions:
+        owners = [
+            m for m in episode_managers if m.find_episode(transition.curr_idx)
+        ]
+        assert len(owners) == 1
+        step_buffer.get(transition.curr_idx)
+        if transition.next_idx is not None:
+            assert owners[0].find_episode(transition.next_idx)
+
+    # old episodes whose transitions have been dropped are removed
+    max_episode_steps = num_rollouts * 2 * 7
+    assert step_buffer.size() <= 50 + max_episode_steps
+
+
+def test_kiox_step_service_servicer_pause():
+    step_buffer = StripedStepBuffer()
+    servicer = KioxStepServiceServicer(
+        step_buffer=step_buffer,
+        transition_buffer=FIFOTransitionBuffer(10),
+        transition_factory=SimpleTransitionFactory(),
+    )
+    request = _create_step_proto(1.0)
+    request.rollout_id = 1
+    servicer.Send(request, None)
+
+    with servicer.pause():
+        sender = threading.Thread(target=servicer.Send, args=(request, None))
+        sender.start()
+        time.sleep(0.1)
+        # blocked until pause is released
+        assert step_buffer.size() == 1
+    sender.join()
+    assert step_buffer.size() == 2
+
+
+def _send_steps(servicer, rollout_id, num_steps):
+    for i in range(num_steps):
+        request = _create_step_proto(i + 1)
+        request.rollout_id = rollout_id
+        assert servicer.Send(request, None).status == "success"
+
+
+def test_kiox_step_service_servicer_evict_idle_rollouts():
+    step_buffer = StripedStepBuffer()
+    transition_buffer = FIFOTransitionBuffer(4)
+    servicer = KioxStepServiceServicer(
+        step_buffer=step_buffer,
+        transition_buffer=transition_buffer,
+        transition_factory=SimpleTransitionFactory(),
+    )
+
+    _send_steps(servicer, 1, 3)
+    time.sleep(0.1)
+    _send_steps(servicer, 2, 1)
+
+    assert servicer.evict_idle_rollouts(0.1) == [1]
+    assert not servicer.has_step_collector(1)
+    assert servicer.has_step_collector(2)
+    assert [stats.rollout_id for stats in servicer.rollout_stats()] == [2]
+
+    # the active episode is clipped and kept while it is sampled
+    assert len(servicer.episode_managers) == 2
+    episodes = servicer.episode_managers[1].episodes
+    assert [episode.size() for episode in episodes] == [3, 0]
+    assert step_buffer.size() == 3 + 1
+
+    # steps with the same rollout_id start a new episode
+    _send_steps(servicer, 1, 1)
+    assert servicer.has_step_collector(1)
+    assert servicer.get_step_collector_by_rollout_id(1) is not None
+    assert len(servicer.episode_managers) == 3
+
+    # retired one is released once its transitions are dropped
+    _send_steps(servicer, 2, 4)
+    assert len(servicer.episode_managers) == 2
+    assert step_buffer.size() == 1 + 5
+
+
+def test_kiox_step_service_servicer_disconnect():
+    servicer = KioxStepServiceServicer(
+        step_buffer=StripedStepBuffer(),
+        transition_buffer=FIFOTransitionBuffer(10),
+        transition_factory=SimpleTransitionFactory(),
+    )
+
+    _send_steps(servicer, 1, 3)
+    _send_steps(servicer, 2, 2)
+
+    stats = servicer.rollout_stats()
+    assert [s.rollout_id for s in stats] == [1, 2]
+    assert [s.num_steps for s in stats] == [3, 2]
+    assert [s.num_episodes for s in stats] == [1, 1]
+    assert all(s.idle_time >= 0.0 for s in stats)
+
+    reply = servicer.Disconnect(DisconnectRequest(rollout_id=1), None)
+    assert reply.status == "success"
+    assert not servicer.has_step_collector(1)
+    assert [s.rollout_id for s in servicer.rollout_stats()] == [2]
+
+    reply = servicer.Disconnect(DisconnectRequest(rollout_id=1), None)
+    assert reply.status != "success"
+
+    # rollout workers of loaded data are never evicted
+    servicer.append_step_collector(-1, StripedStepBuffer())
+    assert servicer.evict_idle_rollouts(1e-9) == [2]
+    assert servicer.has_step_collector(-1)
+
+
 def test_kiox_server_process():
     def transition_buffer_builder():
         return FIFOTransitionBuffer(10)
@@ -85,6 +373,7 @@ def test_kiox_server_process():
     # check save
     command_queue.put(COMMAND_SAVE)
     command_queue.put(os.path.join("test_data", "kiox.h5"))
+    command_queue.put(None)
     ack_queue.get()
 
     # check load
@@ -99,13 +388,14 @@ def test_kiox_server_process():
     ack_queue.get()
     assert np.all(batch_factory.batch.observations != 0.0)
 
+    # close stream before stopping server
+    sender.stop()
+
     command_queue.put(COMMAND_STOP)
 
     # wait until finished
     ack_queue.get()
 
-    sender.stop()
-
 
 def test_kiox_server():
     def transition_buffer_builder():
@@ -171,5 +461,277 @@ def test_kiox_server():
     assert np.all(batch.actions != 0.0)
     assert np.all(batch.rewards != 0.0)
 
+    sender.stop()
+    server.stop()
+
+
+def test_kiox_server_concurrent_senders():
+    def transition_buffer_builder():
+        return FIFOTransitionBuffer(1000)
+
+    def transition_factory_builder():
+        return SimpleTransitionFactory()
+
+    server = KioxServer(
+        host="localhost",
+        port=8001,
+        observation_shape=(4,),
+        action_shape=(2,),
+        reward_shape=(1,),
+        batch_size=8,
+        transition_buffer_builder=transition_buffer_builder,
+        transition_factory_builder=transition_factory_builder,
+    )
+    server.start()
+
+    num_senders = 4
+    num_steps = 100
+    senders = [
+        StepSender("localhost", 8001, i, batch_size=4)
+        for i in range(num_senders)
+    ]
+    for i in range(num_steps):
+        for sender in senders:
+            sender.collect(
+                observation=np.random.random(4).astype(np.float32) + 0.1,
+                action=np.random.random(2).astype(np.float32),
+                reward=1.0,
+                terminal=float(i % 10 == 9),
+            )
+        # sample while steps are stored in the server
+        if i > 10 and server.get_transition_buffer_size() > 0:
+            batch = server.sample()
+            assert np.all(batch.observations != 0.0)
+    for sender in senders:
+        sender.stop()
+
+    assert server.get_step_buffer_size() == num_senders * num_steps
+    assert server.get_transition_buffer_size() == num_senders * num_steps
+
+    server.stop()
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_kiox_server_with_more_actors_than_workers(streaming):
+    def transition_buffer_builder():
+        return FIFOTransitionBuffer(100)
+
+    def transition_factory_builder():
+        return SimpleTransitionFactory()
+
+    server = KioxServer(
+        host="localhost",
+        port=8002,
+        observation_shape=(4,),
+        action_shape=(2,),
+        reward_shape=(1,),
+        batch_size=1,
+        transition_buffer_builder=transition_buffer_builder,
+        transition_factory_builder=transition_factory_builder,
+        max_workers=3,
+    )
+    server.start()
+
+    num_senders = 3
+    senders = [
+        StepSender("localhost", 8002, i, streaming=streaming)
+        for i in range(num_senders)
+    ]
+    for _ in range(5):
+        for sender in senders:
+            try:
+                sender.collect(
+                    observation=np.random.random(4).astype(np.float32),
+                    action=np.random.random(2).astype(np.float32),
+                    reward=1.0,
+                    terminal=0.0,
+                )
+            except grpc.RpcError:
+                pass
+    time.sleep(1)
+
+    num_errors = 0
+    for sender in senders:
+        try:
+            sender.stop()
+        except grpc.RpcError as e:
+            assert e.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+            num_errors += 1
+
+    if streaming:
+        # one worker is reserved to reject the excess stream
+        assert num_errors == 1
+        assert server.get_step_buffer_size() == 2 * 5
+    else:
+        assert num_errors == 0
+        assert server.get_step_buffer_size() == num_senders * 5
+
     server.stop()
+
+
+def test_kiox_server_with_batch_slots():
+    def transition_buffer_builder():
+        return FIFOTransitionBuffer(100)
+
+    def transition_factory_builder():
+        return SimpleTransitionFactory()
+
+    server = KioxServer(
+        host="localhost",
+        port=8003,
+        observation_shape=(4,),
+        action_shape=(2,),
+        reward_shape=(1,),
+        batch_size=8,
+        transition_buffer_builder=transition_buffer_builder,
+        transition_factory_builder=transition_factory_builder,
+        num_batch_slots=2,
+    )
+    server.start()
+
+    sender = StepSender("localhost", 8003, 0)
+    for i in range(20):
+        sender.collect(
+            observation=np.random.random(4).astype(np.float32) + 0.1,
+            action=np.random.random(2).astype(np.float32),
+            reward=1.0,
+            terminal=float(i % 10 == 9),
+        )
     sender.stop()
+
+    # both slots are filled in background
+    slot1 = server.acquire_batch(timeout=5.0)
+    slot2 = server.acquire_batch(timeout=5.0)
+    assert slot1.index != slot2.index
+    assert slot1.batch.observations.shape == (8, 4)
+    assert np.all(slot1.batch.observations != 0.0)
+
+    # acquired slots are not overwritten while they are held
+    observations = slot1.batch.observations.copy()
+    time.sleep(0.5)
+    assert np.all(slot1.batch.observations == observations)
+
+    # released slot is filled again
+    server.release_batch(slot1)
+    slot3 = server.acquire_batch(timeout=5.0)
+    assert slot3.index == slot1.index
+    server.release_batch(slot2)
+    server.release_batch(slot3)
+
+    server.stop()
+
+
+def test_kiox_server_with_uint8_observation():
+    def transition_buffer_builder():
+        return FIFOTransitionBuffer(100)
+
+    def transition_factory_builder():
+        return SimpleTransitionFactory()
+
+    server = KioxServer(
+        host="localhost",
+        port=8004,
+        observation_shape=(3, 8, 8),
+        action_shape=(2,),
+        reward_shape=(1,),
+        batch_size=4,
+        transition_buffer_builder=transition_buffer_builder,
+        transition_factory_builder=transition_factory_builder,
+        observation_dtype=np.uint8,
+    )
+    server.start()
+
+    sender = StepSender("localhost", 8004, 0)
+    for _ in range(10):
+        sender.collect(
+            observation=np.random.randint(
+                1, 256, size=(3, 8, 8), dtype=np.uint8
+            ),
+            action=np.random.random(2).astype(np.float32),
+            reward=1.0,
+            terminal=0.0,
+        )
+    sender.stop()
+
+    batch = server.sample()
+    assert batch.observations.dtype == np.uint8
+    assert batch.next_observations.dtype == np.uint8
+    assert np.all(batch.observations != 0)
+
+    server.stop()
+
+
+def test_kiox_step_service_servicer_with_storage_dtypes():
+    step_buffer = StepBuffer()
+    servicer = KioxStepServiceServicer(
+        step_buffer=step_buffer,
+        transition_buffer=FIFOTransitionBuffer(10),
+        transition_factory=SimpleTransitionFactory(),
+        observation_dtype=np.float32,
+        action_dtype=np.int32,
+    )
+
+    steps = [
+        StepProto(
+            observation=convert_item_to_proto(
+                np.random.random(4).astype(np.float16)
+            ),
+            action=convert_item_to_proto(i),
+            reward=convert_item_to_proto(1.0),
+            terminal=0.0,
+        )
+        for i in range(3)
+    ]
+    reply = servicer.SendBatch(StepBatchProto(steps=steps, rollout_id=1), None)
+    assert reply.status == "success"
+
+    for i, step in enumerate(step_buffer.steps):
+        assert step.observation.dtype == np.float32
+        assert step.action.dtype == np.int32
+        assert step.action[0] == i
+        # reward keeps the sent dtype
+        assert step.reward.dtype == np.float32
+
+
+def test_kiox_server_with_idle_timeout():
+    def transition_buffer_builder():
+        return FIFOTransitionBuffer(100)
+
+    def transition_factory_builder():
+        return SimpleTransitionFactory()
+
+    server = KioxServer(
+        host="localhost",
+        port=8007,
+        observation_shape=(4,),
+        action_shape=(2,),
+        reward_shape=(1,),
+        batch_size=8,
+        transition_buffer_builder=transition_buffer_builder,
+        transition_factory_builder=transition_factory_builder,
+        idle_timeout=0.5,
+    )
+    server.start()
+
+    senders = [StepSender("localhost", 8007, i) for i in range(2)]
+    for _ in range(5):
+        for sender in senders:
+            sender.collect(
+                observation=np.random.random(4).astype(np.float32),
+                action=np.random.random(2).astype(np.float32),
+                reward=1.0,
+                terminal=0.0,
+            )
+    senders[0].stop()
+    senders[1].stop(disconnect=True)
+
+    stats = server.get_rollout_stats()
+    assert [s.rollout_id for s in stats] == [0]
+    assert stats[0].num_steps == 5
+
+    # idle rollout worker is retired
+    time.sleep(1.0)
+    assert server.get_rollout_stats() == []
+    assert server.get_step_buffer_size() == 2 * 5
+
+    server.stop()
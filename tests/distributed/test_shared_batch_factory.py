@@ -1,8 +1,18 @@
+from queue import Empty
+
 import numpy as np
 import pytest
 
-from kiox.distributed.shared_batch_factory import SharedBatchFactory
-from kiox.transition_buffer import UnlimitedTransitionBuffer
+from kiox.distributed.shared_batch_factory import (
+    SharedBatchFactory,
+    SharedBatchRing,
+)
+from kiox.kiox import Kiox
+from kiox.transition_buffer import (
+    PrioritizedTransitionBuffer,
+    UnlimitedTransitionBuffer,
+)
+from kiox.transition_factory import SimpleTransitionFactory
 
 from ..utility import StepFactory, TransitionFactory
 
@@ -46,3 +56,112 @@ def test_shared_batch_factory(observation_shape):
     assert np.all(actions != init_actions)
     assert np.all(rewards != init_rewards)
     assert np.all(durations != init_durations)
+
+
+def test_shared_batch_factory_with_indices_and_weights():
+    factory = TransitionFactory(StepFactory((100,)))
+    buffers = [UnlimitedTransitionBuffer(), PrioritizedTransitionBuffer(100)]
+    for _ in range(100):
+        transition = factory()
+        for buffer in buffers:
+            buffer.append(transition)
+    buffers[1].update_priorities(np.arange(50), np.full(50, 10.0))
+
+    batch_factory = SharedBatchFactory((100,), (4,), (1,), 32)
+
+    # weights are 1 without priorities
+    batch_factory.sample(factory.step_buffer, buffers[0])
+    batch = batch_factory.batch
+    assert np.all((batch.indices >= 0) & (batch.indices < 100))
+    assert np.all(batch.weights == 1.0)
+
+    # indices and weights of prioritized sampling are kept
+    batch_factory.sample(factory.step_buffer, buffers[1])
+    expected = buffers[1].compute_weights(batch.indices)
+    assert np.allclose(batch.weights, expected)
+    assert np.any(batch.weights != 1.0)
+
+
+def test_shared_batch_ring():
+    factory = TransitionFactory(StepFactory((100,)))
+    buffer = UnlimitedTransitionBuffer()
+
+    for _ in range(100):
+        transition = factory()
+        buffer.append(transition)
+
+    ring = SharedBatchRing((100,), (4,), (1,), 32, num_slots=2)
+    assert ring.num_slots == 2
+
+    def sample(batch_factory):
+        batch_factory.sample(factory.step_buffer, buffer)
+
+    # nothing is ready yet
+    with pytest.raises(Empty):
+        ring.acquire(timeout=0.01)
+
+    # fill all slots
+    assert ring.fill(sample, timeout=0.01)
+    assert ring.fill(sample, timeout=0.01)
+    assert not ring.fill(sample, timeout=0.01)
+
+    slot1 = ring.acquire(timeout=1.0)
+    slot2 = ring.acquire(timeout=1.0)
+    assert slot1.index != slot2.index
+    assert slot1.batch.observations.shape == (32, 100)
+
+    # acquired slots are not overwritten
+    observations = slot1.batch.observations.copy()
+    assert not ring.fill(sample, timeout=0.01)
+    assert np.all(slot1.batch.observations == observations)
+
+    # released slot is filled again
+    ring.release(slot1)
+    assert ring.fill(sample, timeout=0.01)
+    slot3 = ring.acquire(timeout=1.0)
+    assert slot3.index == slot1.index
+    assert np.any(slot3.batch.observations != observations)
+    ring.release(slot2)
+    ring.release(slot3)
+
+
+def test_shared_batch_factory_with_dtypes():
+    kiox = Kiox(UnlimitedTransitionBuffer(), SimpleTransitionFactory())
+    for i in range(20):
+        image = np.random.randint(1, 256, size=(3, 8, 8), dtype=np.uint8)
+        vector = np.random.random(2).astype(np.float32)
+        kiox.collect(
+            observation=[image, vector],
+            action=np.random.randint(4, size=(1,)).astype(np.int32),
+            reward=np.random.random(),
+            terminal=float(i % 10 == 9),
+        )
+
+    batch_factory = SharedBatchFactory(
+        observation_shape=((3, 8, 8), (2,)),
+        action_shape=(1,),
+        reward_shape=(1,),
+        batch_size=8,
+        observation_dtype=(np.uint8, np.float32),
+        action_dtype=np.int32,
+    )
+    batch = batch_factory.batch
+
+    # check dtype of each field
+    assert batch.observations[0].dtype == np.uint8
+    assert batch.observations[1].dtype == np.float32
+    assert batch.next_observations[0].dtype == np.uint8
+    assert batch.actions.dtype == np.int32
+    assert batch.rewards.dtype == np.float32
+
+    batch_factory.sample(
+        kiox.episode_manager.step_buffer, kiox.transition_buffer
+    )
+    assert np.all(batch.observations[0] != 0)
+    assert np.all(batch.observations[1] != 0.0)
+
+    # single dtype is shared by tuple elements
+    batch_factory = SharedBatchFactory(
+        ((3, 8, 8), (2,)), (1,), (1,), 8, observation_dtype=np.uint8
+    )
+    assert batch_factory.batch.observations[1].dtype == np.uint8
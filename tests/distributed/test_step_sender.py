@@ -1,48 +1,362 @@
+import threading
 import time
 from concurrent import futures
 
 import grpc
 import numpy as np
+import pytest
 
+from kiox.distributed.compact_encoding import CompactStepDecoder
 from kiox.distributed.proto.step_pb2 import StepReply
 from kiox.distributed.proto.step_pb2_grpc import (
     StepServiceServicer,
     add_StepServiceServicer_to_server,
 )
 from kiox.distributed.step_sender import StepSender
+from kiox.distributed.transition_builder import TransitionBuilder
+from kiox.distributed.utility import convert_proto_to_item
 
 
 class DummyServiceServicer(StepServiceServicer):
     def __init__(self, obs_shape, action_shape):
         self.obs_shape = obs_shape
         self.action_shape = action_shape
+        self.num_steps = 0
+        self.batch_sizes = []
+        self.rewards = []
+        self.transitions = []
 
     def Send(self, request, context):
         assert request.observation.shape[0].dim == self.obs_shape
-        assert request.continuous_action.length == self.action_shape[0]
-        return StepReply(status="success")
+        assert request.action.shape[0].dim == self.action_shape
+        self.num_steps += 1
+        self.rewards.append(convert_proto_to_item(request.reward))
+        if request.has_transitions:
+            self.transitions.extend(request.transitions)
+        return StepReply(status="success", num_steps=1)
 
+    def SendStream(self, request_iterator, context):
+        num_steps = 0
+        for request in request_iterator:
+            self.Send(request, context)
+            num_steps += 1
+        return StepReply(status="success", num_steps=num_steps)
 
-def test_step_sender():
+    def SendBatch(self, request, context):
+        assert request.rollout_id == 1
+        self.batch_sizes.append(len(request.steps))
+        for step in request.steps:
+            self.Send(step, context)
+        return StepReply(status="success", num_steps=len(request.steps))
+
+    def SendBatchStream(self, request_iterator, context):
+        num_steps = 0
+        for request in request_iterator:
+            num_steps += self.SendBatch(request, context).num_steps
+        return StepReply(status="success", num_steps=num_steps)
+
+    def SendCompactStream(self, request_iterator, context):
+        decoder = CompactStepDecoder()
+        for request in request_iterator:
+            rollout_id, steps = decoder.decode(request)
+            assert rollout_id == 1
+            self.batch_sizes.append(len(steps))
+            for step in steps:
+                assert list(step.observation.shape) == self.obs_shape
+                assert list(step.action.shape) == self.action_shape
+                self.num_steps += 1
+                self.rewards.append(step.reward)
+        return StepReply(status="success", num_steps=self.num_steps)
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_step_sender(streaming):
     server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
     servicer = DummyServiceServicer([3, 84, 84], [4])
     add_StepServiceServicer_to_server(servicer, server)
     server.add_insecure_port("[::]:8000")
     server.start()
 
-    sender = StepSender("localhost", 8000, 1)
+    sender = StepSender("localhost", 8000, 1, streaming=streaming)
     observation = np.random.random((3, 84, 84)).astype(np.float32)
-    action = np.random.random(4)
+    action = np.random.random(4).astype(np.float32)
     reward = np.random.random()
 
-    sender.collect(
-        observation=observation,
-        action=action,
-        reward=reward,
-        terminal=0.0,
+    for _ in range(3):
+        sender.collect(
+            observation=observation,
+            action=action,
+            reward=reward,
+            terminal=0.0,
+        )
+
+    time.sleep(1.0)
+
+    # stop closes the stream after all steps are sent
+    sender.stop()
+    assert servicer.num_steps == 3
+
+    server.stop(0)
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+@pytest.mark.parametrize(
+    "batch_size,max_batch_bytes,expected_batch_sizes",
+    [(4, None, [4, 4, 2]), (100, 3000, [3, 3, 3, 1])],
+)
+def test_step_sender_with_batch(
+    streaming, batch_size, max_batch_bytes, expected_batch_sizes
+):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    servicer = DummyServiceServicer([16, 16], [4])
+    add_StepServiceServicer_to_server(servicer, server)
+    server.add_insecure_port("[::]:8000")
+    server.start()
+
+    sender = StepSender(
+        "localhost",
+        8000,
+        1,
+        streaming=streaming,
+        batch_size=batch_size,
+        max_batch_bytes=max_batch_bytes,
+        max_latency=10.0,
     )
+    for i in range(10):
+        sender.collect(
+            observation=np.random.random((16, 16)).astype(np.float32),
+            action=np.random.random(4).astype(np.float32),
+            reward=float(i),
+            terminal=0.0,
+        )
+    sender.stop()
+
+    assert servicer.batch_sizes == expected_batch_sizes
+    # order is preserved
+    assert np.all(np.array(servicer.rewards).reshape(-1) == np.arange(10))
+
+    server.stop(0)
+
+
+def test_step_sender_with_max_latency():
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    servicer = DummyServiceServicer([4], [1])
+    add_StepServiceServicer_to_server(servicer, server)
+    server.add_insecure_port("[::]:8000")
+    server.start()
+
+    sender = StepSender("localhost", 8000, 1, batch_size=100, max_latency=0.1)
+    for _ in range(3):
+        sender.collect(
+            observation=np.random.random(4).astype(np.float32),
+            action=np.random.random(1).astype(np.float32),
+            reward=0.0,
+            terminal=0.0,
+        )
 
+    # partial batch is flushed without stop
     time.sleep(1.0)
+    assert servicer.batch_sizes == [3]
+
+    sender.stop()
+    server.stop(0)
+
+
+@pytest.mark.parametrize("compression", [None, "zlib"])
+def test_step_sender_with_compact(compression):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    servicer = DummyServiceServicer([3, 84, 84], [4])
+    add_StepServiceServicer_to_server(servicer, server)
+    server.add_insecure_port("[::]:8000")
+    server.start()
+
+    sender = StepSender(
+        "localhost",
+        8000,
+        1,
+        batch_size=4,
+        max_latency=10.0,
+        compact=True,
+        compression=compression,
+        delta=True,
+    )
+    for i in range(10):
+        sender.collect(
+            observation=np.random.randint(
+                256, size=(3, 84, 84), dtype=np.uint8
+            ),
+            action=np.random.random(4).astype(np.float32),
+            reward=float(i),
+            terminal=0.0,
+        )
+    sender.stop()
+
+    assert servicer.batch_sizes == [4, 4, 2]
+    assert np.all(np.array(servicer.rewards).reshape(-1) == np.arange(10))
+
+    server.stop(0)
+
+
+class GatedServiceServicer(DummyServiceServicer):
+    def __init__(self, obs_shape, action_shape):
+        super().__init__(obs_shape, action_shape)
+        self.gate = threading.Event()
+        self.received = threading.Event()
+        self.timeouts = []
+        self.terminals = []
+
+    def Send(self, request, context):
+        self.received.set()
+        self.gate.wait()
+        self.timeouts.append(request.timeout)
+        self.terminals.append(request.terminal)
+        return super().Send(request, context)
+
+
+@pytest.mark.parametrize(
+    "overflow,expected_rewards,expected_dropped,expected_spilled",
+    [
+        ("block", list(range(11)), 0, 0),
+        ("drop_oldest", [0, 7, 8, 9, 10], 6, 0),
+        ("drop_newest", [0, 1, 2, 3, 4], 6, 0),
+        ("spill", list(range(11)), 0, 6),
+    ],
+)
+def test_step_sender_with_max_queue_size(
+    tmp_path, overflow, expected_rewards, expected_dropped, expected_spilled
+):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    servicer = GatedServiceServicer([4], [1])
+    add_StepServiceServicer_to_server(servicer, server)
+    server.add_insecure_port("[::]:8000")
+    server.start()
+
+    sender = StepSender(
+        "localhost",
+        8000,
+        1,
+        max_queue_size=4,
+        overflow=overflow,
+        spill_dir=str(tmp_path),
+    )
+
+    def collect(i):
+        sender.collect(
+            observation=np.random.random(4).astype(np.float32),
+            action=np.random.random(1).astype(np.float32),
+            reward=float(i),
+            terminal=0.0,
+        )
+
+    # the first step is in flight while the server is blocked
+    collect(0)
+    assert servicer.received.wait(5.0)
+
+    thread = threading.Thread(target=lambda: [collect(i) for i in range(1, 11)])
+    thread.start()
+    thread.join(timeout=0.5)
+    if overflow == "block":
+        # collect blocks while the queue is full
+        assert thread.is_alive()
+        assert sender.stats.queue_size == 4
+    else:
+        assert not thread.is_alive()
+        assert sender.stats.queue_size == 10 - expected_dropped
+
+    assert sender.stats.num_dropped == expected_dropped
+    assert sender.stats.num_spilled == expected_spilled
+
+    servicer.gate.set()
+    thread.join()
+    sender.stop()
+
+    rewards = np.array(servicer.rewards).reshape(-1).tolist()
+    assert rewards == expected_rewards
+    if overflow == "drop_newest":
+        # episode is clipped before the dropped steps
+        assert servicer.timeouts == [False, False, False, False, True]
+
+    stats = sender.stats
+    assert stats.queue_size == 0
+    assert stats.num_sent == len(expected_rewards)
+    assert stats.mean_latency > 0.0
+    assert stats.max_latency >= stats.mean_latency
+
+    server.stop(0)
+
+
+def test_step_sender_with_drop_oldest_and_terminal():
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    servicer = GatedServiceServicer([4], [1])
+    add_StepServiceServicer_to_server(servicer, server)
+    server.add_insecure_port("[::]:8000")
+    server.start()
+
+    sender = StepSender(
+        "localhost", 8000, 1, max_queue_size=4, overflow="drop_oldest"
+    )
+
+    def collect(i):
+        sender.collect(
+            observation=np.random.random(4).astype(np.float32),
+            action=np.random.random(1).astype(np.float32),
+            reward=float(i),
+            terminal=float(i == 2),
+        )
+
+    # the first step is in flight while the server is blocked
+    collect(0)
+    assert servicer.received.wait(5.0)
+    for i in range(1, 8):
+        collect(i)
+    assert sender.stats.num_dropped == 3
+
+    servicer.gate.set()
+    sender.stop()
+
+    # the terminal step is kept so that episodes are not merged
+    rewards = np.array(servicer.rewards).reshape(-1).tolist()
+    assert rewards == [0, 2, 5, 6, 7]
+    assert servicer.terminals == [0.0, 1.0, 0.0, 0.0, 0.0]
 
     server.stop(0)
+
+
+def test_step_sender_with_invalid_overflow():
+    with pytest.raises(ValueError):
+        StepSender("localhost", 8000, 1, max_queue_size=4, overflow="invalid")
+
+
+@pytest.mark.parametrize("batch_size", [1, 4])
+def test_step_sender_with_transition_builder(batch_size):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    servicer = DummyServiceServicer([4], [2])
+    add_StepServiceServicer_to_server(servicer, server)
+    server.add_insecure_port("[::]:8000")
+    server.start()
+
+    sender = StepSender(
+        "localhost",
+        8000,
+        1,
+        batch_size=batch_size,
+        transition_builder=TransitionBuilder(n_steps=3, gamma=0.9),
+    )
+    for i in range(10):
+        sender.collect(
+            observation=np.random.random(4).astype(np.float32),
+            action=np.random.random(2).astype(np.float32),
+            reward=1.0,
+            terminal=float(i == 9),
+        )
     sender.stop()
+
+    # every step has a transition after the episode ends
+    assert servicer.num_steps == 10
+    assert sorted(t.curr_position for t in servicer.transitions) == list(
+        range(10)
+    )
+    durations = [t.duration for t in servicer.transitions]
+    assert durations == [3] * 8 + [2, 1]
+
+    server.stop(0)
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from kiox.distributed.server import KioxStepServiceServicer
+from kiox.distributed.transition_builder import TransitionBuilder
+from kiox.distributed.utility import convert_transition_to_proto
+from kiox.step import StepBuffer
+from kiox.transition import FrameStackLazyTransition
+from kiox.transition_buffer import FIFOTransitionBuffer
+from kiox.transition_factory import (
+    FrameStackTransitionFactory,
+    SimpleTransitionFactory,
+)
+
+from .test_server import _create_step_proto
+
+
+def test_transition_builder():
+    builder = TransitionBuilder(n_steps=2, gamma=0.5, n_frames=3)
+
+    assert builder.append(1.0, 0.0) == []
+    transitions = builder.append(2.0, 0.0)
+    assert transitions == []
+    transitions = builder.append(4.0, 1.0)
+
+    # n-step transition and transitions to terminal state
+    assert [t.curr_position for t in transitions] == [0, 1, 2]
+    assert [t.next_position for t in transitions] == [2, None, None]
+    assert [t.duration for t in transitions] == [2, 2, 1]
+    assert [t.multi_step_reward[0] for t in transitions] == [2, 4, 4]
+    assert [list(t.prev_positions) for t in transitions] == [[], [0], [0, 1]]
+
+    # new episode starts after terminal
+    builder.append(1.0, 0.0, timeout=True)
+    transitions = builder.append(1.0, 1.0)
+    assert [t.curr_position for t in transitions] == [0]
+
+
+@pytest.mark.parametrize("n_steps", [1, 3])
+@pytest.mark.parametrize("n_frames", [0, 4])
+def test_transition_builder_with_servicer(n_steps, n_frames):
+    if n_frames == 0:
+        transition_factory = SimpleTransitionFactory()
+    else:
+        transition_factory = FrameStackTransitionFactory(n_frames)
+
+    transition_buffers = [FIFOTransitionBuffer(100) for _ in range(2)]
+    servicers = [
+        KioxStepServiceServicer(
+            step_buffer=StepBuffer(),
+            transition_buffer=transition_buffer,
+            transition_factory=transition_factory,
+            n_steps=n_steps,
+            gamma=0.9,
+        )
+        for transition_buffer in transition_buffers
+    ]
+
+    # steps are sent as they are and with transitions
+    builder = TransitionBuilder(n_steps=n_steps, gamma=0.9, n_frames=n_frames)
+    for i in range(40):
+        reward = np.random.random()
+        terminal = float(i % 10 == 9)
+        timeout = i in (4, 15, 33)
+        request = _create_step_proto(reward, terminal, timeout)
+        request.rollout_id = 1
+        assert servicers[0].Send(request, None).status == "success"
+
+        for transition in builder.append(reward, terminal, timeout):
+            request.transitions.append(convert_transition_to_proto(transition))
+        request.has_transitions = True
+        assert servicers[1].Send(request, None).status == "success"
+
+    expected, actual = [buf.transitions for buf in transition_buffers]
+    assert len(expected) == len(actual)
+    for t1, t2 in zip(expected, actual):
+        assert type(t1) is type(t2)
+        assert t1.curr_idx == t2.curr_idx
+        assert t1.next_idx == t2.next_idx
+        assert t1.duration == t2.duration
+        assert np.all(t1.multi_step_reward == t2.multi_step_reward)
+        if isinstance(t1, FrameStackLazyTransition):
+            assert list(t1.prev_frames) == list(t2.prev_frames)
+            assert t1.n_frames == t2.n_frames
+
+
+def test_transition_builder_with_evicted_rollout():
+    transition_buffer = FIFOTransitionBuffer(100)
+    servicer = KioxStepServiceServicer(
+        step_buffer=StepBuffer(),
+        transition_buffer=transition_buffer,
+        transition_factory=SimpleTransitionFactory(),
+    )
+
+    builder = TransitionBuilder()
+
+    def send(terminal):
+        request = _create_step_proto(1.0, terminal)
+        request.rollout_id = 1
+        for transition in builder.append(1.0, terminal):
+            request.transitions.append(convert_transition_to_proto(transition))
+        request.has_transitions = True
+        assert servicer.Send(request, None).status == "success"
+
+    for _ in range(5):
+        send(0.0)
+    assert transition_buffer.size() == 4
+
+    # the episode is clipped on the server in the middle of the episode
+    assert servicer.evict_idle_rollouts(0.0) == [1]
+
+    # transitions are dropped until the rollout worker starts a new episode
+    for i in range(4):
+        send(float(i == 3))
+    assert transition_buffer.size() == 4
+
+    for i in range(3):
+        send(float(i == 2))
+    assert transition_buffer.size() == 4 + 3
+    for transition in transition_buffer.transitions[4:]:
+        assert transition.next_idx is None or (
+            transition.next_idx == transition.curr_idx + 1
+        )
@@ -1,35 +1,44 @@
 import numpy as np
 import pytest
 
+from kiox.batch_factory import Batch
 from kiox.distributed.proto.step_pb2 import DType
 from kiox.distributed.utility import (
+    convert_batch_to_proto,
     convert_dtype_to_proto,
     convert_item_to_proto,
+    convert_proto_to_batch,
     convert_proto_to_dtype,
     convert_proto_to_item,
 )
 
+DTYPES = [
+    (np.uint8, DType.UINT8),
+    (np.int32, DType.INT32),
+    (np.float32, DType.FLOAT32),
+    (np.float16, DType.FLOAT16),
+    (np.float64, DType.FLOAT64),
+    (np.int8, DType.INT8),
+    (np.int16, DType.INT16),
+    (np.int64, DType.INT64),
+    (np.bool_, DType.BOOL),
+]
 
-@pytest.mark.parametrize("dtype", [np.uint8, np.int32, np.float32])
-def test_convert_dtype_to_proto(dtype):
-    proto = convert_dtype_to_proto(dtype)
-    if dtype == np.uint8:
-        assert proto == DType.UINT8
-    elif dtype == np.int32:
-        assert proto == DType.INT32
-    elif dtype == np.float32:
-        assert proto == DType.FLOAT32
 
+@pytest.mark.parametrize("dtype,proto", DTYPES)
+def test_convert_dtype_to_proto(dtype, proto):
+    assert convert_dtype_to_proto(dtype) == proto
+    assert convert_dtype_to_proto(np.dtype(dtype)) == proto
 
-@pytest.mark.parametrize("proto", [DType.UINT8, DType.INT32, DType.FLOAT32])
-def test_convert_proto_to_dtype(proto):
-    dtype = convert_proto_to_dtype(proto)
-    if proto == DType.UINT8:
-        assert dtype == np.uint8
-    elif proto == DType.INT32:
-        assert dtype == np.int32
-    elif proto == DType.FLOAT32:
-        assert dtype == np.float32
+
+@pytest.mark.parametrize("dtype,proto", DTYPES)
+def test_convert_proto_to_dtype(dtype, proto):
+    assert convert_proto_to_dtype(proto) == dtype
+
+
+def test_convert_dtype_to_proto_with_invalid_dtype():
+    with pytest.raises(ValueError):
+        convert_dtype_to_proto(np.complex64)
 
 
 @pytest.mark.parametrize(
@@ -46,11 +55,12 @@ def test_convert_proto_to_dtype(proto):
 def test_convert_item_to_proto(item):
     proto = convert_item_to_proto(item)
     if isinstance(item, float):
-        value = np.frombuffer(proto.data[0], dtype=np.float32)
+        # scalar is sent without array wrapper
         assert proto.length == 1
         assert proto.dtype[0] == DType.FLOAT32
-        assert proto.shape[0].dim == [1]
-        assert value == item
+        assert len(proto.shape) == 0
+        assert len(proto.data) == 0
+        assert proto.float_value == item
     elif isinstance(item, np.ndarray):
         value = np.frombuffer(proto.data[0], dtype=np.float32)
         assert proto.length == 1
@@ -93,3 +103,105 @@ def test_convert_proto_to_item(item):
         for i in range(2):
             assert converted_item[i].shape == item[i].shape
             assert np.all(converted_item[i] == item[i])
+
+
+@pytest.mark.parametrize("observation_shape", [(3, 84, 84), ((100,), (4,))])
+def test_convert_batch_to_proto(observation_shape):
+    if isinstance(observation_shape[0], int):
+        observations = np.random.random((8, *observation_shape))
+        observations = observations.astype(np.float32)
+        next_observations = np.random.random((8, *observation_shape))
+        next_observations = next_observations.astype(np.float32)
+    else:
+        observations = [
+            np.random.random((8, *shape)).astype(np.float32)
+            for shape in observation_shape
+        ]
+        next_observations = [
+            np.random.random((8, *shape)).astype(np.float32)
+            for shape in observation_shape
+        ]
+    batch = Batch(
+        observations=observations,
+        actions=np.random.randint(4, size=(8, 1)).astype(np.int32),
+        rewards=np.random.random((8, 1)),
+        next_observations=next_observations,
+        terminals=np.zeros((8, 1), dtype=np.float32),
+        durations=np.ones((8, 1), dtype=np.float32),
+    )
+
+    converted_batch = convert_proto_to_batch(convert_batch_to_proto(batch))
+
+    if isinstance(observation_shape[0], int):
+        assert np.all(converted_batch.observations == batch.observations)
+        assert np.all(
+            converted_batch.next_observations == batch.next_observations
+        )
+    else:
+        for i in range(2):
+            assert np.all(
+                converted_batch.observations[i] == batch.observations[i]
+            )
+            assert np.all(
+                converted_batch.next_observations[i]
+                == batch.next_observations[i]
+            )
+    assert converted_batch.actions.dtype == np.int32
+    assert np.all(converted_batch.actions == batch.actions)
+    # float64 rewards are sent as float32
+    assert converted_batch.rewards.dtype == np.float32
+    assert np.allclose(converted_batch.rewards, batch.rewards)
+    assert np.all(converted_batch.terminals == batch.terminals)
+    assert np.all(converted_batch.durations == batch.durations)
+
+
+@pytest.mark.parametrize(
+    "item,dtype",
+    [
+        (3, np.int64),
+        (True, np.bool_),
+        (np.int8(3), np.int8),
+        (np.float16(0.5), np.float16),
+        (np.float64(0.5), np.float64),
+    ],
+)
+def test_convert_scalar_item_to_proto(item, dtype):
+    proto = convert_item_to_proto(item)
+    assert len(proto.data) == 0
+    converted_item = convert_proto_to_item(proto)
+    assert converted_item.shape == (1,)
+    assert converted_item.dtype == dtype
+    assert converted_item[0] == item
+
+    # cast to storage dtype
+    converted_item = convert_proto_to_item(proto, np.float32)
+    assert converted_item.dtype == np.float32
+    assert converted_item[0] == np.float32(item)
+
+
+@pytest.mark.parametrize("dtype,_", DTYPES)
+def test_convert_proto_to_item_with_dtype(dtype, _):
+    item = (np.random.random((3, 4)) * 100).astype(dtype)
+    proto = convert_item_to_proto(item)
+
+    # no copy without cast
+    converted_item = convert_proto_to_item(proto)
+    assert converted_item.dtype == dtype
+    assert not converted_item.flags.owndata
+    assert np.all(converted_item == item)
+
+    converted_item = convert_proto_to_item(proto, dtype)
+    assert converted_item.dtype == dtype
+    assert not converted_item.flags.owndata
+
+    # cast to storage dtype
+    converted_item = convert_proto_to_item(proto, np.float64)
+    assert converted_item.dtype == np.float64
+    assert converted_item.shape == (3, 4)
+    assert np.all(converted_item == item.astype(np.float64))
+
+    # tuple item with per-element dtypes
+    proto = convert_item_to_proto([item, item])
+    converted_item = convert_proto_to_item(proto, [np.float32, None])
+    assert converted_item[0].dtype == np.float32
+    assert converted_item[1].dtype == dtype
@@ -1,7 +1,21 @@
+import dataclasses
+
+import numpy as np
 import pytest
 
-from kiox.batch_factory import BatchFactory
-from kiox.transition_buffer import UnlimitedTransitionBuffer
+from kiox.batch_factory import Batch, BatchFactory
+from kiox.episode import EpisodeManager
+from kiox.step import ArrayStepBuffer
+from kiox.step_collector import StepCollector
+from kiox.transition_buffer import (
+    FIFOTransitionBuffer,
+    PrioritizedTransitionBuffer,
+    UnlimitedTransitionBuffer,
+)
+from kiox.transition_factory import (
+    FrameStackTransitionFactory,
+    SimpleTransitionFactory,
+)
 
 from .utility import StepFactory, TransitionFactory
 
@@ -23,3 +37,203 @@ def test_batch_factory(observation_shape):
     assert batch.rewards.shape == (32, 1)
     assert batch.terminals.shape == (32, 1)
     assert batch.durations.shape == (32, 1)
+    assert batch.indices.shape == (32,)
+    assert batch.weights is None
+
+
+class _LegacyTransitionBuffer:
+    # implements only append, get_by_index, sample, size and transitions
+    def __init__(self):
+        self._transitions = []
+
+    def append(self, lazy_transition):
+        self._transitions.append(lazy_transition)
+
+    def get_by_index(self, index):
+        return self._transitions[index]
+
+    def sample(self, step_buffer):
+        index = np.random.randint(len(self._transitions))
+        return self._transitions[index].create(step_buffer)
+
+    def size(self):
+        return len(self._transitions)
+
+    @property
+    def transitions(self):
+        return self._transitions
+
+
+def test_batch_factory_with_legacy_transition_buffer():
+    factory = TransitionFactory(StepFactory((100,)))
+    buffer = _LegacyTransitionBuffer()
+    for _ in range(100):
+        buffer.append(factory())
+
+    batch = BatchFactory(factory.step_buffer, buffer).sample(32)
+    assert batch.observations.shape == (32, 100)
+    assert batch.rewards.shape == (32, 1)
+    assert batch.indices is None
+    assert batch.weights is None
+
+    # vectorized sampling requires sample_indices and gather
+    batch_factory = BatchFactory(ArrayStepBuffer(10), buffer, vectorized=True)
+    with pytest.raises(AssertionError):
+        batch_factory.sample(32)
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_batch_factory_prioritized(vectorized):
+    step_buffer = ArrayStepBuffer(100)
+    transition_buffer = PrioritizedTransitionBuffer(50, use_table=vectorized)
+    step_collector = StepCollector(
+        episode_manager=EpisodeManager(step_buffer, transition_buffer),
+        transition_factory=SimpleTransitionFactory(),
+    )
+    factory = StepFactory((100,))
+    for i in range(80):
+        partial_step = factory(terminal=i % 10 == 9)
+        step_collector.collect(
+            observation=partial_step.observation,
+            action=partial_step.action,
+            reward=partial_step.reward,
+            terminal=partial_step.terminal,
+        )
+
+    batch_factory = BatchFactory(
+        step_buffer, transition_buffer, vectorized=vectorized
+    )
+
+    batch = batch_factory.sample(32)
+    assert batch.indices.shape == (32,)
+    assert batch.weights.shape == (32, 1)
+    assert np.allclose(batch.weights, 1.0)
+
+    # write back priorities
+    priorities = np.random.random(32)
+    transition_buffer.update_priorities(batch.indices, priorities)
+    batch = batch_factory.sample(32)
+    assert np.all(batch.weights <= 1.0)
+
+    # batch rows are aligned with indices
+    for i, index in enumerate(batch.indices):
+        lazy_transition = transition_buffer.get_by_index(int(index))
+        transition = lazy_transition.create(step_buffer)
+        assert np.allclose(batch.observations[i], transition.observation)
+        assert np.allclose(batch.rewards[i], transition.reward)
+
+
+@pytest.mark.parametrize("n_frames", [0, 1, 3])
+@pytest.mark.parametrize("n_steps", [1, 3])
+def test_batch_factory_vectorized(n_frames, n_steps):
+    if n_frames:
+        observation_shape = (1, 84, 84)
+        transition_factory = FrameStackTransitionFactory(n_frames)
+    else:
+        observation_shape = (100,)
+        transition_factory = SimpleTransitionFactory()
+    step_buffer = ArrayStepBuffer(100)
+    transition_buffer = FIFOTransitionBuffer(50, use_table=True)
+    step_collector = StepCollector(
+        episode_manager=EpisodeManager(step_buffer, transition_buffer),
+        transition_factory=transition_factory,
+        n_steps=n_steps,
+    )
+    factory = StepFactory(observation_shape)
+    for i in range(80):
+        partial_step = factory(terminal=i % 10 == 9)
+        step_collector.collect(
+            observation=partial_step.observation,
+            action=partial_step.action,
+            reward=partial_step.reward,
+            terminal=partial_step.terminal,
+        )
+
+    batch_factory = BatchFactory(
+        step_buffer, transition_buffer, vectorized=True
+    )
+
+    np.random.seed(123)
+    batch = batch_factory.sample(32)
+    np.random.seed(123)
+    indices = transition_buffer.sample_indices(32)
+
+    stack = max(n_frames, 1)
+    assert batch.observations.shape == (
+        32,
+        stack * observation_shape[0],
+        *observation_shape[1:],
+    )
+    assert batch.next_observations.shape == batch.observations.shape
+    assert batch.actions.shape == (32, 4)
+    assert batch.rewards.shape == (32, 1)
+    assert batch.terminals.shape == (32, 1)
+    assert batch.durations.shape == (32, 1)
+
+    # compare with LazyTransition.create
+    for i, index in enumerate(indices):
+        lazy_transition = transition_buffer.get_by_index(int(index))
+        transition = lazy_transition.create(step_buffer)
+        assert np.allclose(batch.observations[i], transition.observation)
+        assert np.allclose(
+            batch.next_observations[i], transition.next_observation
+        )
+        assert np.allclose(batch.actions[i], transition.action)
+        assert np.allclose(batch.rewards[i], transition.reward)
+        assert batch.terminals[i] == transition.terminal
+        assert batch.durations[i] == transition.duration
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+@pytest.mark.parametrize("n_frames", [0, 3])
+def test_batch_factory_with_out(vectorized, n_frames):
+    if n_frames:
+        observation_shape = (1, 84, 84)
+        transition_factory = FrameStackTransitionFactory(n_frames)
+    else:
+        observation_shape = (100,)
+        transition_factory = SimpleTransitionFactory()
+    step_buffer = ArrayStepBuffer(100)
+    transition_buffer = FIFOTransitionBuffer(50, use_table=vectorized)
+    step_collector = StepCollector(
+        episode_manager=EpisodeManager(step_buffer, transition_buffer),
+        transition_factory=transition_factory,
+    )
+    factory = StepFactory(observation_shape)
+    for i in range(80):
+        partial_step = factory(terminal=i % 10 == 9)
+        step_collector.collect(
+            observation=partial_step.observation,
+            action=partial_step.action,
+            reward=partial_step.reward,
+            terminal=partial_step.terminal,
+        )
+
+    batch_factory = BatchFactory(
+        step_buffer, transition_buffer, vectorized=vectorized
+    )
+    out = batch_factory.sample(32)
+
+    np.random.seed(123)
+    batch = batch_factory.sample(32, out=out)
+    np.random.seed(123)
+    ref = batch_factory.sample(32)
+
+    # arrays are reused
+    assert batch is out
+    for field in dataclasses.fields(Batch):
+        value = getattr(batch, field.name)
+        if value is None:
+            continue
+        assert value is getattr(out, field.name)
+        assert np.all(value == getattr(ref, field.name))
+
+    # internal pool
+    batch_factory = BatchFactory(
+        step_buffer, transition_buffer, vectorized=vectorized, reuse_batch=True
+    )
+    batch1 = batch_factory.sample(32)
+    batch2 = batch_factory.sample(32)
+    assert batch1.observations is batch2.observations
+    batch3 = batch_factory.sample(16)
+    assert batch3.observations.shape[0] == 16
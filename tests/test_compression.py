@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from kiox.compression import ZlibCodec, create_codec
+
+
+def test_zlib_codec():
+    codec = ZlibCodec()
+    data = np.zeros((84, 84), dtype=np.uint8).tobytes()
+    compressed = codec.compress(data)
+    assert len(compressed) < len(data)
+    assert codec.decompress(compressed) == data
+
+
+def test_create_codec():
+    assert isinstance(create_codec("zlib"), ZlibCodec)
+    with pytest.raises(ValueError):
+        create_codec("unknown")
+
+
+def test_zlib_codec_with_invalid_data():
+    codec = ZlibCodec()
+    with pytest.raises(ValueError):
+        codec.decompress(b"invalid")
@@ -1,3 +1,5 @@
+import pytest
+
 from kiox.episode import Episode, EpisodeManager
 from kiox.step import StepBuffer
 from kiox.transition_buffer import FIFOTransitionBuffer
@@ -35,6 +37,7 @@ def test_episode():
     # test get methods
     assert episode.get(steps[0].idx) is steps[0]
     assert episode.get_by_index(0) is steps[0]
+    assert episode.get_idx_by_index(-1) == steps[-1].idx
     assert episode.get_next(steps[0].idx, 1) is steps[1]
     assert episode.get_next(steps[0].idx, 2) is steps[2]
     assert episode.get_next(steps[0].idx, 20) is None
@@ -42,6 +45,11 @@ def test_episode():
     assert episode.get_prev(steps[-1].idx, 2) is steps[-3]
     assert episode.get_prev(steps[-1].idx, 20) is None
 
+    # deprecated alias returns transitions left in TransitionBuffer
+    assert episode.transition_size() == 19
+    with pytest.deprecated_call():
+        assert len(episode.transitions) == 10
+
     # test compute_return
     ret = 0
     for i, step in enumerate(steps[:3]):
@@ -49,11 +57,14 @@ def test_episode():
     assert episode.compute_return(steps[0].idx, 3, 0.99) == ret
 
 
-def test_episode_manager():
+@pytest.mark.parametrize("use_table", [False, True])
+def test_episode_manager(use_table):
     factory = StepFactory()
     transition_factory = SimpleTransitionFactory()
     step_buffer = StepBuffer()
-    episode_manager = EpisodeManager(step_buffer, FIFOTransitionBuffer(10))
+    episode_manager = EpisodeManager(
+        step_buffer, FIFOTransitionBuffer(10, use_table=use_table)
+    )
     steps = []
 
     prev_step = None
@@ -79,6 +90,11 @@ def test_episode_manager():
     episode_manager.clip_episode()
     assert episode_manager.active_episode is not prev_episode
 
+    # clipping empty episode does nothing
+    empty_episode = episode_manager.active_episode
+    episode_manager.clip_episode()
+    assert episode_manager.active_episode is empty_episode
+
     # test drop
     prev_step = None
     for i in range(11):
@@ -92,3 +108,47 @@ def test_episode_manager():
 
     assert len(episode_manager.episodes) == 1
     assert step_buffer.size() == 11
+
+
+def test_episode_manager_with_drop_handler():
+    factory = StepFactory()
+    transition_factory = SimpleTransitionFactory()
+    step_buffer = StepBuffer()
+    transition_buffer = FIFOTransitionBuffer(2)
+    dropped_idx = []
+    episode_managers = [
+        EpisodeManager(step_buffer, transition_buffer, dropped_idx.append)
+        for _ in range(2)
+    ]
+
+    # interleave two terminated episodes sharing one buffer
+    prev_steps = [None, None]
+    for i in range(6):
+        for j, episode_manager in enumerate(episode_managers):
+            step = episode_manager.append_step(factory(terminal=i == 2))
+            if prev_steps[j]:
+                transition = transition_factory.create(
+                    prev_steps[j], step, episode_manager.active_episode, 1, 0.99
+                )
+                episode_manager.append_transition(transition)
+            prev_steps[j] = None if step.terminal else step
+            if step.terminal:
+                episode_manager.clip_episode()
+
+    # find_episode only knows steps of its own manager
+    first_steps = [m.episodes[0].steps[0] for m in episode_managers]
+    assert episode_managers[0].find_episode(first_steps[0].idx)
+    assert episode_managers[0].find_episode(first_steps[1].idx) is None
+    assert episode_managers[1].find_episode(first_steps[1].idx)
+
+    # dropped transitions are handed over instead of being dropped
+    assert len(dropped_idx) == 8 - 2
+    assert step_buffer.size() == 12
+    for curr_idx in dropped_idx:
+        for episode_manager in episode_managers:
+            if episode_manager.find_episode(curr_idx):
+                episode_manager.drop_transition(curr_idx)
+
+    # the first episodes of both managers have been removed
+    assert [len(m.episodes) for m in episode_managers] == [1, 1]
+    assert step_buffer.size() == 6
@@ -1,12 +1,29 @@
 import io
 import os
 
+import h5py
+import numpy as np
+import pytest
+
 from kiox.episode import EpisodeManager
-from kiox.io import dump_memory, load_memory
+from kiox.io import (
+    HDF5StepBuffer,
+    StorageProfile,
+    dump_memory,
+    load_memory,
+)
+from kiox.kiox import Kiox
+from kiox.offline import build_from_hdf5
 from kiox.step import StepBuffer
 from kiox.step_collector import StepCollector
-from kiox.transition_buffer import UnlimitedTransitionBuffer
-from kiox.transition_factory import SimpleTransitionFactory
+from kiox.transition_buffer import (
+    FIFOTransitionBuffer,
+    UnlimitedTransitionBuffer,
+)
+from kiox.transition_factory import (
+    FrameStackTransitionFactory,
+    SimpleTransitionFactory,
+)
 
 from .utility import StepFactory
 
@@ -35,3 +52,217 @@ def test_dump_memory_and_load_memory():
     load_memory(io_byte, step_collector)
     assert episode_manager2.get_total_step_size() == 10
     assert transition_buffer.size() == 10
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1000])
+def test_dump_memory_and_load_memory_with_chunks(chunk_size):
+    factory = StepFactory()
+    episode_manager = EpisodeManager(StepBuffer(), UnlimitedTransitionBuffer())
+
+    # terminal, timeout and active episodes
+    for i in range(20):
+        episode_manager.append_step(factory(terminal=i == 19))
+    episode_manager.clip_episode()
+    for _ in range(15):
+        episode_manager.append_step(factory())
+    episode_manager.clip_episode()
+    for _ in range(5):
+        episode_manager.append_step(factory())
+
+    io_byte = io.BytesIO()
+    dump_memory(io_byte, episode_manager.episodes, chunk_size=chunk_size)
+
+    transition_buffer = UnlimitedTransitionBuffer()
+    episode_manager2 = EpisodeManager(StepBuffer(), transition_buffer)
+    step_collector = StepCollector(
+        episode_manager=episode_manager2,
+        transition_factory=SimpleTransitionFactory(),
+        n_steps=3,
+    )
+    load_memory(io_byte, step_collector, chunk_size=chunk_size)
+
+    assert episode_manager2.get_total_step_size() == 40
+    # active episode is saved as a timeout episode
+    assert len(episode_manager2.episodes) == 4
+    assert episode_manager2.active_episode.size() == 0
+    assert transition_buffer.size() == 20 + (15 - 3) + (5 - 3)
+
+    steps = [s for e in episode_manager.episodes for s in e.steps]
+    steps2 = [s for e in episode_manager2.episodes for s in e.steps]
+    for step, step2 in zip(steps, steps2):
+        assert np.allclose(step.observation, step2.observation)
+        assert np.allclose(step.action, step2.action)
+        assert step.reward == step2.reward
+        assert step.terminal == step2.terminal
+
+
+@pytest.mark.parametrize(
+    "profile",
+    [None, StorageProfile(compression="gzip", chunk_size=4, shuffle=True)],
+)
+def test_save_and_load_empty_kiox(tmp_path, profile):
+    kiox = Kiox(UnlimitedTransitionBuffer(), SimpleTransitionFactory())
+    path = os.path.join(tmp_path, "empty.h5")
+    with open(path, "wb") as f:
+        kiox.save(f, profile)
+
+    kiox2 = Kiox(UnlimitedTransitionBuffer(), SimpleTransitionFactory())
+    with open(path, "rb") as f:
+        kiox2.load(f)
+    assert kiox2.episode_manager.get_total_step_size() == 0
+    assert kiox2.transition_buffer.size() == 0
+
+    step_buffer = HDF5StepBuffer(path)
+    assert step_buffer.size() == 0
+    step_buffer.close()
+
+
+@pytest.mark.parametrize(
+    "profile",
+    [
+        StorageProfile(chunk_size=1),
+        StorageProfile(compression="lzf", chunk_size=3),
+        StorageProfile(
+            compression="gzip", compression_level=4, chunk_size=1, shuffle=True
+        ),
+    ],
+)
+def test_dump_memory_with_storage_profile(tmp_path, profile):
+    factory = StepFactory(observation_shape=(3, 4, 4))
+    episode_manager = EpisodeManager(StepBuffer(), UnlimitedTransitionBuffer())
+    for i in range(30):
+        episode_manager.append_step(factory(terminal=i % 10 == 9))
+        if i % 10 == 9:
+            episode_manager.clip_episode()
+
+    # write-only file object requires chunks to be written at once
+    path = os.path.join(tmp_path, "data.h5")
+    with open(path, "wb") as f:
+        dump_memory(f, episode_manager.episodes, chunk_size=7, profile=profile)
+
+    with h5py.File(path, "r") as h5:
+        assert h5["observations"].chunks == (profile.chunk_size, 3, 4, 4)
+        assert h5["observations"].compression == profile.compression
+        assert h5["observations"].shuffle == profile.shuffle
+
+    transition_buffer = UnlimitedTransitionBuffer()
+    episode_manager2 = EpisodeManager(StepBuffer(), transition_buffer)
+    step_collector = StepCollector(
+        episode_manager=episode_manager2,
+        transition_factory=SimpleTransitionFactory(),
+    )
+    with open(path, "rb") as f:
+        load_memory(f, step_collector, chunk_size=7)
+
+    assert episode_manager2.get_total_step_size() == 30
+    steps = [s for e in episode_manager.episodes for s in e.steps]
+    steps2 = [s for e in episode_manager2.episodes for s in e.steps]
+    for step, step2 in zip(steps, steps2):
+        assert np.all(step.observation == step2.observation)
+
+
+def test_storage_profile_validation():
+    with pytest.raises(ValueError):
+        StorageProfile(compression="zstd", chunk_size=1)
+    with pytest.raises(ValueError):
+        StorageProfile(compression="lzf", compression_level=4, chunk_size=1)
+    with pytest.raises(ValueError):
+        StorageProfile(compression="gzip")
+
+
+def _save_episodes(path, profile=None):
+    factory = StepFactory(observation_shape=(1, 4, 4))
+    episode_manager = EpisodeManager(StepBuffer(), UnlimitedTransitionBuffer())
+    for i in range(100):
+        episode_manager.append_step(factory(terminal=i % 30 == 29))
+        if i % 30 == 29:
+            episode_manager.clip_episode()
+    with open(path, "wb") as f:
+        dump_memory(f, episode_manager.episodes, profile=profile)
+    return episode_manager
+
+
+@pytest.mark.parametrize("cache_size", [0, 4])
+def test_hdf5_step_buffer(tmp_path, cache_size):
+    path = os.path.join(tmp_path, "data.h5")
+    episode_manager = _save_episodes(path, StorageProfile(chunk_size=8))
+    steps = [s for e in episode_manager.episodes for s in e.steps]
+
+    step_buffer = HDF5StepBuffer(path, cache_size=cache_size)
+    assert step_buffer.size() == 100
+    assert np.all(step_buffer.get(3).observation == steps[3].observation)
+    assert step_buffer.get(3).reward == steps[3].reward
+    step_buffer.close()
+
+    # duplicated and unsorted rows are read in a single request
+    step_buffer = HDF5StepBuffer(path, cache_size=cache_size)
+    indices = np.array([5, 3, 4, 3, 6])
+    observations = step_buffer.gather_observations(indices)
+    for i, idx in enumerate(indices):
+        assert np.all(observations[i] == steps[idx].observation)
+    assert step_buffer.num_reads == 1
+
+    out = np.zeros_like(observations)
+    step_buffer.gather_observations(indices, out=out)
+    assert np.all(out == observations)
+    if cache_size > 0:
+        assert step_buffer.num_reads == 1
+        assert step_buffer.num_cache_hits == 1
+    else:
+        assert step_buffer.num_reads == 2
+
+    with pytest.raises(ValueError):
+        step_buffer.append(steps[0].to_partial_step())
+    step_buffer.close()
+
+
+def test_kiox_with_hdf5_step_buffer(tmp_path):
+    path = os.path.join(tmp_path, "data.h5")
+    _save_episodes(path)
+
+    # in-memory reference
+    transition_buffer = UnlimitedTransitionBuffer(use_table=True)
+    episode_manager = EpisodeManager(StepBuffer(), transition_buffer)
+    step_collector = StepCollector(
+        episode_manager=episode_manager,
+        transition_factory=FrameStackTransitionFactory(3),
+        n_steps=2,
+    )
+    with open(path, "rb") as f:
+        load_memory(f, step_collector)
+
+    kiox = build_from_hdf5(
+        path, FrameStackTransitionFactory(3), n_steps=2, cache_size=8
+    )
+    assert kiox.get_transition_buffer_size() == transition_buffer.size()
+    assert len(kiox.episode_manager.episodes) == 5
+
+    batch = kiox.sample(16)
+    for i, index in enumerate(batch.indices):
+        transition = transition_buffer.get_by_index(int(index)).create(
+            episode_manager.step_buffer
+        )
+        assert np.all(batch.observations[i] == transition.observation)
+        assert np.all(batch.next_observations[i] == transition.next_observation)
+        assert np.allclose(batch.rewards[i], transition.reward)
+        assert batch.terminals[i] == transition.terminal
+
+
+def test_kiox_with_hdf5_step_buffer_and_fifo_transition_buffer(tmp_path):
+    path = os.path.join(tmp_path, "data.h5")
+    _save_episodes(path)
+
+    # old transitions are dropped while steps stay in the file
+    step_buffer = HDF5StepBuffer(path)
+    kiox = Kiox(
+        FIFOTransitionBuffer(20, use_table=True),
+        SimpleTransitionFactory(),
+        step_buffer=step_buffer,
+        vectorized=True,
+    )
+    assert kiox.get_transition_buffer_size() == 20
+    assert step_buffer.size() == 100
+
+    batch = kiox.sample(8)
+    assert batch.observations.shape[0] == 8
+    step_buffer.close()
@@ -30,6 +30,24 @@ def test_stack_items_tuple():
     assert stacked_items[1].shape == (10, 3, 84, 84)
 
 
+def test_stack_items_with_out():
+    items = [float(i) for i in range(10)]
+    out = stack_items(items)
+    assert stack_items(items[::-1], out=out) is out
+    assert np.all(out[:, 0] == items[::-1])
+
+    items = [np.random.random((3, 84, 84)) for _ in range(10)]
+    out = stack_items(items)
+    assert stack_items(items[::-1], out=out) is out
+    assert np.all(out == np.stack(items[::-1]))
+
+    items = [(np.random.random(100), np.random.random(4)) for _ in range(10)]
+    out = stack_items(items)
+    assert stack_items(items[::-1], out=out) is out
+    assert np.all(out[0] == np.stack([item[0] for item in items[::-1]]))
+    assert np.all(out[1] == np.stack([item[1] for item in items[::-1]]))
+
+
 def test_zeros_like_float():
     item = float(np.random.random())
     zero = zeros_like(item)
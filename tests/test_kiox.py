@@ -1,16 +1,29 @@
 import io
 
 import numpy as np
+import pytest
 
 from kiox.kiox import Kiox
+from kiox.step import (
+    ArrayStepBuffer,
+    CompressedStepBuffer,
+    MemmapStepBuffer,
+    StepBuffer,
+)
 from kiox.transition_buffer import UnlimitedTransitionBuffer
 from kiox.transition_factory import SimpleTransitionFactory
 
 
-def test_kiox():
+@pytest.mark.parametrize(
+    "step_buffer_builder",
+    [StepBuffer, lambda: ArrayStepBuffer(100), CompressedStepBuffer],
+)
+def test_kiox(step_buffer_builder):
     transition_buffer = UnlimitedTransitionBuffer()
     transition_factory = SimpleTransitionFactory()
-    kiox = Kiox(transition_buffer, transition_factory)
+    kiox = Kiox(
+        transition_buffer, transition_factory, step_buffer=step_buffer_builder()
+    )
 
     for i in range(10):
         observation = np.random.random(100)
@@ -50,3 +63,46 @@ def test_kiox():
     kiox3 = Kiox(transition_buffer, transition_factory)
     kiox3.load(io_byte)
     assert kiox3.episode_manager.get_total_step_size() == 10
+
+
+def test_kiox_restore_from_memmap_step_buffer(tmp_path):
+    directory = str(tmp_path / "steps")
+    kiox = Kiox(
+        UnlimitedTransitionBuffer(),
+        SimpleTransitionFactory(),
+        n_steps=3,
+        step_buffer=MemmapStepBuffer(directory, 100),
+    )
+    for i in range(25):
+        kiox.collect(
+            observation=np.random.random(100),
+            action=np.random.random(4),
+            reward=np.random.random(),
+            terminal=float(i == 9),
+            timeout=i == 19,
+        )
+
+    # restart from the stored steps
+    kiox2 = Kiox(
+        UnlimitedTransitionBuffer(),
+        SimpleTransitionFactory(),
+        n_steps=3,
+        step_buffer=MemmapStepBuffer(directory, 100),
+    )
+    assert kiox2.get_step_buffer_size() == 25
+    assert len(kiox2.episode_manager.episodes) == 3
+    assert (
+        kiox2.get_transition_buffer_size() == kiox.get_transition_buffer_size()
+    )
+    for i in range(kiox.get_transition_buffer_size()):
+        transition = kiox.transition_buffer.get_by_index(i)
+        transition2 = kiox2.transition_buffer.get_by_index(i)
+        assert transition.curr_idx == transition2.curr_idx
+        assert transition.next_idx == transition2.next_idx
+        assert transition.duration == transition2.duration
+        assert np.allclose(
+            transition.multi_step_reward, transition2.multi_step_reward
+        )
+
+    batch = kiox2.sample(8)
+    assert batch.observations.shape == (8, 100)
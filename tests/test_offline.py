@@ -1,9 +1,12 @@
 import numpy as np
+import pytest
 
 from kiox.offline import (
+    build_from_dataset,
     create_frame_stack_kiox_from_dataset,
     create_simple_kiox_from_dataset,
 )
+from kiox.transition_factory import SimpleTransitionFactory
 
 
 def test_create_simple_kiox_from_dataset_ndarray():
@@ -76,3 +79,33 @@ def test_create_frame_stack_kiox_from_dataset():
     batch = kiox.sample(32)
     assert batch.observations.shape == (32, 3, 84, 84)
     assert batch.next_observations.shape == (32, 3, 84, 84)
+
+
+@pytest.mark.parametrize("n_steps", [1, 3])
+def test_build_from_dataset_vectorized(n_steps):
+    observations = np.random.random((1000, 100))
+    actions = np.random.random((1000, 4))
+    rewards = np.random.random(1000)
+    terminals = np.zeros(1000)
+    terminals[99::100] = 1.0
+    timeouts = np.zeros(1000)
+    timeouts[49::100] = 1.0
+
+    kiox = build_from_dataset(
+        observations=observations,
+        actions=actions,
+        rewards=rewards,
+        terminals=terminals,
+        timeouts=timeouts,
+        transition_factory=SimpleTransitionFactory(),
+        n_steps=n_steps,
+        vectorized=True,
+    )
+
+    assert kiox.episode_manager.get_total_step_size() == 1000
+    # 10 terminal episodes and 10 timeout episodes with 50 steps each
+    assert kiox.transition_buffer.size() == 10 * 50 + 10 * (50 - n_steps)
+
+    batch = kiox.sample(32)
+    assert batch.observations.shape == (32, 100)
+    assert batch.next_observations.shape == (32, 100)
@@ -0,0 +1,53 @@
+import threading
+
+import numpy as np
+import pytest
+
+from kiox.batch_factory import Batch
+from kiox.kiox import Kiox
+from kiox.prefetch import BatchPrefetcher
+from kiox.transition_buffer import FIFOTransitionBuffer
+from kiox.transition_factory import SimpleTransitionFactory
+
+
+def _collect(kiox, n):
+    for i in range(n):
+        kiox.collect(
+            observation=np.random.random(100),
+            action=np.random.random(4),
+            reward=np.random.random(),
+            terminal=float(i % 10 == 9),
+        )
+
+
+@pytest.mark.parametrize("depth", [1, 3])
+def test_batch_prefetcher(depth):
+    kiox = Kiox(FIFOTransitionBuffer(1000), SimpleTransitionFactory())
+    _collect(kiox, 100)
+
+    with BatchPrefetcher(kiox, batch_size=32, depth=depth) as prefetcher:
+        assert prefetcher.depth == depth
+
+        # collect concurrently with prefetching
+        thread = threading.Thread(target=_collect, args=(kiox, 100))
+        thread.start()
+        for _ in range(10):
+            batch = prefetcher.next_batch()
+            assert isinstance(batch, Batch)
+            assert batch.observations.shape == (32, 100)
+        thread.join()
+
+    stats = prefetcher.stats
+    assert stats.num_batches == 10
+    assert 0 <= stats.num_waits <= 10
+    assert 0.0 <= stats.wait_ratio <= 1.0
+    assert kiox.get_step_buffer_size() == 200
+
+
+def test_batch_prefetcher_with_error():
+    # sampling from empty buffer fails in the background thread
+    kiox = Kiox(FIFOTransitionBuffer(1000), SimpleTransitionFactory())
+    prefetcher = BatchPrefetcher(kiox, batch_size=32)
+    with pytest.raises(ValueError):
+        prefetcher.next_batch()
+    prefetcher.stop()
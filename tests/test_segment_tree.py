@@ -0,0 +1,34 @@
+import numpy as np
+
+from kiox.segment_tree import MinTree, SumTree
+
+
+def test_sum_tree():
+    tree = SumTree(5)
+    values = np.random.random(5)
+    tree.update(np.arange(5), values)
+    assert np.allclose(tree.reduce(), values.sum())
+    assert np.allclose(tree[np.arange(5)], values)
+
+    # batched update with duplicated indices takes the last value
+    tree.update(np.array([1, 3, 1]), np.array([0.5, 2.0, 1.5]))
+    values[1] = 1.5
+    values[3] = 2.0
+    assert np.allclose(tree.reduce(), values.sum())
+
+    # test prefix sum search
+    cumsum = np.cumsum(values)
+    prefixsums = np.random.random(100) * values.sum()
+    indices = tree.find_prefixsum_indices(prefixsums)
+    assert np.all(indices == np.searchsorted(cumsum, prefixsums, "right"))
+
+
+def test_min_tree():
+    tree = MinTree(7)
+    assert tree.reduce() == float("inf")
+    values = np.random.random(7)
+    tree.update(np.arange(7), values)
+    assert np.allclose(tree.reduce(), values.min())
+    tree.update(np.array([int(np.argmin(values))]), np.array([10.0]))
+    values[np.argmin(values)] = 10.0
+    assert np.allclose(tree.reduce(), values.min())
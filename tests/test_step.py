@@ -1,4 +1,19 @@
-from kiox.step import StepBuffer
+import threading
+
+import numpy as np
+import pytest
+
+from kiox.kiox import Kiox
+from kiox.step import (
+    ArrayStepBuffer,
+    CompressedStepBuffer,
+    MemmapStepBuffer,
+    PartialStep,
+    StepBuffer,
+    StripedStepBuffer,
+)
+from kiox.transition_buffer import FIFOTransitionBuffer
+from kiox.transition_factory import SimpleTransitionFactory
 
 from .utility import StepFactory
 
@@ -23,3 +38,235 @@ def test_step_buffer():
     # test drop
     buffer.drop(step1.idx)
     assert buffer.size() == 1
+
+
+@pytest.mark.parametrize("observation_shape", [(100,), ((100,), (3, 84, 84))])
+def test_array_step_buffer(observation_shape):
+    factory = StepFactory(observation_shape)
+    buffer = ArrayStepBuffer(3)
+
+    partial_steps = [factory() for _ in range(3)]
+    steps = [buffer.append(partial_step) for partial_step in partial_steps]
+    assert buffer.size() == 3
+    assert [step.idx for step in steps] == [0, 1, 2]
+
+    # test get
+    for partial_step, step in zip(partial_steps, steps):
+        got = buffer.get(step.idx)
+        if isinstance(partial_step.observation, list):
+            for i in range(2):
+                assert np.all(got.observation[i] == partial_step.observation[i])
+        else:
+            assert np.all(got.observation == partial_step.observation)
+        assert np.all(got.action == partial_step.action)
+        assert got.reward == partial_step.reward
+        assert got.terminal == partial_step.terminal
+
+    # test full buffer
+    with pytest.raises(ValueError):
+        buffer.append(factory())
+    with pytest.raises(ValueError):
+        buffer.extend(
+            np.random.random((1, 100)),
+            np.random.random((1, 4)),
+            np.zeros(1),
+            np.zeros(1),
+        )
+
+    # test drop and ring slot reuse
+    buffer.drop(steps[0].idx)
+    assert buffer.size() == 2
+    with pytest.raises(AssertionError):
+        buffer.get(steps[0].idx)
+    step = buffer.append(factory())
+    assert step.idx == 3
+    assert [s.idx for s in buffer.steps] == [1, 2, 3]
+
+    # test gather
+    indices = np.array([3, 1, 1])
+    observations = buffer.gather_observations(indices)
+    if isinstance(observations, list):
+        assert observations[0].shape == (3, 100)
+        assert observations[1].shape == (3, 3, 84, 84)
+    else:
+        assert observations.shape == (3, 100)
+    assert buffer.gather_actions(indices).shape == (3, 4)
+    assert buffer.gather_rewards(indices).shape == (3, 1)
+    assert buffer.gather_terminals(indices).shape == (3, 1)
+
+
+@pytest.mark.parametrize("episode_length", [5, 30])
+def test_array_step_buffer_with_long_episode(episode_length):
+    factory = StepFactory()
+    maxlen = 10 + 2 * 5
+    kiox = Kiox(
+        FIFOTransitionBuffer(10),
+        SimpleTransitionFactory(),
+        step_buffer=ArrayStepBuffer(maxlen),
+    )
+
+    def collect(i):
+        partial_step = factory(
+            terminal=i % episode_length == episode_length - 1
+        )
+        kiox.collect(
+            observation=partial_step.observation,
+            action=partial_step.action,
+            reward=partial_step.reward,
+            terminal=partial_step.terminal,
+        )
+
+    if episode_length <= 5:
+        # old episodes are released as transitions are dropped
+        for i in range(200):
+            collect(i)
+        assert kiox.transition_buffer.size() == 10
+        return
+
+    # the active episode keeps its steps after its transitions are dropped
+    for i in range(maxlen):
+        collect(i)
+    with pytest.raises(ValueError):
+        collect(maxlen)
+    step_buffer = kiox.episode_manager.step_buffer
+    assert step_buffer.size() == maxlen
+    assert step_buffer.get(0).idx == 0
+
+
+def test_memmap_step_buffer(tmp_path):
+    factory = StepFactory(((100,), (3, 84, 84)))
+    directory = str(tmp_path / "steps")
+    buffer = MemmapStepBuffer(directory, 10)
+
+    partial_steps = [factory() for _ in range(5)]
+    for partial_step in partial_steps:
+        buffer.append(partial_step)
+    buffer.drop(0)
+    buffer.mark_episode_end(4)
+    buffer.flush()
+
+    # test reopen
+    buffer2 = MemmapStepBuffer(directory, 10)
+    assert buffer2.size() == 4
+    assert [step.idx for step in buffer2.steps] == [1, 2, 3, 4]
+    assert buffer2.is_episode_end(4)
+    assert not buffer2.is_episode_end(3)
+    for i in range(1, 5):
+        step = buffer2.get(i)
+        assert np.all(step.observation[0] == partial_steps[i].observation[0])
+        assert np.all(step.observation[1] == partial_steps[i].observation[1])
+        assert np.all(step.action == partial_steps[i].action)
+        assert step.reward == partial_steps[i].reward
+
+    # test append after reopen
+    step = buffer2.append(factory())
+    assert step.idx == 5
+
+
+@pytest.mark.parametrize("observation_shape", [(1, 84, 84), ((100,), (84,))])
+def test_compressed_step_buffer(observation_shape):
+    factory = StepFactory(observation_shape)
+    buffer = CompressedStepBuffer("zlib")
+
+    partial_steps = []
+    for _ in range(3):
+        partial_step = factory()
+        if isinstance(partial_step.observation, list):
+            observation = [
+                (el * 255).astype(np.uint8) for el in partial_step.observation
+            ]
+        else:
+            observation = np.zeros(observation_shape, dtype=np.uint8)
+        partial_step = PartialStep(
+            observation=observation,
+            action=partial_step.action,
+            reward=partial_step.reward,
+            terminal=partial_step.terminal,
+        )
+        partial_steps.append(partial_step)
+        buffer.append(partial_step)
+    assert buffer.size() == 3
+
+    # test get
+    for i, partial_step in enumerate(partial_steps):
+        step = buffer.get(i)
+        if isinstance(partial_step.observation, list):
+            for j in range(2):
+                assert step.observation[j].dtype == np.uint8
+                assert np.all(
+                    step.observation[j] == partial_step.observation[j]
+                )
+        else:
+            assert step.observation.shape == observation_shape
+            assert np.all(step.observation == partial_step.observation)
+        assert np.all(step.action == partial_step.action)
+        assert step.reward == partial_step.reward
+
+    # test statistics
+    if not isinstance(partial_steps[0].observation, list):
+        assert buffer.compression_ratio > 1.0
+    assert buffer.average_decode_time > 0.0
+
+    # test drop
+    buffer.drop(0)
+    assert buffer.size() == 2
+    assert [step.idx for step in buffer.steps] == [1, 2]
+
+
+def test_striped_step_buffer():
+    factory = StepFactory()
+    buffer = StripedStepBuffer(num_stripes=4)
+
+    step1 = buffer.append(factory())
+    step2 = buffer.append(factory())
+    assert (step1.idx, step2.idx) == (0, 1)
+    assert buffer.get(step1.idx) is step1
+
+    # extend allocates consecutive idx
+    observations = np.random.random((3, 100))
+    indices = buffer.extend(
+        observations, np.random.random((3, 4)), np.zeros(3), np.zeros(3)
+    )
+    assert np.all(indices == [2, 3, 4])
+    assert np.all(buffer.get(3).observation == observations[1])
+    assert buffer.size() == 5
+
+    buffer.mark_episode_end(step2.idx)
+    assert buffer.is_episode_end(step2.idx)
+    buffer.drop(step2.idx)
+    assert not buffer.is_episode_end(step2.idx)
+    assert buffer.size() == 4
+    assert [step.idx for step in buffer.steps] == [0, 2, 3, 4]
+
+
+def test_striped_step_buffer_concurrent_append():
+    factory = StepFactory()
+    buffer = StripedStepBuffer(num_stripes=4)
+    num_threads = 8
+    num_steps = 500
+    appended = [[] for _ in range(num_threads)]
+
+    def append(i):
+        for _ in range(num_steps):
+            appended[i].append(buffer.append(factory()).idx)
+            # drop every other step to mutate stripes concurrently
+            if len(appended[i]) % 2 == 0:
+                buffer.drop(appended[i][-2])
+
+    threads = [
+        threading.Thread(target=append, args=(i,)) for i in range(num_threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # idx are unique across threads
+    all_idx = sum(appended, [])
+    assert len(set(all_idx)) == num_threads * num_steps
+    assert sorted(all_idx) == list(range(num_threads * num_steps))
+
+    # only the odd appends of each thread are left
+    remaining = sorted(sum([idx[1::2] for idx in appended], []))
+    assert buffer.size() == num_threads * num_steps // 2
+    assert [step.idx for step in buffer.steps] == remaining
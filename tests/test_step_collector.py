@@ -2,10 +2,16 @@ import numpy as np
 import pytest
 
 from kiox.episode import EpisodeManager
-from kiox.step import StepBuffer
+from kiox.step import ArrayStepBuffer, StepBuffer
 from kiox.step_collector import StepCollector
-from kiox.transition_buffer import UnlimitedTransitionBuffer
-from kiox.transition_factory import SimpleTransitionFactory
+from kiox.transition_buffer import (
+    FIFOTransitionBuffer,
+    UnlimitedTransitionBuffer,
+)
+from kiox.transition_factory import (
+    FrameStackTransitionFactory,
+    SimpleTransitionFactory,
+)
 
 
 @pytest.mark.parametrize("n_steps", [1, 3])
@@ -55,3 +61,117 @@ def test_step_collector(n_steps):
         assert transition.curr_idx == step.idx
         assert transition.next_idx is None
         assert transition.duration == i + 1
+
+
+def _create_dataset(size, observation_shape, reward_shape):
+    observations = np.random.random((size, *observation_shape))
+    actions = np.random.random((size, 4))
+    rewards = np.random.random((size, *reward_shape))
+    # episodes are longer than n_steps
+    terminals = np.zeros(size)
+    timeouts = np.zeros(size)
+    terminals[[9, 30, 55]] = 1.0
+    timeouts[[20, 30, 70]] = 1.0
+    return observations, actions, rewards, terminals, timeouts
+
+
+def _assert_lazy_transition_equal(a, b):
+    assert type(a) is type(b)
+    assert a.curr_idx == b.curr_idx
+    assert a.next_idx == b.next_idx
+    assert a.duration == b.duration
+    assert np.all(a.multi_step_reward == b.multi_step_reward)
+    assert getattr(a, "prev_frames", None) == getattr(b, "prev_frames", None)
+
+
+@pytest.mark.parametrize("n_steps", [1, 3])
+@pytest.mark.parametrize("n_frames", [0, 3])
+@pytest.mark.parametrize("reward_shape", [(), (2,)])
+@pytest.mark.parametrize("use_array", [False, True])
+@pytest.mark.parametrize("maxlen", [None, 50])
+@pytest.mark.parametrize("split", [0, 15])
+def test_step_collector_collect_batch(
+    n_steps, n_frames, reward_shape, use_array, maxlen, split
+):
+    observation_shape = (1, 8, 8) if n_frames else (10,)
+    dataset = _create_dataset(80, observation_shape, reward_shape)
+    observations, actions, rewards, terminals, timeouts = dataset
+
+    def _create_step_collector():
+        if maxlen is None:
+            transition_buffer = UnlimitedTransitionBuffer(use_table=use_array)
+        else:
+            transition_buffer = FIFOTransitionBuffer(
+                maxlen, use_table=use_array
+            )
+        step_buffer = ArrayStepBuffer(100) if use_array else StepBuffer()
+        if n_frames:
+            transition_factory = FrameStackTransitionFactory(n_frames)
+        else:
+            transition_factory = SimpleTransitionFactory()
+        step_collector = StepCollector(
+            episode_manager=EpisodeManager(step_buffer, transition_buffer),
+            transition_factory=transition_factory,
+            n_steps=n_steps,
+        )
+        return step_collector, transition_buffer
+
+    # step-wise collection
+    step_collector, transition_buffer = _create_step_collector()
+    for i in range(80):
+        step_collector.collect(
+            observation=observations[i],
+            action=actions[i],
+            reward=rewards[i],
+            terminal=terminals[i],
+        )
+        if timeouts[i]:
+            step_collector.clip_episode()
+
+    # bulk collection starting in the middle of an episode
+    bulk_step_collector, bulk_transition_buffer = _create_step_collector()
+    for i in range(split):
+        bulk_step_collector.collect(
+            observation=observations[i],
+            action=actions[i],
+            reward=rewards[i],
+            terminal=terminals[i],
+            timeout=bool(timeouts[i]),
+        )
+    bulk_step_collector.collect_batch(
+        observations=observations[split:],
+        actions=actions[split:],
+        rewards=rewards[split:],
+        terminals=terminals[split:],
+        timeouts=timeouts[split:],
+    )
+
+    manager = step_collector.episode_manager
+    bulk_manager = bulk_step_collector.episode_manager
+    assert len(manager.episodes) == len(bulk_manager.episodes)
+    for episode, bulk_episode in zip(manager.episodes, bulk_manager.episodes):
+        assert episode.size() == bulk_episode.size()
+        assert episode.transition_size() == bulk_episode.transition_size()
+        for step, bulk_step in zip(episode.steps, bulk_episode.steps):
+            assert step.idx == bulk_step.idx
+            assert np.all(step.observation == bulk_step.observation)
+            assert np.all(step.reward == bulk_step.reward)
+            assert bool(step.terminal) == bool(bulk_step.terminal)
+
+    transitions = transition_buffer.transitions
+    bulk_transitions = bulk_transition_buffer.transitions
+    assert len(transitions) == len(bulk_transitions)
+    for transition, bulk_transition in zip(transitions, bulk_transitions):
+        _assert_lazy_transition_equal(transition, bulk_transition)
+
+    # continue collection step by step
+    for collector in [step_collector, bulk_step_collector]:
+        collector.collect(
+            observation=observations[0],
+            action=actions[0],
+            reward=rewards[0],
+            terminal=1.0,
+        )
+    assert manager.active_episode.size() == 0
+    assert bulk_manager.active_episode.size() == 0
+    assert transition_buffer.size() == bulk_transition_buffer.size()
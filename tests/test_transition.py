@@ -1,9 +1,10 @@
 from collections import deque
 
 import numpy as np
+import pytest
 
 from kiox.episode import EpisodeManager
-from kiox.step import StepBuffer
+from kiox.step import ArrayStepBuffer, StepBuffer
 from kiox.transition import FrameStackLazyTransition, SimpleLazyTransition
 from kiox.transition_buffer import UnlimitedTransitionBuffer
 
@@ -48,9 +49,12 @@ def test_simple_lazy_transition():
     assert transition.duration == 1
 
 
-def test_frame_stack_lazy_transition():
+@pytest.mark.parametrize(
+    "step_buffer_builder", [StepBuffer, lambda: ArrayStepBuffer(100)]
+)
+def test_frame_stack_lazy_transition(step_buffer_builder):
     factory = StepFactory(observation_shape=(1, 84, 84))
-    step_buffer = StepBuffer()
+    step_buffer = step_buffer_builder()
     episode_manager = EpisodeManager(step_buffer, UnlimitedTransitionBuffer())
     steps = []
     prev_idx = deque(maxlen=4)
@@ -1,15 +1,23 @@
+import dataclasses
+
+import numpy as np
+import pytest
+
 from kiox.transition import Transition
 from kiox.transition_buffer import (
     FIFOTransitionBuffer,
+    PrioritizedTransitionBuffer,
     UnlimitedTransitionBuffer,
 )
+from kiox.transition_table import TransitionTable
 
 from .utility import StepFactory, TransitionFactory
 
 
-def test_unlimited_transition_buffer():
+@pytest.mark.parametrize("use_table", [False, True])
+def test_unlimited_transition_buffer(use_table):
     factory = TransitionFactory(StepFactory())
-    buffer = UnlimitedTransitionBuffer()
+    buffer = UnlimitedTransitionBuffer(use_table=use_table)
     transitions = []
 
     for i in range(10):
@@ -18,26 +26,111 @@ def test_unlimited_transition_buffer():
         transitions.append(transition)
         assert buffer.size() == i + 1
 
-    assert buffer.get_by_index(0) is transitions[0]
+    assert buffer.get_by_index(0) == transitions[0]
 
     # test sample
     transition = buffer.sample(factory.step_buffer)
     assert isinstance(transition, Transition)
 
 
-def test_fifo_transition_buffer():
+@pytest.mark.parametrize("use_table", [False, True])
+def test_fifo_transition_buffer(use_table):
     factory = TransitionFactory(StepFactory())
-    buffer = FIFOTransitionBuffer(5)
+    buffer = FIFOTransitionBuffer(5, use_table=use_table)
     transitions = []
 
     for i in range(10):
         transition = factory()
-        buffer.append(transition)
+        dropped_transition = buffer.append(transition)
         transitions.append(transition)
         assert buffer.size() == min(i + 1, 5)
+        if i < 5:
+            assert dropped_transition is None
+        else:
+            assert dropped_transition == transitions[i - 5]
 
-    assert buffer.get_by_index(0) is transitions[5]
+    assert buffer.get_by_index(0) == transitions[5]
+    assert buffer.get_by_index(-1) == transitions[9]
+    assert list(buffer.transitions) == transitions[5:]
 
     # test sample
     transition = buffer.sample(factory.step_buffer)
     assert isinstance(transition, Transition)
+
+
+@pytest.mark.parametrize("use_table", [False, True])
+def test_prioritized_transition_buffer(use_table):
+    factory = TransitionFactory(StepFactory())
+    buffer = PrioritizedTransitionBuffer(5, use_table=use_table)
+    transitions = []
+
+    for i in range(10):
+        transition = factory()
+        dropped_transition = buffer.append(transition)
+        transitions.append(transition)
+        assert buffer.size() == min(i + 1, 5)
+        if i < 5:
+            assert dropped_transition is None
+        else:
+            assert dropped_transition == transitions[i - 5]
+
+    # indices refer to slots
+    assert buffer.get_by_index(0) == transitions[5]
+    assert buffer.get_by_index(4) == transitions[9]
+
+    # new transitions have the same priority
+    weights = buffer.compute_weights(np.arange(5))
+    assert np.allclose(weights, 1.0)
+
+    # slot 2 dominates sampling
+    buffer.update_priorities(np.arange(5), np.array([0, 0, 1, 0, 0]))
+    indices = buffer.sample_indices(32)
+    assert np.mean(indices == 2) > 0.9
+
+    # higher priority gets lower weight
+    buffer.update_priorities(np.arange(5), np.array([1, 1, 4, 1, 1]))
+    weights = buffer.compute_weights(np.arange(5))
+    assert weights.shape == (5, 1)
+    assert weights[2, 0] < weights[0, 0]
+    assert np.isclose(weights.max(), 1.0)
+
+    # overwritten slot gets the maximum priority
+    buffer.append(factory())
+    assert buffer.compute_weights(np.array([0]))[0, 0] == weights.min()
+
+    # test sample
+    transition = buffer.sample(factory.step_buffer)
+    assert isinstance(transition, Transition)
+
+
+@pytest.mark.parametrize("use_table", [False, True])
+def test_fifo_transition_buffer_extend(use_table):
+    factory = TransitionFactory(StepFactory())
+    transitions = [factory() for _ in range(12)]
+    table = TransitionTable()
+    for transition in transitions:
+        table.append(transition)
+
+    # compare bulk append with step-wise append
+    buffer = PrioritizedTransitionBuffer(5, use_table=use_table)
+    ref_buffer = PrioritizedTransitionBuffer(5, use_table=use_table)
+    buffer.append(transitions[0])
+    ref_buffer.append(transitions[0])
+    # scalar rewards are given as 1-D array
+    lazy_batch = table.gather(np.arange(1, 12))
+    lazy_batch = dataclasses.replace(
+        lazy_batch, multi_step_rewards=lazy_batch.multi_step_rewards[:, 0]
+    )
+    dropped_idx = buffer.extend(lazy_batch)
+    ref_dropped_idx = []
+    for transition in transitions[1:]:
+        dropped_transition = ref_buffer.append(transition)
+        if dropped_transition:
+            ref_dropped_idx.append(dropped_transition.curr_idx)
+    assert list(dropped_idx) == ref_dropped_idx
+    assert buffer.size() == 5
+    assert list(buffer.transitions) == list(ref_buffer.transitions)
+    assert np.allclose(
+        buffer.compute_weights(np.arange(5)),
+        ref_buffer.compute_weights(np.arange(5)),
+    )
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from kiox.transition import (
+    FrameStackLazyTransition,
+    LazyTransition,
+    SimpleLazyTransition,
+)
+from kiox.transition_table import LazyTransitionBatch, TransitionTable
+
+
+def test_transition_table_with_simple_lazy_transition():
+    table = TransitionTable(2)
+    transitions = []
+    for i in range(5):
+        transition = SimpleLazyTransition(
+            curr_idx=i,
+            next_idx=None if i == 4 else i + 1,
+            multi_step_reward=float(np.random.random()),
+            duration=1,
+        )
+        assert table.append(transition) == i
+        transitions.append(transition)
+
+    assert len(table) == 5
+    assert table.capacity == 8
+    for i, transition in enumerate(transitions):
+        assert table[i] == transition
+
+    # test overwrite
+    table[0] = transitions[4]
+    assert table[0] == transitions[4]
+
+
+def test_transition_table_with_frame_stack_lazy_transition():
+    table = TransitionTable(4)
+    transitions = [
+        FrameStackLazyTransition(
+            curr_idx=i,
+            next_idx=i + 1,
+            multi_step_reward=np.random.random(1),
+            duration=1,
+            prev_frames=list(range(max(i - 3, 0), i)),
+            n_frames=4,
+        )
+        for i in range(4)
+    ]
+    for transition in transitions:
+        table.append(transition)
+
+    for i, transition in enumerate(transitions):
+        restored = table[i]
+        assert isinstance(restored, FrameStackLazyTransition)
+        assert restored.curr_idx == transition.curr_idx
+        assert restored.next_idx == transition.next_idx
+        assert restored.prev_frames == transition.prev_frames
+        assert restored.n_frames == 4
+        assert np.all(
+            restored.multi_step_reward == transition.multi_step_reward
+        )
+
+
+def test_transition_table_with_unsupported_transition():
+    table = TransitionTable()
+    with pytest.raises(ValueError):
+        table.append(LazyTransition(0, 1, 0.0, 1))
+
+
+@pytest.mark.parametrize("n_frames", [None, 3])
+def test_transition_table_extend(n_frames):
+    lazy_batch = LazyTransitionBatch(
+        curr_idx=np.arange(10),
+        next_idx=np.append(np.arange(1, 10), -1),
+        multi_step_rewards=np.random.random(10),
+        durations=np.ones(10, dtype=np.int64),
+        prev_frames=(
+            None if n_frames is None else np.full((10, n_frames - 1), -1)
+        ),
+        n_frames=0 if n_frames is None else n_frames,
+    )
+    expected = lazy_batch.to_lazy_transitions()
+
+    table = TransitionTable(4)
+    assert np.all(table.extend(lazy_batch.slice(0, 3)) == np.arange(3))
+    assert np.all(table.extend(lazy_batch.slice(3, 10)) == np.arange(3, 10))
+    assert len(table) == 10
+    assert table.capacity == 16
+    for i, transition in enumerate(expected):
+        assert table[i] == transition
+    assert table[9].next_idx is None